@@ -0,0 +1,82 @@
+# 离线压测分片回溯的扩展性（使用 benchmarks.fixture_server 与 benchmarks.mock_llm）：
+#   python -m benchmarks.bench_backfill --workers 1 2 4 --days 60 --latency 0.05 --rate-limit 40
+# 每种 worker 数在独立的临时目录中从零跑一遍同一份计划（相同的 end），输出行/秒，
+# 并检查各次合并进存储的内容摘要一致（合并结果与 worker 数、完成顺序无关）
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from src.config import Config
+from src.backfill import Backfill, shard_rate
+from benchmarks.fixture_server import start_server as start_fixture
+from benchmarks.mock_llm import start_server as start_llm
+
+
+def run_once(workers, args, end):
+    tmp = tempfile.mkdtemp(prefix=f"bench_backfill_{workers}_")
+    Config.DATA_DIR = os.path.join(tmp, "data")
+    Config.STATE_DB = os.path.join(tmp, "state.db")
+    Config.TREND_DB = os.path.join(tmp, "trends.db")
+    Config.LLM_CACHE_DB = os.path.join(tmp, "llm_cache.db")
+    job = Backfill(os.path.join(tmp, "backfill"))
+    job.load_plan(args.days, args.shard_days, args.operators, end=end)
+    start = time.perf_counter()
+    stats = asyncio.run(job.run(workers))
+    elapsed = time.perf_counter() - start
+    df = job.merge()
+    with open(os.path.join(job.root, "merged.json"), encoding="utf-8") as f:
+        digest = json.load(f)['digest']
+    return stats, elapsed, len(df), digest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--shard-days", type=int, default=15)
+    parser.add_argument("--operators", nargs="+", default=["Vodacom", "MTN"])
+    parser.add_argument("--reviews-per-day", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="抓取接口每个请求的延迟（秒）")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit", type=float, default=40, help="接口的总限速（次/秒），0 表示不限")
+    args = parser.parse_args()
+
+    max_pages = args.days * args.reviews_per_day // 10 + 10
+    fixture, base_url = start_fixture(latency=args.latency, reviews_per_day=args.reviews_per_day,
+                                      max_pages=max_pages)
+    llm, llm_url, llm_state = start_llm(latency=args.llm_latency, jitter=0.2)
+    Config.HELLOPETER_API_BASE = base_url
+    Config.LLM_BASE_URL = llm_url
+    Config.LLM_API_KEY = "mock"
+    Config.SCRAPER_RATE_LIMIT = 0
+    Config.BACKFILL_RATE_LIMIT = args.rate_limit
+    Config.PRECLASSIFY = False
+    Config.SEMANTIC_DEDUPE = False
+    Config.INCREMENTAL = True
+    # 所有 worker 数共用同一份计划边界，合并结果才可比较
+    end = datetime.now().replace(second=0, microsecond=0)
+
+    results = []
+    try:
+        for workers in args.workers:
+            results.append((workers, *run_once(workers, args, end)))
+    finally:
+        fixture.shutdown()
+        llm.shutdown()
+
+    print(f"\n{'worker':>6} {'分片限速':>8} {'行数':>8} {'耗时(s)':>9} {'行/秒':>8} {'加速比':>7}  摘要")
+    base = None
+    for workers, stats, elapsed, merged, digest in results:
+        base = base or stats['rows'] / elapsed
+        rate = shard_rate(workers)
+        print(f"{workers:>6} {rate or '不限':>10} {merged:>8} {elapsed:>9.2f} {stats['rows'] / elapsed:>8.0f} "
+              f"{stats['rows'] / elapsed / base:>7.2f}x  {digest[:12]}")
+    digests = {r[-1] for r in results}
+    print("✅ 各 worker 数合并结果一致" if len(digests) == 1 else f"❌ 合并结果不一致: {digests}")
+
+
+if __name__ == "__main__":
+    main()
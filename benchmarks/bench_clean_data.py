@@ -0,0 +1,114 @@
+# clean_data 向量化版本与原逐行实现的性能对比（一致性由 tests/test_clean_data.py 校验，这里开跑前再校验一次）：
+#   python -m benchmarks.bench_clean_data --sizes 10000 100000 1000000
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.reporter import clean_data, CATEGORICAL_COLUMNS
+
+OPERATORS = ['vodacom', 'mtn', 'telkom', 'rain-internet-service-provider', 'MTN ', 'Rain 5G',
+             'telkom-sa', 'vodacom-provider', 'cell-c']
+SENTIMENTS = ['Positive', 'negative', 'Neutral', 'POSITIVE', None]
+SERVICES = ['MBB', 'FWA', 'Fibre', 'Unknown', None]
+CONTENTS = [
+    'No signal on my phone since Monday', 'The router keeps rebooting at home',
+    'Openserve fibre line down again', 'Billed twice for my SIM upgrade',
+    'Great service, thanks!', 'Rain One unit not connecting', None,
+]
+
+
+def legacy_clean_data(df):
+    # 原逐行实现（向量化之前的版本），仅用于一致性校验
+    df.columns = df.columns.str.lower().str.strip()
+    rename_map = {
+        'l1_category': 'L1_Category', 'category': 'L1_Category',
+        'l2_issue': 'L2_Issue', 'root_cause': 'L2_Issue',
+        'operator': 'Operator', 'date': 'Date', 'sentiment': 'Sentiment',
+        'service_type': 'Service_Type', 'service': 'Service_Type',
+        'location': 'Location', 'content': 'Content', 'url': 'Url', 'link': 'Url'
+    }
+    df.rename(columns=rename_map, inplace=True)
+
+    for col in ['L1_Category', 'L2_Issue', 'Service_Type', 'Sentiment', 'Location', 'Content']:
+        if col not in df.columns: df[col] = 'Unknown'
+    if 'Url' not in df.columns: df['Url'] = ''
+    if 'Urgency' not in df.columns: df['Urgency'] = 0
+
+    op_clean_map = {
+        'rain-internet-service-provider': 'Rain', 'rain 5g': 'Rain',
+        'mtn-service-provider': 'MTN', 'vodacom-provider': 'Vodacom',
+        'telkom-sa': 'Telkom'
+    }
+    df['Operator'] = df['Operator'].astype(str).str.strip().replace(op_clean_map)
+    df['Operator'] = df['Operator'].apply(lambda x: 'MTN' if x.upper() == 'MTN' else x.title())
+    df = df[df['Operator'].isin(['Vodacom', 'MTN', 'Rain', 'Telkom'])].copy()
+
+    df['Sentiment'] = df['Sentiment'].apply(lambda s: 'Positive' if 'positive' in str(s).lower() else 'Negative')
+
+    def classify_product(row):
+        text = str(row['Service_Type']).lower() + " " + str(row.get('Content', '')).lower()
+        op = str(row['Operator'])
+        if any(x in text for x in ['fibre', 'fiber', 'openserve', 'vumatel']): return 'Fibre'
+        if any(x in text for x in ['router', 'wifi', 'home', 'cpe', 'fixed', 'rain one']): return 'FWA'
+        if any(x in text for x in ['phone', 'mobile', 'sim', 'roaming', 'upgrade']): return 'MBB'
+        return 'FWA' if op == 'Rain' else 'MBB'
+
+    df['Service_Type'] = df.apply(classify_product, axis=1)
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Day'] = df['Date'].dt.date
+    df['Urgency'] = pd.to_numeric(df['Urgency'], errors='coerce').fillna(0)
+    return df
+
+
+def make_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), n)]
+    return pd.DataFrame({
+        'Operator': pick(OPERATORS),
+        'Date': pd.Timestamp('2026-01-01') + pd.to_timedelta(rng.integers(0, 90 * 86400, n), unit='s'),
+        'Title': 'title',
+        'Content': pick(CONTENTS),
+        'L1_Category': pick(['Network', 'Billing', 'Customer_Service', 'Other']),
+        'L2_Issue': pick(['No Signal/Dead Zone', 'Double Debit', 'Rude Agent', 'Router Faulty']),
+        'Service_Type': pick(SERVICES),
+        'Sentiment': pick(SENTIMENTS),
+        'Summary': 'summary',
+    })
+
+
+def assert_equivalent(n=20000):
+    base = make_frame(n, seed=42)
+    expected = legacy_clean_data(base.copy())
+    actual = clean_data(base.copy())
+    for col in CATEGORICAL_COLUMNS:
+        actual[col] = actual[col].astype(str)
+        expected[col] = expected[col].astype(str)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    print(f"✅ 一致性校验通过 ({n} 行，{len(actual)} 行保留)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy-above", type=int, default=100_000, help="超过该行数不跑旧实现（太慢）")
+    args = parser.parse_args()
+
+    assert_equivalent()
+    print(f"\n{'行数':>10} {'旧实现(s)':>12} {'向量化(s)':>12} {'加速比':>8}")
+    for n in args.sizes:
+        base = make_frame(n)
+        legacy = None
+        if n <= args.skip_legacy_above:
+            start = time.perf_counter()
+            legacy_clean_data(base.copy())
+            legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        clean_data(base.copy())
+        fast = time.perf_counter() - start
+        legacy_text = f"{legacy:>12.2f}" if legacy is not None else f"{'-':>12}"
+        speedup = f"{legacy / fast:>7.1f}x" if legacy is not None else f"{'-':>8}"
+        print(f"{n:>10} {legacy_text} {fast:>12.3f} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# 离线对比 http / playwright 两种抓取后端（playwright 需先 `playwright install chromium`）：
+#   python -m benchmarks.bench_fetch --backends http playwright --latency 0.05
+import argparse
+import asyncio
+import resource
+import tempfile
+import time
+from src.config import Config
+from src.scraper import run_scraper
+from benchmarks.fixture_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["http", "playwright"])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--reviews-per-day", type=int, default=40)
+    parser.add_argument("--rate-limit", type=float, default=0, help="每 host 每秒请求数，0 表示不限速")
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency, reviews_per_day=args.reviews_per_day)
+    Config.HELLOPETER_API_BASE = base_url
+    Config.SCRAPER_RATE_LIMIT = args.rate_limit
+    Config.DATA_DIR = tempfile.mkdtemp(prefix="bench_fetch_")
+
+    results = []
+    try:
+        for backend in args.backends:
+            start = time.perf_counter()
+            df = asyncio.run(run_scraper(backend=backend))
+            elapsed = time.perf_counter() - start
+            results.append((backend, len(df), elapsed))
+    finally:
+        server.shutdown()
+
+    print("\n后端          行数      耗时(s)   行/秒")
+    for backend, rows, elapsed in results:
+        print(f"{backend:<12} {rows:>6} {elapsed:>10.2f} {rows / elapsed:>8.0f}")
+    # ru_maxrss 单位为 KB（Linux）；Chromium 子进程计入 RUSAGE_CHILDREN
+    print(f"峰值 RSS: 本进程 {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB, "
+          f"子进程 {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# 冷启动导入耗时门禁：每个子命令在全新解释器中用 `-X importtime` 导入 main 与其用到的模块，
+# 统计总导入耗时，并检查不该出现的重量级依赖（如 scrape 不应导入 openai / matplotlib）：
+#   python -m benchmarks.bench_import                 # 打印各子命令的导入耗时与最慢的模块
+#   python -m benchmarks.bench_import --check         # 超出预算或导入了禁止的模块时退出码为 1
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLOTTING = ['matplotlib', 'seaborn', 'PIL']
+# 子命令 -> (执行时导入的模块, 导入预算 ms, 禁止在导入阶段出现的顶层包)。
+# 预算按 GitHub Actions 的 ubuntu-latest 留了余量；pandas + pyarrow 本身约 0.5s
+COMMANDS = {
+    'cli': ([], 150, ['pandas', 'numpy', 'pyarrow', 'openai', 'httpx'] + PLOTTING),
+    'scrape': (['src.scraper', 'src.state', 'src.checkpoint'], 1200, ['openai'] + PLOTTING),
+    'analyze': (['src.analyzer', 'src.state', 'src.checkpoint'], 2500, PLOTTING),
+    'report': (['src.storage', 'src.trends', 'src.anomaly', 'src.cube', 'src.report_specs', 'src.reporter',
+                'src.mailer'], 1500, ['openai'] + PLOTTING),
+    'run-all': (['src.state', 'src.checkpoint', 'src.pipeline', 'src.storage', 'src.trends', 'src.anomaly',
+                 'src.cube', 'src.report_specs', 'src.reporter', 'src.mailer'], 2800, PLOTTING),
+    'backfill': (['src.backfill'], 2500, PLOTTING),
+}
+
+
+def measure(modules):
+    # 返回 (总耗时 us, {模块: 自身耗时 us})；-X importtime 输出到 stderr
+    code = "; ".join(["import main"] + [f"import {m}" for m in modules])
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+    total, own = 0, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # 表头
+        own[name.strip()] = int(self_us)
+        if not name.startswith("  "):
+            # 顶层导入（缩进为 1 个空格）的累计耗时之和即为总导入耗时
+            total += int(cumulative)
+    return total, own
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", nargs="+", default=list(COMMANDS), choices=list(COMMANDS))
+    parser.add_argument("--repeat", type=int, default=3, help="取多次测量的最小值，降低磁盘缓存等噪声")
+    parser.add_argument("--top", type=int, default=5, help="显示自身耗时最长的模块数")
+    parser.add_argument("--check", action="store_true", help="超出预算或导入了禁止的模块时以非零退出码结束")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'子命令':<10}{'导入(ms)':>10}{'预算(ms)':>10}  最慢的模块")
+    for command in args.commands:
+        modules, budget, forbidden = COMMANDS[command]
+        runs = [measure(modules) for _ in range(args.repeat)]
+        total, own = min(runs, key=lambda r: r[0])
+        top = sorted(own.items(), key=lambda kv: -kv[1])[:args.top]
+        loaded = {name.split('.')[0] for name in own}
+        leaked = sorted(loaded & set(forbidden))
+        over = total / 1000 > budget
+        flag = ("  ⚠️ 超出预算" if over else "") + (f"  ❌ 导入了 {leaked}" if leaked else "")
+        print(f"{command:<10}{total / 1000:>10.0f}{budget:>10}  "
+              + ", ".join(f"{name} {us / 1000:.0f}" for name, us in top) + flag)
+        if over or leaked:
+            failures.append(command)
+
+    if failures and args.check:
+        print(f"❌ 启动耗时门禁未通过: {failures}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# 离线压测 run_analysis 的自适应并发 / 重试 / 批量逻辑（使用 benchmarks.mock_llm）：
+#   python -m benchmarks.bench_llm --reviews 2000 --capacity 8 --error-rate 0.05
+# 模型路由与故障转移：便宜模型更快；主端点出错率高时转移到一个健康的备用 mock
+#   python -m benchmarks.bench_llm --cheap-model mock-mini --cheap-latency 0.1 --fallback --error-rate 0.3
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from src.config import Config
+from src.analyzer import run_analysis
+from benchmarks.mock_llm import start_server
+
+SAMPLES = [
+    "No signal for three days in my area.",
+    "Double debit on my account again, nobody calls back.",
+    "Router faulty and the technician did not pitch.",
+    "Great service, thank you to the agent who helped me!",
+    "Fibre has been down since Monday, no feedback from the call centre.",
+    # 长且涉及多类问题：分流到 strong 路由
+    "I was charged twice this month after I cancelled, the router is still faulty and nobody answers when I call. "
+    "The technician did not pitch on Saturday either, and I have had no signal at home for a week now. "
+    "Every time I phone the call centre I am on hold for an hour and then the line drops, absolutely useless.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reviews", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--capacity", type=int, default=8)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--batch-size", type=int, default=Config.LLM_BATCH_SIZE)
+    parser.add_argument("--cheap-model", default="", help="启用分流：短且简单的评论送这个模型")
+    parser.add_argument("--cheap-latency", type=float, default=0.1, help="便宜模型在 mock 端的延迟")
+    parser.add_argument("--fallback", action="store_true", help="另起一个无故障的 mock 作为备用端点")
+    parser.add_argument("--failover-latency", type=float, default=Config.LLM_FAILOVER_LATENCY)
+    args = parser.parse_args()
+
+    model_latency = {args.cheap_model: args.cheap_latency} if args.cheap_model else None
+    server, base_url, state = start_server(latency=args.latency, capacity=args.capacity,
+                                           error_rate=args.error_rate, drop_rate=args.drop_rate,
+                                           model_latency=model_latency)
+    backup = None
+    if args.fallback:
+        backup, Config.LLM_FALLBACK_BASE_URL, backup_state = start_server(latency=args.latency,
+                                                                          model_latency=model_latency)
+    tmp = tempfile.mkdtemp(prefix="bench_llm_")
+    Config.LLM_CHEAP_MODEL = args.cheap_model
+    Config.LLM_FAILOVER_LATENCY = args.failover_latency
+    Config.LLM_BASE_URL = base_url
+    Config.LLM_API_KEY = "mock"
+    Config.LLM_BATCH_SIZE = args.batch_size
+    Config.LLM_CACHE_DB = os.path.join(tmp, "llm_cache.db")
+    Config.DATA_DIR = tmp
+    Config.SEMANTIC_INDEX_DIR = os.path.join(tmp, "semantic_index")
+    Config.PRECLASSIFIER_MODEL = os.path.join(tmp, "preclassifier.npz")
+
+    rng = random.Random(0)
+    now = datetime.now()
+    df = pd.DataFrame({
+        # run_analysis 把结果追加进存储，按 运营商 + 周 分区
+        "Operator": [rng.choice(Config.TARGET_OPERATORS) for _ in range(args.reviews)],
+        "Date": [now - timedelta(minutes=i) for i in range(args.reviews)],
+        "Review_Id": list(range(args.reviews)),
+        "Title": [f"Review {i}" for i in range(args.reviews)],
+        "Content": [f"{rng.choice(SAMPLES)} (#{i})" for i in range(args.reviews)],
+    })
+    try:
+        start = time.perf_counter()
+        out = asyncio.run(run_analysis(df))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        if backup:
+            backup.shutdown()
+
+    failed = int((out["L2_Issue"] == "Analysis Failed").sum())
+    print(f"\n{args.reviews} 条评论耗时 {elapsed:.2f}s ({args.reviews / elapsed:.0f} 条/秒)，失败 {failed} 条")
+    print(f"Mock 端: 请求 {state.requests}，429 {state.throttled}，注入 5xx {state.errors}")
+    if backup:
+        print(f"备用 Mock 端: 请求 {backup_state.requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# 邮件投递基准：本地 SMTP 替身上对比"每封新建连接 + 原图"与"连接复用 + 压缩图片"，再验证重试与发件箱：
+#   python -m benchmarks.bench_mailer --reports 8 --connect-latency 0.3
+import argparse
+import shutil
+import smtplib
+import tempfile
+import time
+from datetime import date, timedelta
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from benchmarks.smtp_sink import start_server
+from src.charts import chart_style, render_png
+from src.mailer import Mailer, html_part, optimize_png
+
+OPERATORS = ["MTN", "Rain", "Telkom", "Vodacom"]
+
+
+def sample_charts():
+    # 与真实报告同尺寸的两张图：趋势折线（分运营商）+ 类别堆叠柱状图
+    days = [str(date(2024, 6, 1) + timedelta(days=i)) for i in range(7)]
+    trend = {
+        "operators": OPERATORS,
+        "series": {op: [[d, s, 5 + (i * 7 + j * 3) % 11] for i, d in enumerate(days)
+                        for j, s in enumerate(["Negative", "Positive"])] for op in OPERATORS},
+        "rolling": {},
+    }
+    category = {
+        "operators": OPERATORS,
+        "categories": ["Billing", "Customer_Service", "Network", "Technical_Repair"],
+        "counts": [[12, 8, 20, 5], [3, 9, 30, 7], [10, 10, 10, 10], [25, 4, 12, 2]],
+    }
+    style = chart_style()
+    return [render_png("trend", trend, style), render_png("category", category, style)]
+
+
+def build(i, charts, html, optimized):
+    msg = MIMEMultipart('related')
+    msg['Subject'] = f"report {i}"
+    msg['From'] = "bench@example.com"
+    msg['To'] = f"team{i}@example.com"
+    msg.attach(html_part(html) if optimized else MIMEText(html, 'html'))
+    for n, png in enumerate(charts):
+        img = MIMEImage(png)
+        img.add_header('Content-ID', f'<img{n}>')
+        msg.attach(img)
+    return msg
+
+
+def send_each(port, messages):
+    # 改造前的做法：每封邮件新建连接（握手与登录的往返开销由替身的 connect_latency 模拟）
+    for msg in messages:
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.send_message(msg)
+        server.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=8)
+    parser.add_argument("--connect-latency", type=float, default=0.3, help="模拟 TLS 握手 + 登录的往返开销")
+    args = parser.parse_args()
+
+    raw = sample_charts()
+    start = time.perf_counter()
+    small = [optimize_png(png) for png in raw]
+    optimize_secs = time.perf_counter() - start
+    html = "\n".join(f"        <p style='font-size:12px;'>第 {i} 段 AI 综述 summary line {i}</p>" for i in range(200))
+
+    before = [build(i, raw, html, optimized=False) for i in range(args.reports)]
+    after = [build(i, small, html, optimized=True) for i in range(args.reports)]
+    size_before = sum(len(m.as_bytes()) for m in before) / len(before)
+    size_after = sum(len(m.as_bytes()) for m in after) / len(after)
+    print(f"图片: {sum(map(len, raw)) / 1024:.0f} KB → {sum(map(len, small)) / 1024:.0f} KB "
+          f"(压缩用时 {optimize_secs:.2f}s)")
+    print(f"单封邮件: {size_before / 1024:.0f} KB → {size_after / 1024:.0f} KB")
+
+    server, port, state = start_server(connect_latency=args.connect_latency)
+    start = time.perf_counter()
+    send_each(port, before)
+    each_secs = time.perf_counter() - start
+    connections = state.connections
+
+    start = time.perf_counter()
+    # 替身不支持 STARTTLS，不登录；握手与登录的往返开销由 connect_latency 模拟
+    with Mailer("127.0.0.1", port, "", "", outbox=tempfile.mkdtemp()) as mailer:
+        for msg in after:
+            mailer.send(msg)
+    pooled_secs = time.perf_counter() - start
+    print(f"逐封连接: {each_secs:.2f}s ({connections} 个连接) | 连接复用: {pooled_secs:.2f}s "
+          f"({state.connections - connections} 个连接)")
+    server.shutdown()
+
+    # 临时错误 + 服务端断线：全部应靠重试送达
+    server, port, state = start_server(fail_rate=0.3, disconnect_every=2)
+    outbox = tempfile.mkdtemp()
+    try:
+        with Mailer("127.0.0.1", port, "", "", outbox=outbox, backoff=0.01) as mailer:
+            for msg in after:
+                mailer.send(msg)
+        print(f"注入 30% 451 + 每 2 封断线: 送达 {len(state.messages)}/{len(after)} | {mailer.stats()}")
+        assert len(state.messages) == len(after)
+        server.shutdown()
+
+        # 服务不可用：进入发件箱，恢复后补发
+        server, port, state = start_server(down=True)
+        with Mailer("127.0.0.1", port, "", "", outbox=outbox, max_retries=1, backoff=0.01) as mailer:
+            for msg in after:
+                mailer.send(msg)
+        print(f"服务不可用: {mailer.stats()}")
+        state.down = False
+        with Mailer("127.0.0.1", port, "", "", outbox=outbox, backoff=0.01) as mailer:
+            mailer.flush_outbox()
+        print(f"恢复后补发: 送达 {len(state.messages)}/{len(after)} | {mailer.stats()}")
+        assert len(state.messages) == len(after)
+        server.shutdown()
+    finally:
+        shutil.rmtree(outbox)
+
+
+if __name__ == "__main__":
+    main()
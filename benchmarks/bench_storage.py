@@ -0,0 +1,73 @@
+# 一年历史数据：CSV 与分区 Parquet 存储的读取耗时 / 内存对比
+#   python -m benchmarks.bench_storage --rows 200000
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from src.storage import ReviewStore, REPORT_COLUMNS
+
+OPERATORS = ['vodacom', 'mtn', 'telkom', 'rain-internet-service-provider']
+
+
+def make_history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pick = lambda values: np.array(values, dtype=object)[rng.integers(0, len(values), n)]
+    start = pd.Timestamp(datetime.now() - timedelta(days=365))
+    return pd.DataFrame({
+        'Operator': pick(OPERATORS),
+        'Date': start + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit='s'),
+        'Title': pick(['No signal', 'Billing error', 'Slow internet', 'Great service']),
+        'Content': pick(['No signal on my phone since Monday', 'The router keeps rebooting at home',
+                         'Billed twice for my SIM upgrade', 'Openserve fibre line down again']),
+        'Raw_Rating': rng.integers(1, 6, n),
+        'Url': 'https://www.hellopeter.com/review',
+        'Review_Id': np.arange(n).astype(str),
+        'L1_Category': pick(['Network', 'Billing', 'Customer_Service', 'Technical_Repair', 'Other']),
+        'L2_Issue': pick(['No Signal/Dead Zone', 'Double Debit', 'Rude Agent', 'Router Faulty']),
+        'Service_Type': pick(['MBB', 'FWA', 'Fibre']),
+        'Sentiment': pick(['Positive', 'Negative', 'Neutral']),
+        'Summary': 'summary',
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        df = make_history(args.rows)
+        csv_path = os.path.join(root, 'history.csv')
+        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        store = ReviewStore('analyzed', root=root)
+        store.append(df)
+        week_ago = datetime.now() - timedelta(days=7)
+
+        cases = [
+            ("CSV 全量", lambda: pd.read_csv(csv_path, encoding='utf-8-sig', parse_dates=['Date'])),
+            ("Parquet 全量", lambda: store.load()),
+            ("Parquet 报告列", lambda: store.load(columns=REPORT_COLUMNS)),
+            ("Parquet 报告列+7天", lambda: store.load(columns=REPORT_COLUMNS, start=week_ago)),
+        ]
+        print(f"{'读取方式':<20} {'行数':>10} {'耗时(s)':>10} {'内存(MB)':>10}")
+        for name, fn in cases:
+            out, secs = timed(fn)
+            mem = out.memory_usage(deep=True).sum() / 1e6
+            print(f"{name:<20} {len(out):>10} {secs:>10.3f} {mem:>10.1f}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
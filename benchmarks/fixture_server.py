@@ -0,0 +1,109 @@
+# 本地 Hellopeter API 替身，用于离线对比抓取后端：
+#   python -m benchmarks.fixture_server --port 8765 --latency 0.05
+#   HELLOPETER_API_BASE=http://127.0.0.1:8765 python main.py
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from benchmarks import synthetic
+
+PATH_RE = re.compile(r"^/consumer/business/(?P<company>[^/]+)/reviews$")
+PAGE_SIZE = 10
+
+
+def build_page(company, page, reviews_per_day=40, now=None):
+    # 按时间倒序生成确定性的评论，每页 PAGE_SIZE 条
+    now = now or datetime.now().replace(microsecond=0)
+    step = timedelta(days=1) / reviews_per_day
+    rng = random.Random(f"{company}:{page}")
+    data = []
+    for i in range(PAGE_SIZE):
+        idx = (page - 1) * PAGE_SIZE + i
+        data.append({
+            "id": zlib.crc32(company.encode()) % 10000 * 1000000 + idx,
+            "created_at": (now - step * idx).strftime("%Y-%m-%d %H:%M:%S"),
+            "review_title": f"{company} review {idx}",
+            "review_content": rng.choice([
+                "No signal for three days in my area.",
+                "Double debit on my account again, nobody calls back.",
+                "Router faulty and the technician did not pitch.",
+                "Great service, thank you to the agent who helped me!",
+            ]),
+            "review_rating": rng.randint(1, 5),
+        })
+    return {"data": data, "current_page": page}
+
+
+def make_handler(latency=0.0, reviews_per_day=40, max_pages=200, fail_rate=0.0, realistic=False, seed=0):
+    # realistic=True 时评论正文、标题、评分来自 benchmarks.synthetic 的模板生成器
+    now = datetime.now().replace(microsecond=0)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            match = PATH_RE.match(parts.path)
+            if not match:
+                return self._send(404, b'{"error":"not found"}')
+            if latency:
+                time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                return self._send(503, b'{"error":"busy"}', {"Retry-After": "0"})
+
+            page = int(parse_qs(parts.query).get("page", ["1"])[0])
+            if page > max_pages:
+                payload = {"data": []}
+            elif realistic:
+                payload = synthetic.build_page(match["company"], page, reviews_per_day, now, seed)
+            else:
+                payload = build_page(match["company"], page, reviews_per_day, now)
+            self._send(200, json.dumps(payload).encode())
+
+        def _send(self, status, body, headers=None):
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body)
+                headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **kwargs):
+    # 后台线程启动，返回 (server, base_url)；用完调用 server.shutdown()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(**kwargs))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--reviews-per-day", type=int, default=40)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--max-pages", type=int, default=200)
+    parser.add_argument("--realistic", action="store_true", help="使用合成评论生成器的正文与评分")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(
+        latency=args.latency, reviews_per_day=args.reviews_per_day, fail_rate=args.fail_rate,
+        max_pages=args.max_pages, realistic=args.realistic))
+    print(f"🧪 Fixture server: http://127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,161 @@
+# 本地 OpenAI 兼容的 /chat/completions 替身，可注入延迟、错误与限流：
+#   python -m benchmarks.mock_llm --port 8766 --latency 0.5 --capacity 8 --error-rate 0.02
+#   LLM_BASE_URL=http://127.0.0.1:8766/v1 LLM_API_KEY=x python main.py
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BATCH_ITEM_RE = re.compile(r'^\s+\[(\d+)\] (".*")\s*$', re.M)
+SINGLE_RE = re.compile(r'Review: "(.*?)"\n', re.S)
+
+RULES = [
+    (("signal", "network", "slow", "coverage"), "Network", "No Signal/Dead Zone"),
+    (("debit", "charge", "refund", "bill", "price"), "Billing", "Double Debit"),
+    (("router", "technician", "fibre", "repair"), "Technical_Repair", "Router Faulty"),
+    (("call", "agent", "chatbot", "feedback"), "Customer_Service", "No Feedback"),
+]
+
+
+def fake_classify(text):
+    # 关键词规则生成确定性的"分类结果"，只用于压测，不代表真实质量
+    lower = text.lower()
+    l1, l2 = "Other", "General Issue"
+    for words, cat, issue in RULES:
+        if any(w in lower for w in words):
+            l1, l2 = cat, issue
+            break
+    positive = any(w in lower for w in ("thank", "great", "excellent", "happy"))
+    service = "Fibre" if "fibre" in lower else ("FWA" if "router" in lower else "MBB")
+    return {
+        "L1_Category": l1, "L2_Issue": l2, "Service_Type": service,
+        "Sentiment": "Positive" if positive else "Negative",
+        "Summary": text[:60],
+    }
+
+
+class MockState:
+    def __init__(self, latency=0.2, jitter=0.5, error_rate=0.0, capacity=0, drop_rate=0.0, retry_after=1,
+                 model_latency=None):
+        self.latency = latency
+        # {模型: 延迟}：按请求的模型覆盖 latency，模拟便宜快速 / 强而慢的模型
+        self.model_latency = model_latency or {}
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.drop_rate = drop_rate
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": "not found"}})
+
+            with state.lock:
+                state.requests += 1
+                if state.capacity and state.in_flight >= state.capacity:
+                    state.throttled += 1
+                    throttled = True
+                else:
+                    state.in_flight += 1
+                    throttled = False
+            if throttled:
+                return self._send(429, {"error": {"message": "rate limited"}},
+                                  {"Retry-After": str(state.retry_after)})
+            try:
+                latency = state.model_latency.get(body.get("model"), state.latency)
+                time.sleep(max(0.0, latency * random.uniform(1 - state.jitter, 1 + state.jitter)))
+                if state.error_rate and random.random() < state.error_rate:
+                    with state.lock:
+                        state.errors += 1
+                    return self._send(500, {"error": {"message": "injected failure"}})
+                self._send(200, self._completion(body))
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def _completion(self, body):
+            messages = body.get("messages", [])
+            prompt = messages[-1]["content"] if messages else ""
+            items = BATCH_ITEM_RE.findall(prompt)
+            if items:
+                results = []
+                for idx, text in items:
+                    if state.drop_rate and random.random() < state.drop_rate:
+                        continue
+                    results.append(dict(fake_classify(json.loads(text)), index=int(idx)))
+                content = {"results": results}
+            elif "Review:" in prompt:
+                match = SINGLE_RE.search(prompt)
+                content = fake_classify(match.group(1) if match else prompt)
+            else:
+                content = "<b>Mock summary</b><br>本周数据由本地模拟服务生成。"
+            text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+            prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 3
+            completion_tokens = len(text) // 3
+            return {
+                "id": "mock-" + str(state.requests),
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }
+
+        def _send(self, status, payload, headers=None):
+            data = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, **kwargs):
+    # 后台线程启动，返回 (server, base_url, state)；base_url 可直接作为 LLM_BASE_URL
+    state = MockState(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1", state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--capacity", type=int, default=0, help="最大并发，超出返回 429；0 表示不限")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="批量响应中随机丢弃条目的比例")
+    parser.add_argument("--model-latency", nargs="*", default=[], metavar="MODEL=SECONDS",
+                        help="按模型覆盖延迟，如 deepseek-chat=0.8 cheap-model=0.1")
+    args = parser.parse_args()
+    model_latency = {m: float(v) for m, v in (item.split("=", 1) for item in args.model_latency)}
+    state = MockState(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      capacity=args.capacity, drop_rate=args.drop_rate, model_latency=model_latency)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(state))
+    print(f"🧪 Mock LLM: http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
@@ -0,0 +1,134 @@
+# 本地 SMTP 替身：收下邮件存在内存（可选写入目录），可注入临时错误与断线：
+#   python -m benchmarks.smtp_sink --port 8025 --save-dir /tmp/mails --fail-rate 0.2
+#   SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 EMAIL_PASSWORD= python main.py
+import argparse
+import os
+import random
+import socketserver
+import threading
+import time
+
+
+class SinkState:
+    def __init__(self, latency=0.0, connect_latency=0.0, fail_rate=0.0, disconnect_every=0, down=False,
+                 save_dir=None):
+        self.latency = latency
+        # 建立连接（含 TLS 握手、登录）的往返开销，在发送问候语前等待
+        self.connect_latency = connect_latency
+        # DATA 结束时以 451 拒收的比例（临时错误，客户端应重试）
+        self.fail_rate = fail_rate
+        # 每个连接收下这么多封后由服务端断开（模拟空闲超时 / 连接数限制），0 表示不断开
+        self.disconnect_every = disconnect_every
+        # 拒绝一切连接（421），模拟服务不可用
+        self.down = down
+        self.save_dir = save_dir
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(line.encode() + b"\r\n")
+
+        def handle(self):
+            with state.lock:
+                state.connections += 1
+            if state.down:
+                return self.reply("421 service not available")
+            time.sleep(state.connect_latency)
+            self.reply("220 smtp-sink ready")
+            accepted = 0
+            sender, recipients = None, []
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                cmd = line.decode(errors='replace').strip()
+                verb = cmd.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    self.wfile.write(b"250-smtp-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+                elif verb == "HELO":
+                    self.reply("250 smtp-sink")
+                elif verb == "AUTH":
+                    with state.lock:
+                        state.logins += 1
+                    self.reply("235 authenticated")
+                elif verb == "MAIL":
+                    sender, recipients = cmd[10:].strip(), []
+                    self.reply("250 ok")
+                elif verb == "RCPT":
+                    recipients.append(cmd[8:].strip())
+                    self.reply("250 ok")
+                elif verb == "DATA":
+                    self.reply("354 end with <CRLF>.<CRLF>")
+                    data = []
+                    while True:
+                        chunk = self.rfile.readline()
+                        if not chunk or chunk == b".\r\n":
+                            break
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    time.sleep(state.latency)
+                    if state.fail_rate and random.random() < state.fail_rate:
+                        with state.lock:
+                            state.rejected += 1
+                        self.reply("451 temporary failure, try again")
+                        continue
+                    self._store(sender, recipients, b"".join(data))
+                    self.reply("250 queued")
+                    accepted += 1
+                    if state.disconnect_every and accepted >= state.disconnect_every:
+                        return self.reply("421 closing connection")
+                elif verb == "RSET":
+                    sender, recipients = None, []
+                    self.reply("250 ok")
+                elif verb == "NOOP":
+                    self.reply("250 ok")
+                elif verb == "QUIT":
+                    return self.reply("221 bye")
+                else:
+                    self.reply("502 command not implemented")
+
+        def _store(self, sender, recipients, data):
+            with state.lock:
+                state.messages.append({"from": sender, "to": recipients, "size": len(data), "data": data})
+                n = len(state.messages)
+            if state.save_dir:
+                with open(os.path.join(state.save_dir, f"{n:05d}.eml"), "wb") as f:
+                    f.write(data)
+
+    return Handler
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_server(port=0, **kwargs):
+    # 后台线程启动，返回 (server, port, state)；用完调用 server.shutdown()
+    state = SinkState(**kwargs)
+    server = _Server(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1], state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-every", type=int, default=0)
+    parser.add_argument("--save-dir", default=None)
+    args = parser.parse_args()
+    if args.save_dir:
+        os.makedirs(args.save_dir, exist_ok=True)
+    state = SinkState(latency=args.latency, connect_latency=args.connect_latency, fail_rate=args.fail_rate,
+                      disconnect_every=args.disconnect_every, save_dir=args.save_dir)
+    server = _Server(("127.0.0.1", args.port), make_handler(state))
+    print(f"🧪 SMTP sink: 127.0.0.1:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,198 @@
+# 离线基准套件：合成评论 + 本地替身（评论 API / OpenAI 兼容接口 / SMTP），按规模测量各阶段，
+# 并与 benchmarks/baselines.json 中保存的基线对比：
+#   python -m benchmarks.suite --sizes 1000 10000 100000
+#   python -m benchmarks.suite --sizes 1000 --stages clean_data plot_trend --check   # 超出容差时退出码为 1
+#   python -m benchmarks.suite --update-baselines                                   # 在基准机器上刷新基线
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from benchmarks import synthetic
+from benchmarks.fixture_server import start_server as start_api
+from benchmarks.mock_llm import start_server as start_llm
+from benchmarks.smtp_sink import start_server as start_smtp
+from src.config import Config
+from src.metrics import metrics
+
+STAGES = ['scrape', 'analyze', 'clean_data', 'build_cube', 'plot_trend', 'plot_category', 'plot_deep_dive',
+          'send_report']
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+# 低于该耗时的阶段不判定回归（计时噪声占比太大）
+NOISE_FLOOR = 0.05
+
+
+def configure(tmp, api_base, llm_base, smtp_port):
+    # 所有状态文件放进临时目录：每个规模都从空缓存、空存储开始
+    Config.DATA_DIR = os.path.join(tmp, 'data')
+    Config.STATE_DB = os.path.join(tmp, 'state.db')
+    Config.TREND_DB = os.path.join(tmp, 'trends.db')
+    Config.BURST_STATE = os.path.join(tmp, 'burst.json')
+    Config.LLM_CACHE_DB = os.path.join(tmp, 'llm_cache.db')
+    Config.SEMANTIC_INDEX_DIR = os.path.join(tmp, 'semantic_index')
+    Config.PRECLASSIFIER_MODEL = os.path.join(tmp, 'preclassifier.npz')
+    Config.CHART_CACHE_DIR = os.path.join(tmp, 'chart_cache')
+    Config.OUTBOX_DIR = os.path.join(tmp, 'outbox')
+    Config.HELLOPETER_API_BASE = api_base
+    Config.SCRAPER_RATE_LIMIT = 0
+    Config.LLM_BASE_URL = llm_base
+    Config.LLM_API_KEY = 'mock'
+    Config.SMTP_SERVER = '127.0.0.1'
+    Config.SMTP_PORT = smtp_port
+    Config.EMAIL_SENDER = 'bench@example.com'
+    Config.EMAIL_PASSWORD = ''
+    # 每张图单独计时：不走进程池
+    Config.CHART_WORKERS = 1
+
+
+class Runner:
+    def __init__(self, size, stages, results, verbose=False):
+        self.size = size
+        self.stages = stages
+        self.results = results
+        self.verbose = verbose
+
+    def run(self, stage, fn):
+        if stage not in self.stages:
+            return None
+        name = f"{stage}@{self.size}"
+        start = time.perf_counter()
+        with metrics.stage(name), open(os.devnull, 'w') as devnull, \
+                redirect_stdout(sys.stdout if self.verbose else devnull):
+            out = fn()
+        seconds = time.perf_counter() - start
+        self.results[name] = {
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(self.size / seconds) if seconds else None,
+            'peak_rss_mb': round(metrics.stages[name]['peak_rss_bytes'] / 2 ** 20),
+        }
+        print(f"   {name:<24} {seconds:>8.2f}s  {self.results[name]['rows_per_sec'] or 0:>9,} 行/s  "
+              f"{self.results[name]['peak_rss_mb']:>5} MB")
+        return out
+
+
+def bench_size(size, stages, args, results):
+    from src.scraper import run_scraper
+    from src.analyzer import run_analysis
+    from src.cube import build_cube
+    from src.mailer import optimize_png
+    from src.reporter import (clean_data, plot_trend, plot_category, plot_deep_dive, generate_customer_voice,
+                              generate_cluster_table, build_report_email, send_report)
+
+    tmp = tempfile.mkdtemp(prefix=f"bench_suite_{size}_")
+    per_day = synthetic.reviews_per_day_for(size, Config.DAYS_TO_SCRAPE)
+    api, api_base = start_api(latency=args.api_latency, reviews_per_day=per_day, max_pages=10 ** 6,
+                              realistic=True, seed=args.seed)
+    llm, llm_base, _ = start_llm(latency=args.llm_latency, jitter=0.2)
+    smtp, smtp_port, sink = start_smtp()
+    configure(tmp, api_base, llm_base, smtp_port)
+    runner = Runner(size, stages, results, args.verbose)
+    print(f"📏 {size:,} 条评论")
+    try:
+        raw = runner.run('scrape', lambda: asyncio.run(run_scraper()))
+        if raw is None or raw.empty:
+            raw = synthetic.make_raw_frame(size, Config.DAYS_TO_SCRAPE, args.seed)
+        runner.run('analyze', lambda: asyncio.run(run_analysis(raw)))
+
+        # 报告阶段使用带模板标签的合成数据，与分类结果无关，便于跨版本对比
+        analyzed = synthetic.make_analyzed_frame(size, Config.DAYS_TO_SCRAPE, args.seed)
+        df = runner.run('clean_data', lambda: clean_data(analyzed.copy()))
+        if df is None:
+            df = clean_data(analyzed.copy())
+        cube = runner.run('build_cube', lambda: build_cube(df)) or build_cube(df)
+        charts = {
+            'trend': runner.run('plot_trend', lambda: plot_trend(cube)),
+            'category': runner.run('plot_category', lambda: plot_category(cube)),
+            'deep_dive': runner.run('plot_deep_dive', lambda: plot_deep_dive(cube)),
+        }
+
+        def send():
+            sections = {'summary': "<b>Benchmark summary</b>"}
+            for name, buf in charts.items():
+                sections[name] = optimize_png(buf.getvalue()) if buf is not None else None
+            sections['voice'] = generate_customer_voice(cube)
+            sections['clusters'] = generate_cluster_table([])
+            send_report(build_report_email(cube, sections, ['bench@example.com']))
+        runner.run('send_report', send)
+    finally:
+        api.shutdown()
+        llm.shutdown()
+        smtp.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(terse=True),
+            'cpus': os.cpu_count()}
+
+
+def compare(results, baselines, tolerance):
+    # 返回回归项列表；同时打印 当前 / 基线 / 比值
+    base = baselines.get('results', {})
+    regressions = []
+    print(f"\n{'阶段@规模':<26}{'当前(s)':>10}{'基线(s)':>10}{'比值':>8}")
+    for name, cur in results.items():
+        ref = base.get(name)
+        if ref is None:
+            print(f"{name:<26}{cur['seconds']:>10.3f}{'-':>10}{'-':>8}")
+            continue
+        ratio = cur['seconds'] / ref['seconds'] if ref['seconds'] else 1.0
+        regressed = ratio > tolerance and cur['seconds'] > NOISE_FLOOR
+        flag = "  ⚠️ 回归" if regressed else ""
+        print(f"{name:<26}{cur['seconds']:>10.3f}{ref['seconds']:>10.3f}{ratio:>8.2f}{flag}")
+        if regressed:
+            regressions.append(name)
+    if base and baselines.get('machine') != machine():
+        print(f"ℹ️ 基线来自不同环境 {baselines.get('machine')}，比值仅供参考")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-latency", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--tolerance", type=float, default=1.3, help="耗时超过基线的倍数即判为回归")
+    parser.add_argument("--check", action="store_true", help="有回归时以非零退出码结束")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--out", default=None, help="把本次结果另存为 JSON")
+    parser.add_argument("--verbose", action="store_true", help="显示各阶段自身的输出")
+    args = parser.parse_args()
+
+    # 预先导入绘图库，第一张图的耗时不含 matplotlib / seaborn 的导入
+    from src.charts import _plotting, chart_style
+    _plotting(chart_style())
+    metrics.start()
+    results = {}
+    for size in args.sizes:
+        bench_size(size, args.stages, args, results)
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES, encoding='utf-8') as f:
+            baselines = json.load(f)
+    regressions = compare(results, baselines, args.tolerance)
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine(), 'results': results}, f, indent=2)
+    if args.update_baselines:
+        merged = dict(baselines.get('results', {}), **results)
+        with open(BASELINES, 'w', encoding='utf-8') as f:
+            json.dump({'machine': machine(), 'results': dict(sorted(merged.items()))}, f, indent=2)
+            f.write("\n")
+        print(f"💾 基线已更新: {BASELINES}")
+    if regressions and args.check:
+        print(f"❌ 性能回归: {regressions}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
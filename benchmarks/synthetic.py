@@ -0,0 +1,168 @@
+# 合成评论生成器：按 Hellopeter API 的 JSON 结构生成评论页，正文由分类模板 + 随机槽位拼成，
+# 长度、评分、大小写、错别字、复制粘贴的重复投诉都有一定比例，规模可配置：
+#   python -m benchmarks.synthetic --reviews 1000 --out /tmp/reviews.jsonl
+import argparse
+import random
+import zlib
+from datetime import datetime, timedelta
+import pandas as pd
+
+PAGE_SIZE = 10
+COMPANIES = ["vodacom", "mtn", "telkom", "rain-internet-service-provider"]
+
+PLACES = ["Soweto", "Sandton", "Durban North", "Khayelitsha", "Pretoria East", "Midrand", "Bloemfontein",
+          "Port Elizabeth", "Polokwane", "Centurion", "Umhlanga", "Stellenbosch", "Randburg", "Mamelodi"]
+DURATIONS = ["two days", "three days", "a week", "10 days", "48 hours", "two weeks", "over a month"]
+PRODUCTS = ["prepaid SIM", "contract", "fibre line", "5G router", "LTE router", "home wifi", "data bundle",
+            "phone upgrade", "Rain One unit", "Openserve line"]
+AMOUNTS = ["R99", "R149", "R299", "R450", "R599", "R1 200", "R2 050"]
+OPENERS = ["", "Hi, ", "Good day. ", "Hello Hellopeter, ", "I am very frustrated. ", "Please help! ",
+           "This is unacceptable. ", "Third time logging this. "]
+CLOSERS = ["", " Please sort this out.", " I want a refund.", " Nobody is helping me.",
+           " I will cancel my contract.", " Reference number 4{n} still open.", " Very disappointed."]
+
+# (L1, L2, 情感, 评分范围, 标题模板, 正文模板)
+TEMPLATES = [
+    ("Network", "No Signal/Dead Zone", "Negative", (1, 2), "No signal in {place}",
+     "There has been no signal in {place} for {duration}. I can't make calls or use data on my {product}."),
+    ("Network", "Slow Speed", "Negative", (1, 2), "Terrible speeds",
+     "My {product} speed is terrible in {place}, barely 1Mbps for {duration}. Paying for nothing."),
+    ("Network", "Network Outage", "Negative", (1, 1), "Network down again",
+     "Network is down again in {place}. Tower must be off, {duration} without any service."),
+    ("Billing", "Double Debit", "Negative", (1, 2), "Debited twice",
+     "You debited my account twice this month, {amount} taken two times for my {product}."),
+    ("Billing", "Incorrect Charges", "Negative", (1, 2), "Wrong charges on my bill",
+     "My bill shows {amount} in charges I never authorised on my {product}."),
+    ("Billing", "Refund Delay", "Negative", (1, 2), "Still waiting for refund",
+     "I was promised a refund of {amount} {duration} ago and still nothing has been paid back."),
+    ("Technical_Repair", "Router Faulty", "Negative", (1, 2), "Faulty router",
+     "The {product} keeps rebooting and dropping connection. It has been faulty for {duration}."),
+    ("Technical_Repair", "Technician No-Show", "Negative", (1, 1), "Technician never arrived",
+     "The technician never arrived for the installation in {place}. I took leave and waited {duration}."),
+    ("Customer_Service", "No Feedback", "Negative", (1, 2), "No feedback",
+     "I logged a complaint about my {product} {duration} ago and nobody has called back. No feedback at all."),
+    ("Customer_Service", "Rude Agent", "Negative", (1, 2), "Rude consultant",
+     "The agent at the {place} store was rude and refused to help me with my {product}."),
+    ("Customer_Service", "Long Wait Time", "Negative", (1, 3), "Waited on hold forever",
+     "I was on hold for over an hour about my {product}. The call centre keeps dropping the call."),
+    ("Customer_Service", "Positive Feedback", "Positive", (4, 5), "Great service",
+     "Thank you to the agent at {place} who sorted out my {product} so quickly. Excellent service!"),
+    ("Network", "Positive Feedback", "Positive", (4, 5), "Happy with speeds",
+     "Really happy with the speeds on my {product} in {place}. Great coverage, thanks!"),
+]
+# 模板的抽样权重：投诉居多，表扬约 15%
+WEIGHTS = [10, 8, 5, 7, 5, 4, 7, 4, 9, 4, 5, 9, 5]
+SHORT_PRAISE = ["Thanks!", "Great service", "Excellent, thank you", "Happy customer :)", "Very helpful agent"]
+
+
+def _typo(text, rng):
+    # 随机交换一对相邻字母，模拟手机输入的错别字
+    i = rng.randrange(1, max(2, len(text) - 2))
+    return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:] if text[i - 1].isalpha() else text
+
+
+def review(rng, idx=0):
+    # 返回 (模板编号, 标题, 正文, 评分)；模板编号 -1 表示极短的表扬
+    if rng.random() < 0.05:
+        return -1, "Thanks", rng.choice(SHORT_PRAISE), 5
+    t = rng.choices(range(len(TEMPLATES)), weights=WEIGHTS)[0]
+    _, _, _, (lo, hi), title, body = TEMPLATES[t]
+    slots = dict(place=rng.choice(PLACES), duration=rng.choice(DURATIONS), product=rng.choice(PRODUCTS),
+                 amount=rng.choice(AMOUNTS))
+    content = rng.choice(OPENERS) + body.format(**slots) + rng.choice(CLOSERS).format(n=idx % 100000)
+    if rng.random() < 0.3:
+        # 长评论：再补一段经历
+        content += " " + TEMPLATES[rng.choices(range(len(TEMPLATES)), weights=WEIGHTS)[0]][5].format(**slots)
+    if rng.random() < 0.2:
+        content = _typo(content, rng)
+    if rng.random() < 0.05:
+        content = content.upper()
+    return t, title.format(**slots), content, rng.randint(lo, hi)
+
+
+def build_page(company, page, reviews_per_day=40, now=None, seed=0, dup_rate=0.05):
+    # 与 Hellopeter API 相同的结构，按时间倒序每页 PAGE_SIZE 条；同参数生成的内容完全相同。
+    # dup_rate 比例的评论复制同一运营商前一页的某条（同一人多次投诉）
+    now = now or datetime.now().replace(microsecond=0)
+    step = timedelta(days=1) / reviews_per_day
+    rng = random.Random(f"{seed}:{company}:{page}")
+    data = []
+    for i in range(PAGE_SIZE):
+        idx = (page - 1) * PAGE_SIZE + i
+        if page > 1 and rng.random() < dup_rate:
+            _, title, content, rating = review(random.Random(f"{seed}:{company}:{page - 1}:{i}"), idx)
+        else:
+            _, title, content, rating = review(random.Random(f"{seed}:{company}:{page}:{i}"), idx)
+        review_id = zlib.crc32(company.encode()) % 10000 * 10_000_000 + idx
+        data.append({
+            "id": review_id,
+            "created_at": (now - step * idx).strftime("%Y-%m-%d %H:%M:%S"),
+            "review_title": title,
+            "review_content": content,
+            "review_rating": rating,
+            "author": f"user{rng.randrange(10 ** 6)}",
+            "business_slug": company,
+            "replied": rng.random() < 0.4,
+            "permalink": f"review-{review_id}",
+        })
+    return {"data": data, "current_page": page, "per_page": PAGE_SIZE}
+
+
+def reviews_per_day_for(total, days, companies=COMPANIES):
+    # 要在 days 天窗口内得到约 total 条评论时，每个运营商每天的评论数
+    return max(1, round(total / (days * len(companies))))
+
+
+def make_raw_frame(n, days=7, seed=0, now=None):
+    # 与 run_scraper 输出相同列的 DataFrame（不经过 HTTP），各运营商平均分配
+    now = now or datetime.now().replace(microsecond=0)
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        company = COMPANIES[i % len(COMPANIES)]
+        _, title, content, rating = review(rng, i)
+        review_id = f"{zlib.crc32(company.encode()) % 10000}{i:09d}"
+        rows.append({
+            "Operator": company,
+            "Date": now - timedelta(seconds=rng.uniform(0, days * 86400)),
+            "Title": title, "Content": content, "Raw_Rating": rating,
+            "Url": f"https://www.hellopeter.com/{company}/reviews/review-{review_id}",
+            "Review_Id": review_id,
+        })
+    return pd.DataFrame(rows).sort_values("Date", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def make_analyzed_frame(n, days=7, seed=0, now=None):
+    # 已分类的评论（run_analysis 之后的列），标签取自生成时所用的模板，L2 写法带一些常见变体
+    now = now or datetime.now().replace(microsecond=0)
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        company = COMPANIES[i % len(COMPANIES)]
+        t, title, content, rating = review(rng, i)
+        l1, l2, sentiment = ("Customer_Service", "Positive Feedback", "Positive") if t < 0 else TEMPLATES[t][:3]
+        if rng.random() < 0.1:
+            l2 = rng.choice([l2.lower(), l2 + "s", l2.replace("/", " / ")])
+        rows.append({
+            "Operator": company,
+            "Date": now - timedelta(seconds=rng.uniform(0, days * 86400)),
+            "Title": title, "Content": content, "Raw_Rating": rating,
+            "Url": f"https://www.hellopeter.com/{company}/reviews/review-{i}",
+            "Review_Id": str(i),
+            "L1_Category": l1, "L2_Issue": l2,
+            "Service_Type": rng.choice(["MBB", "FWA", "Fibre"]),
+            "Sentiment": sentiment, "Summary": content[:60],
+        })
+    return pd.DataFrame(rows).sort_values("Date", ascending=False, kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reviews", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_reviews.jsonl")
+    args = parser.parse_args()
+    df = make_analyzed_frame(args.reviews, args.days, args.seed)
+    df.to_json(args.out, orient="records", lines=True, date_format="iso", force_ascii=False)
+    print(f"🧪 已生成 {len(df)} 条合成评论: {args.out}")
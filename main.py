@@ -1,39 +1,253 @@
-import asyncio
-import seaborn as sns
-from src.scraper import run_scraper
-from src.analyzer import run_analysis
-from src.reporter import clean_data, generate_deep_insight_summary, plot_trend, plot_category, plot_deep_dive, generate_customer_voice, generate_cluster_table, send_report
+# 命令行入口：
+#   python main.py [run-all]          抓取 + 分析 + 报告（定时任务默认）
+#   python main.py scrape [--days N]  只抓取，写入原始存储
+#   python main.py analyze [--days N] 分析原始存储中尚未分析的评论
+#   python main.py report [--days N]  基于已分析存储生成并发送报告
+#   python main.py backfill --days N  分片并行回溯更长的历史并合并进存储（建立历史基线），可多机共享 --dir
+# run-all / scrape / analyze 可加 --resume：从上次失败运行的断点（CHECKPOINT_DIR）继续；backfill 总是从断点继续
+# 各子命令只在执行时导入自己用到的模块：pandas / pyarrow / openai / matplotlib 等导入耗时较长，
+# 短任务不应为用不到的库付出启动时间（见 benchmarks/bench_import.py）
+import argparse
+from src.config import Config
+from src.metrics import metrics
 
-async def main():
-    print("🚀 任务开始...")
-    
-    # 1. 爬取
-    df = await run_scraper()
+
+def finish_analysis(df, state):
+    # 结果已追加进存储后才更新抓取状态（分析失败的评论不记为已见并记入重试，下次运行会重新抓取和分析）
+    if state:
+        failed = df['L2_Issue'] == 'Analysis Failed'
+        state.mark_seen(df[~failed].to_dict('records'))
+        state.mark_failed(df[failed].to_dict('records'))
+        state.close()
+
+
+async def report(new_rows=None, send=True, checkpoint=None):
+    from datetime import date, datetime, timedelta
+    from src.storage import ReviewStore, REPORT_COLUMNS, load_report_window
+    from src.trends import TrendStore
+    from src.anomaly import BurstDetector, EVENT_COLUMNS
+    from src.cube import build_cube
+    from src.report_specs import load_specs, ReportBuilder
+    from src.reporter import clean_data
+    from src.mailer import Mailer
+
+    # 报告基于存储中完整的时间窗口（增量模式下包含以往运行的结果），只读需要的列
+    store = ReviewStore('analyzed')
+    with metrics.stage('store_compact'):
+        store.compact()
+
+    with metrics.stage('load_window'):
+        df = load_report_window(store)
     if df.empty:
-        print("⚠️ 无数据，结束任务")
+        print("⚠️ 报告窗口内无数据，结束任务")
         return
 
-    # 2. 分析
-    df = await run_analysis(df)
-    
+    # 突发检测：本次新增的评论按时间顺序送入在线检测器；首次运行先回放存储中的全部历史建立基线。
+    # 单独执行 report 时送入整个窗口：已处理过的时间桶与评论会被检测器跳过
+    with metrics.stage('burst_detect'):
+        detector = BurstDetector.load()
+        if detector.bucket is None:
+            events = store.load(columns=EVENT_COLUMNS)
+        else:
+            events = new_rows if new_rows is not None else df
+        fired = detector.observe_rows(events.to_dict('records'))
+        detector.save()
+    metrics.record('burst', dict(detector.stats(), new_alerts=len(fired)))
+    print(f"🚨 突发检测: 新报警 {len(fired)} 条 | {detector.stats()}")
+
     # 3. 报告
     print("📊 开始生成报告...")
-    df = clean_data(df)
-    
-    # 设置绘图风格
-    sns.set_theme(style="whitegrid", font="sans-serif")
-    
-    # 生成各部分内容
-    summary = generate_deep_insight_summary(df)
-    b_trend = plot_trend(df)
-    b_cat = plot_category(df)
-    b_deep = plot_deep_dive(df)
-    voice_html = generate_customer_voice(df)
-    monitor_html = generate_cluster_table(df)
-    
-    # 发送
-    send_report(df, summary, b_trend, b_cat, b_deep, voice_html, monitor_html)
+    with metrics.stage('clean'):
+        df = clean_data(df)
+    metrics.count('reviews_reported', len(df))
+    # 一次聚合，所有章节共用
+    with metrics.stage('cube'):
+        cube = build_cube(df)
+
+    # 趋势库：首次运行时用存储中的全部历史初始化，之后只写入本次窗口内的日期。
+    # 抓取窗口的第一天与当天都只抓到一部分，不写入
+    with metrics.stage('trends'):
+        trends = TrendStore()
+        today = date.today()
+        if trends.is_empty():
+            history = clean_data(store.load(columns=REPORT_COLUMNS))
+            trends.update(history, since=history['Day'].min() + timedelta(days=1), until=today)
+        trends.update(df, since=(datetime.now() - timedelta(days=Config.DAYS_TO_SCRAPE)).date() + timedelta(days=1),
+                      until=today)
+
+    # 生成各受众的报告：共用同一个 cube，相同运营商视图的章节只生成一次
+    with metrics.stage('report'):
+        specs = load_specs()
+        alerts = detector.recent_alerts(since=datetime.now() - timedelta(days=Config.DAYS_TO_SCRAPE))
+        builder = ReportBuilder(cube, trends, alerts)
+        reports = await builder.build(specs)
+        trends.close()
+    metrics.record('reports', dict(builder.stats(), specs=len(specs), built=len(reports)))
+    print(f"🧾 报告: {len(reports)}/{len(specs)} 份 | {builder.stats()}")
+    if not send:
+        return
+
+    # 发送：所有报告共用一个 SMTP 连接，先补发以往未送达的邮件。
+    # 从断点恢复时已处理过的报告不再重发（发送失败的已在发件箱里）
+    with metrics.stage('smtp'), Mailer() as mailer:
+        mailer.flush_outbox()
+        for spec, msg in reports:
+            if checkpoint and checkpoint.done(f"sent:{spec.name}"):
+                print(f"♻️ 报告 {spec.name} 已在上次运行中发送，跳过")
+                continue
+            mailer.send(msg)
+            if checkpoint:
+                checkpoint.mark(f"sent:{spec.name}")
+    metrics.record('smtp', mailer.stats())
+    print(f"📬 邮件投递: {mailer.stats()}")
+
+
+# ===========================
+# 子命令
+# ===========================
+async def run_all(args):
+    from src.checkpoint import open_checkpoint
+    from src.state import StateStore
+    print("🚀 任务开始...")
+    checkpoint = open_checkpoint('run-all', args.resume)
+
+    if checkpoint and checkpoint.done('classified'):
+        import pandas as pd
+        df = pd.DataFrame(checkpoint.classified_rows())
+        print(f"♻️ 抓取与分析已在上次运行中完成（{len(df)} 条），直接生成报告")
+    else:
+        state = StateStore() if Config.INCREMENTAL else None
+        if Config.STREAMING:
+            # 1+2. 抓取与分析流水线并行
+            from src.pipeline import run_pipeline
+            with metrics.stage('crawl_classify'):
+                df = await run_pipeline(state=state, checkpoint=checkpoint)
+        else:
+            from src.scraper import run_scraper
+            from src.analyzer import run_analysis
+            # 1. 爬取（增量模式下只返回新增/已修改的评论）
+            with metrics.stage('crawl'):
+                df = await run_scraper(state=state, checkpoint=checkpoint)
+            # 2. 分析
+            if not df.empty:
+                with metrics.stage('classify'):
+                    df = await run_analysis(df, checkpoint)
+        if df.empty:
+            print("⚠️ 无数据，结束任务")
+            if checkpoint:
+                checkpoint.complete()
+            return
+        finish_analysis(df, state)
+        if checkpoint:
+            checkpoint.mark('classified')
+
+    await report(new_rows=df, send=not args.no_send, checkpoint=checkpoint)
+    if checkpoint:
+        checkpoint.complete()
     print("🎉 任务全部完成")
 
+
+async def scrape(args):
+    # 只抓取：不更新"已见"状态（评论要分析落盘后才算处理完），重复抓到的版本读取时会去重
+    from src.checkpoint import open_checkpoint
+    from src.scraper import run_scraper
+    from src.state import StateStore
+    checkpoint = open_checkpoint('scrape', args.resume)
+    state = StateStore() if Config.INCREMENTAL else None
+    try:
+        with metrics.stage('crawl'):
+            await run_scraper(state=state, checkpoint=checkpoint)
+    finally:
+        if state:
+            state.close()
+    if checkpoint:
+        checkpoint.complete()
+
+
+async def analyze(args):
+    from src.analyzer import pending_reviews, run_analysis
+    from src.checkpoint import open_checkpoint
+    from src.state import StateStore
+    checkpoint = open_checkpoint('analyze', args.resume)
+    with metrics.stage('load_pending'):
+        df = pending_reviews()
+    if not df.empty:
+        with metrics.stage('classify'):
+            df = await run_analysis(df, checkpoint)
+        finish_analysis(df, StateStore() if Config.INCREMENTAL else None)
+    else:
+        print("⚠️ 没有待分析的评论")
+    if checkpoint:
+        checkpoint.complete()
+
+
+async def report_only(args):
+    await report(send=not args.no_send)
+
+
+async def backfill(args):
+    # 回溯：按 运营商 × 时间段 切成分片并行执行，全部完成后确定性地合并进存储。
+    # 同一 --dir 可在多台机器上同时运行；中断后重跑同一命令即从各分片的断点继续
+    from src.backfill import Backfill
+    job = Backfill(args.dir)
+    job.load_plan(args.days or Config.BACKFILL_DAYS, args.shard_days or Config.BACKFILL_SHARD_DAYS,
+                  Config.TARGET_OPERATORS)
+    with metrics.stage('backfill'):
+        await job.run(args.workers)
+    if args.no_merge:
+        return
+    with metrics.stage('backfill_merge'):
+        job.merge()
+
+
+COMMANDS = {'run-all': run_all, 'scrape': scrape, 'analyze': analyze, 'report': report_only, 'backfill': backfill}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="HelloPeter 电信舆情监控")
+    sub = parser.add_subparsers(dest='command', metavar='{' + ','.join(COMMANDS) + '}')
+
+    def add(name, help_text, days_help="时间窗口天数（默认 DAYS_TO_SCRAPE）"):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--days", type=int, default=None, help=days_help)
+        if name not in ('report', 'backfill'):
+            p.add_argument("--resume", action="store_true", help="从上次失败运行的断点继续，只做剩下的工作")
+        return p
+
+    for name in ('run-all', 'report'):
+        add(name, "抓取 + 分析 + 报告" if name == 'run-all' else "生成并发送报告").add_argument(
+            "--no-send", action="store_true", help="只生成报告，不发送邮件")
+    add('scrape', "只抓取，写入原始存储")
+    add('analyze', "分析原始存储中尚未分析的评论")
+    p = add('backfill', "分片并行回溯更长的历史并合并进存储", days_help="回溯天数（默认 BACKFILL_DAYS）")
+    p.add_argument("--operators", nargs="+", default=None, help="只回溯这些运营商（默认 TARGET_OPERATORS）")
+    p.add_argument("--shard-days", type=int, default=None, help="每个分片的天数（默认 BACKFILL_SHARD_DAYS）")
+    p.add_argument("--workers", type=int, default=None, help="本机进程数（默认 BACKFILL_WORKERS）")
+    p.add_argument("--dir", default=None, help="计划 / 锁 / 断点 / 分片结果目录，多台机器共享（默认 BACKFILL_DIR）")
+    p.add_argument("--no-merge", action="store_true", help="只执行分片，不合并（辅助机器使用）")
+    # 不带子命令时与原来的 `python main.py` 一致
+    parser.set_defaults(command='run-all', days=None, no_send=False, operators=None, resume=False)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.days:
+        Config.DAYS_TO_SCRAPE = args.days
+    if args.operators:
+        Config.TARGET_OPERATORS = args.operators
+
+    import asyncio
+    # 运行指标（以及可选的剖析）覆盖整个运行；失败时也写出清单
+    metrics.command = args.command
+    metrics.start()
+    status = 'failed'
+    try:
+        asyncio.run(COMMANDS[args.command](args))
+        status = 'ok'
+    finally:
+        metrics.finish(status)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
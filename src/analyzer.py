@@ -1,22 +1,21 @@
 import asyncio
+import hashlib
 import json
+from datetime import datetime, timedelta
 import pandas as pd
-from openai import AsyncOpenAI
+from src.cache import ClassificationCache, cache_key
 from src.config import Config
+from src.llm_router import LLMRouter
+from src.metrics import metrics
+from src.preclassifier import open_preclassifier
+from src.semantic import NearDupIndex, minhash, group_near_duplicates
+from src.state import review_hash
+from src.storage import ReviewStore
 
-async def analyze_review(client, semaphore, row_data):
-    async with semaphore:
-        text = f"{row_data.get('Title', '')}. {row_data.get('Content', '')}"[:2000]
-
-        # ======================================================
-        # 🧠 双层分类 Prompt (完全保留你的原始内容)
-        # ======================================================
-        prompt = f"""
-        Role: Senior Telecom Analyst for South Africa.
-        Task: Analyze the customer review with a 2-level classification system.
-
-        Review: "{text}"
-
+# ======================================================
+# 🧠 双层分类 Prompt (完全保留你的原始内容)
+# ======================================================
+CLASSIFY_RULES = """
         Classification Rules：以下只是参考，你可以根据实际情况继续修改和完善；
         1. **Level_1_Category**: Choose ONE from [Network, Billing, Customer_Service, Technical_Repair, Sales_Admin, App_Digital, Other].
         2. **Level_2_Issue**: Be specific based on Level 1.
@@ -28,7 +27,14 @@ async def analyze_review(client, semaphore, row_data):
         3. **Service_Type**: MBB (Mobile/Sim) or FWA (Wireless home broadband) or Fibre.
         4. **Summary**: A concise 1-sentence summary of the specific incident (e.g. "User charged twice after cancelling contract").
 
-        Output JSON ONLY:
+"""
+
+CLASSIFY_PROMPT = """
+        Role: Senior Telecom Analyst for South Africa.
+        Task: Analyze the customer review with a 2-level classification system.
+
+        Review: "{text}"
+""" + CLASSIFY_RULES + """        Output JSON ONLY:
         {{
             "L1_Category": "...",
             "L2_Issue": "...",
@@ -38,37 +44,336 @@ async def analyze_review(client, semaphore, row_data):
         }}
         """
 
+# 批量模式：一次请求分类多条评论，规则部分与单条 prompt 共用
+BATCH_PROMPT = """
+        Role: Senior Telecom Analyst for South Africa.
+        Task: Analyze EACH of the customer reviews below with a 2-level classification system.
+
+        Reviews (each prefixed with its [index]):
+{reviews}
+""" + CLASSIFY_RULES + """        Output JSON ONLY, exactly one item per review, in any order, keyed by its index:
+        {{
+            "results": [
+                {{
+                    "index": 0,
+                    "L1_Category": "...",
+                    "L2_Issue": "...",
+                    "Service_Type": "...",
+                    "Sentiment": "Positive/Negative/Neutral",
+                    "Summary": "..."
+                }}
+            ]
+        }}
+        """
+
+SYSTEM_PROMPT = "JSON generator. Telecom expert."
+# prompt 一旦修改，版本号随之变化，旧的缓存结果自动失效
+PROMPT_VERSION = hashlib.sha1((SYSTEM_PROMPT + CLASSIFY_PROMPT + BATCH_PROMPT).encode("utf-8")).hexdigest()[:12]
+
+RESULT_FIELDS = ["L1_Category", "L2_Issue", "Service_Type", "Sentiment", "Summary"]
+
+FAILED_RESULT = {
+    "L1_Category": "Other", "L2_Issue": "Analysis Failed",
+    "Service_Type": "Unknown", "Sentiment": "Neutral", "Summary": "Error"
+}
+
+
+def review_text(row_data):
+    return f"{row_data.get('Title', '')}. {row_data.get('Content', '')}"[:2000]
+
+
+def estimate_tokens(prompt, items=1):
+    # 粗略估算：输入约 3 字符/token，每条输出约 120 token；真实用量在响应后校正
+    return len(prompt) // 3 + 120 * items
+
+
+def review_cache_key(row_data, model=None):
+    # 模型是键的一部分：分流到不同模型的结果分开缓存（由备用端点给出的结果记在所属路由的模型下）
+    return cache_key(row_data.get('Title', ''), row_data.get('Content', ''), model or Config.LLM_MODEL,
+                     PROMPT_VERSION)
+
+
+async def analyze_review(router, route, row_data):
+    text = review_text(row_data)
+
+    prompt = CLASSIFY_PROMPT.format(text=text)
+
+    try:
+        response = await router.complete(
+            route,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            estimated_tokens=estimate_tokens(prompt),
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(response.choices[0].message.content)
+    except Exception as e:
+        return dict(FAILED_RESULT)
+
+
+def validate_result(item):
+    # 五个字段都必须是非空字符串，否则视为无效
+    if not isinstance(item, dict):
+        return None
+    result = {}
+    for field in RESULT_FIELDS:
+        value = item.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        result[field] = value
+    return result
+
+
+def parse_batch_response(content, size):
+    # 返回长度为 size 的列表，缺失或格式错误的条目为 None
+    results = [None] * size
+    try:
+        items = json.loads(content).get('results', [])
+    except Exception:
+        return results
+    if not isinstance(items, list):
+        return results
+    for item in items:
+        if not isinstance(item, dict):
+            continue
         try:
-            response = await client.chat.completions.create(
-                model=Config.LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": "JSON generator. Telecom expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
-        except Exception as e:
-            return {
-                "L1_Category": "Other", "L2_Issue": "Analysis Failed",
-                "Service_Type": "Unknown", "Sentiment": "Neutral", "Summary": "Error"
-            }
-
-async def run_analysis(df):
+            idx = int(item.get('index'))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= idx < size and results[idx] is None:
+            results[idx] = validate_result(item)
+    return results
+
+
+async def analyze_batch(router, route, rows):
+    reviews = "\n".join(
+        f"        [{i}] {json.dumps(review_text(r), ensure_ascii=False)}" for i, r in enumerate(rows)
+    )
+    prompt = BATCH_PROMPT.format(reviews=reviews)
+
+    try:
+        response = await router.complete(
+            route,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            estimated_tokens=estimate_tokens(prompt, len(rows)),
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        return parse_batch_response(response.choices[0].message.content, len(rows))
+    except Exception as e:
+        return [None] * len(rows)
+
+
+async def classify_rows(router, rows, batch_size=None):
+    # 按路由分组后批量分类（同一批只含同一模型的评论）；批量响应里缺失/格式错误的条目改走 strong 路由单独重试
+    batch_size = Config.LLM_BATCH_SIZE if batch_size is None else batch_size
+    routes = [router.route(r) for r in rows]
+    if batch_size <= 1:
+        return list(await asyncio.gather(*[analyze_review(router, route, r) for route, r in zip(routes, rows)]))
+
+    groups = {}
+    for i, route in enumerate(routes):
+        groups.setdefault(route, []).append(i)
+    batches = [(route, idx[j:j + batch_size]) for route, idx in groups.items() for j in range(0, len(idx), batch_size)]
+    batch_results = await asyncio.gather(*[analyze_batch(router, route, [rows[i] for i in part])
+                                           for route, part in batches])
+    results = [None] * len(rows)
+    for (_, part), batch in zip(batches, batch_results):
+        for i, r in zip(part, batch):
+            results[i] = r
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        print(f"   ↩️ 批量结果缺失 {len(missing)} 条，逐条重试")
+        retried = await asyncio.gather(*[analyze_review(router, 'strong', rows[i]) for i in missing])
+        for i, r in zip(missing, retried):
+            results[i] = r
+    return results
+
+
+def open_cache():
+    cache = ClassificationCache()
+    dropped = cache.invalidate(keep_prompt_version=PROMPT_VERSION)
+    if dropped:
+        print(f"♻️ Prompt 已变更，清理旧缓存 {dropped} 条")
+    return cache
+
+
+def open_index():
+    # 近重复索引（SEMANTIC_DEDUPE=0 时不启用）
+    return NearDupIndex() if Config.SEMANTIC_DEDUPE else None
+
+
+async def classify_records(router, cache, records, index=None, pre=None):
+    # 先查缓存：同一内容（含重复评论、重跑）只调用一次 LLM；返回与 records 对齐的结果列表。
+    # 传入近重复索引时：与已分类评论几乎相同的直接复用其结果，本批内互为近重复的只送一条给 LLM。
+    # 传入本地预分类器时：置信度够高的评论不调用 LLM（按比例抽样送审，统计与 LLM 的一致率）
+    results = [None] * len(records)
+    pending = {}
+    models = {}
+    for i, r in enumerate(records):
+        model = router.model(router.route(r))
+        key = review_cache_key(r, model)
+        cached = cache.get(key)
+        if cached is not None:
+            results[i] = dict(cached, Label_Source='llm')
+        else:
+            pending.setdefault(key, []).append(i)
+            models[key] = model
+
+    def assign(key, result, source='llm'):
+        for i in pending[key]:
+            results[i] = dict(result, Label_Source=source)
+        if source == 'llm' and result.get('L2_Issue') != FAILED_RESULT['L2_Issue']:
+            cache.put(key, result, models[key], PROMPT_VERSION)
+            return True
+        return False
+
+    # followers: 代表评论的缓存键 -> 共用其结果的全部缓存键（含自身）
+    sigs = {}
+    if index is None:
+        followers = {key: [key] for key in pending}
+    else:
+        unmatched = []
+        for key in pending:
+            sig = minhash(review_text(records[pending[key][0]]))
+            match = index.query(sig)
+            cached = cache.get(match) if match else None
+            if cached is not None:
+                assign(key, cached)
+            else:
+                unmatched.append(key)
+                sigs[key] = sig
+        reps = group_near_duplicates([sigs[key] for key in unmatched])
+        followers = {}
+        for j, key in enumerate(unmatched):
+            followers.setdefault(unmatched[reps[j]], []).append(key)
+
+    todo = list(followers)
+    audits = {}
+    if pre is not None:
+        local = pre.predict([records[pending[key][0]] for key in todo])
+        todo = []
+        for key, (result, source) in zip(followers, local):
+            if result is None:
+                todo.append(key)
+            elif pre.should_audit():
+                audits[key] = (source, result)
+                todo.append(key)
+            else:
+                pre.record(source, result)
+                for member in followers[key]:
+                    assign(member, result, source)
+
+    fresh = await classify_rows(router, [records[pending[key][0]] for key in todo])
+    for key, result in zip(todo, fresh):
+        if key in audits:
+            pre.record(audits[key][0], audits[key][1], result)
+        for member in followers[key]:
+            if assign(member, result) and member == key and index is not None:
+                index.add(sigs[key], key)
+    return results
+
+
+async def classify_resumable(router, cache, records, index=None, pre=None, checkpoint=None):
+    # 与 classify_records 相同；传入断点时已记入断点的评论直接取结果，
+    # 其余按 STORE_FLUSH_ROWS 分块分类，每块完成即记入断点
+    results = [None] * len(records)
+    todo = []
+    for i, r in enumerate(records):
+        hit = checkpoint.lookup(r) if checkpoint else None
+        if hit is None:
+            todo.append(i)
+        else:
+            results[i] = {k: v for k, v in hit.items() if k not in r}
+    if checkpoint and len(todo) < len(records):
+        print(f"   ♻️ 断点中已分类 {len(records) - len(todo)} 条，剩余 {len(todo)} 条")
+    chunk = Config.STORE_FLUSH_ROWS if checkpoint else max(1, len(todo))
+    for start in range(0, len(todo), chunk):
+        part = todo[start:start + chunk]
+        fresh = await classify_records(router, cache, [records[i] for i in part], index, pre)
+        for i, result in zip(part, fresh):
+            results[i] = result
+        if checkpoint:
+            checkpoint.add_classified([dict(records[i], **results[i]) for i in part])
+    return results
+
+
+def log_stats(router, cache, index=None, pre=None):
+    # 打印分类各层的统计，并计入运行指标
+    print(f"💾 分类缓存: {cache.stats()} (批大小 {Config.LLM_BATCH_SIZE})")
+    metrics.record('llm_cache', cache.stats())
+    if index is not None:
+        print(f"🧬 近重复去重: {index.stats()}")
+        metrics.record('near_dup', index.stats())
+    if pre is not None:
+        print(f"⚡ 本地预分类: {pre.stats()}")
+        metrics.record('preclassify', pre.stats())
+    print(f"📈 LLM 调用统计: {router.primary.controller.stats()}")
+    metrics.record('llm', router.primary.controller.stats())
+    if router.fallback:
+        print(f"🛟 备用端点调用统计: {router.fallback.controller.stats()}")
+        metrics.record('llm_fallback', router.fallback.controller.stats())
+    log_routes(router)
+
+
+def log_routes(router):
+    # 各路由的模型、延迟、故障转移与成本，用来调整分流阈值
+    for route, stats in router.stats().items():
+        print(f"🔀 路由 {route}: {stats}")
+    metrics.record('llm_route', router.stats())
+
+
+# run_scraper 输出的列（原始存储中去掉分区 / 写入时间列）
+RAW_COLUMNS = ['Operator', 'Date', 'Title', 'Content', 'Raw_Rating', 'Url', 'Review_Id', 'Location']
+
+
+def pending_reviews(days=None):
+    # 原始存储中最近 days 天、尚未成功分析（或内容在分析后又被修改）的评论，供单独的 analyze 命令使用
+    days = days or Config.DAYS_TO_SCRAPE
+    start = datetime.now() - timedelta(days=days)
+    raw = ReviewStore('raw').load(columns=RAW_COLUMNS, start=start)
+    if raw.empty:
+        return raw
+    done = ReviewStore('analyzed').load(columns=['Operator', 'Review_Id', 'Title', 'Content', 'Raw_Rating', 'L2_Issue'],
+                                        start=start)
+    # 分析失败的结果也写进了存储（最新版本），不能算作已分析
+    done = done[done['L2_Issue'].astype(object) != 'Analysis Failed']
+    seen = {(op, rid, review_hash(r)) for op, rid, r in
+            zip(done['Operator'].astype(str), done['Review_Id'], done.to_dict('records'))}
+    keep = [(op, rid, review_hash(r)) not in seen for op, rid, r in
+            zip(raw['Operator'].astype(str), raw['Review_Id'], raw.to_dict('records'))]
+    pending = raw[keep].reset_index(drop=True)
+    pending['Operator'] = pending['Operator'].astype(str)
+    print(f"📥 待分析: {len(pending)}/{len(raw)} 条 (最近 {days} 天的原始评论)")
+    return pending
+
+
+async def run_analysis(df, checkpoint=None):
     print(f"🧠 [Step 2] 启动双层分类分析...")
     if df.empty: return df
 
-    client = AsyncOpenAI(api_key=Config.LLM_API_KEY, base_url=Config.LLM_BASE_URL)
-    semaphore = asyncio.Semaphore(10)
+    router = LLMRouter()
 
     records = df.to_dict('records')
-    tasks = [analyze_review(client, semaphore, r) for r in records]
-    results = await asyncio.gather(*tasks)
+    index = open_index()
+    pre = open_preclassifier()
+    with open_cache() as cache:
+        results = await classify_resumable(router, cache, records, index, pre, checkpoint)
+        log_stats(router, cache, index, pre)
+    # 在本事件循环内关闭连接池，避免循环结束后才被回收
+    await router.close()
 
     analysis_df = pd.DataFrame(results)
     final_df = pd.concat([df, analysis_df], axis=1)
 
-    final_df.to_csv(Config.ANALYZED_FILE, index=False, encoding='utf-8-sig')
+    ReviewStore('analyzed').append(final_df)
+    metrics.count('reviews_analyzed', len(final_df))
     print(f"✅ 分析完成！包含 L1/L2 分类与摘要。")
     return final_df
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import math
+import os
+from datetime import datetime
+import numpy as np
+from src.config import Config
+
+# 位置未知时只在 运营商 × 故障 这一层检测
+ANY_LOCATION = '*'
+SEP = '\x1f'
+# 检测只用到的列（从存储回放历史时只读这些）
+EVENT_COLUMNS = ['Operator', 'Date', 'Review_Id', 'L2_Issue', 'Sentiment', 'Location']
+
+
+class CountMinSketch:
+    # 当前时间桶内每个 key 的计数估计（只会高估）；内存固定为 depth × width
+    def __init__(self, width=2048, depth=4, table=None):
+        self.table = np.zeros((depth, width), dtype=np.int64) if table is None else table
+        self.depth, self.width = self.table.shape
+        self._rows = np.arange(self.depth)
+
+    def _cols(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, key, n=1):
+        # 保守更新：只抬高低于新估计值的格子，减少哈希冲突带来的高估
+        cols = self._cols(key)
+        cells = self.table[self._rows, cols]
+        estimate = int(cells.min()) + n
+        self.table[self._rows, cols] = np.maximum(cells, estimate)
+        return estimate
+
+    def estimate(self, key):
+        return int(self.table[self._rows, self._cols(key)].min())
+
+    def clear(self):
+        self.table[:] = 0
+
+
+def event_keys(row):
+    # 一条负面评论计入 运营商×故障，位置已知时再计入 运营商×故障×位置
+    op = str(row.get('Operator', '')).strip()
+    issue = str(row.get('L2_Issue', ''))
+    keys = [SEP.join((op, issue, ANY_LOCATION))]
+    location = row.get('Location')
+    if isinstance(location, str) and location.strip() and location != 'Unknown':
+        keys.append(SEP.join((op, issue, location.strip())))
+    return keys
+
+
+def is_negative(row):
+    # 与 clean_data 一致：不含 positive 的都算负面
+    return 'positive' not in str(row.get('Sentiment', '')).lower()
+
+
+def _timestamp(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class BurstDetector:
+    # 在线突发检测：当前时间桶内用 count-min sketch 计数，每个被跟踪的 key 维护一个
+    # EWMA 基线（均值/方差）。桶内计数越过 基线 + threshold 倍标准差 且不少于 min_count 时立即报警。
+    # 被跟踪的 key 数量上限为 capacity，超出时淘汰基线最低的 key，内存有界
+    def __init__(self, bucket_hours=None, threshold=None, min_count=None, capacity=None, alpha=None):
+        self.bucket_seconds = int((bucket_hours or Config.BURST_BUCKET_HOURS) * 3600)
+        self.threshold = threshold or Config.BURST_THRESHOLD
+        self.min_count = min_count or Config.BURST_MIN_COUNT
+        self.capacity = capacity or Config.BURST_CAPACITY
+        self.alpha = alpha or Config.BURST_ALPHA
+        # 新 key 进入跟踪所需的桶内计数，以及新 key 的先验基线
+        self.admit_count = 2
+        self.prior = (0.2, 1.0)
+        # 前几个桶只用来建立基线，不报警
+        self.warmup_buckets = 4
+        self.first_bucket = None
+
+        self.sketch = CountMinSketch()
+        self.baselines = {}
+        self.bucket = None
+        self.alerts = {}
+        self._seen = set()
+        self.events = 0
+        self.late = 0
+
+    def _close_buckets(self, new_bucket):
+        # 关闭当前桶：用桶内计数更新每个被跟踪 key 的 EWMA；中间的空桶按计数 0 更新
+        gap = min(new_bucket - self.bucket, 100)
+        for step in range(gap):
+            for key, (mean, var) in self.baselines.items():
+                x = self.sketch.estimate(key) if step == 0 else 0
+                diff = x - mean
+                incr = self.alpha * diff
+                self.baselines[key] = (mean + incr, (1 - self.alpha) * (var + diff * incr))
+            if step == 0:
+                self.sketch.clear()
+        self.bucket = new_bucket
+        self._seen = set()
+
+    def _evict(self):
+        # 超出容量时一次淘汰 10% 基线最低的 key（本桶已报警的保留）
+        active = {key for (bucket, key) in self.alerts if bucket == self.bucket}
+        candidates = sorted((k for k in self.baselines if k not in active), key=lambda k: self.baselines[k][0])
+        for key in candidates[:max(1, len(self.baselines) - int(self.capacity * 0.9))]:
+            del self.baselines[key]
+
+    def score(self, key, count):
+        mean, var = self.baselines.get(key, self.prior)
+        # 方差再加上泊松项与 1，避免基线接近 0 时一两条评论就触发
+        return (count - mean) / math.sqrt(var + mean + 1)
+
+    def observe(self, row):
+        if not is_negative(row) or row.get('L2_Issue') in (None, 'Analysis Failed'):
+            return []
+        ts = _timestamp(row['Date'])
+        bucket = int(ts // self.bucket_seconds)
+        if self.bucket is None:
+            self.bucket = self.first_bucket = bucket
+        if bucket < self.bucket:
+            # 早于当前桶的评论（迟到数据）不参与检测
+            self.late += 1
+            return []
+        if bucket > self.bucket:
+            self._close_buckets(bucket)
+        review = (str(row.get('Operator')), str(row.get('Review_Id')))
+        if review in self._seen:
+            return []
+        self._seen.add(review)
+        self.events += 1
+
+        fired = []
+        for key in event_keys(row):
+            count = self.sketch.add(key)
+            if key not in self.baselines:
+                if count < self.admit_count:
+                    continue
+                self.baselines[key] = self.prior
+                if len(self.baselines) > self.capacity:
+                    self._evict()
+            if self.bucket - self.first_bucket < self.warmup_buckets:
+                continue
+            z = self.score(key, count)
+            if count >= self.min_count and z >= self.threshold:
+                alert = self.alerts.get((self.bucket, key))
+                if alert is None:
+                    op, issue, location = key.split(SEP)
+                    alert = {
+                        'bucket_start': datetime.fromtimestamp(self.bucket * self.bucket_seconds).isoformat(sep=' '),
+                        'operator': op, 'issue': issue, 'location': location,
+                        'baseline': round(self.baselines[key][0], 2),
+                        'detected_at': datetime.fromtimestamp(ts).isoformat(sep=' '),
+                    }
+                    self.alerts[(self.bucket, key)] = alert
+                    fired.append(alert)
+                alert['count'] = count
+                alert['z'] = round(z, 2)
+        return fired
+
+    def observe_rows(self, rows):
+        # 按评论时间顺序回放（抓取结果是倒序的）
+        fired = []
+        for row in sorted(rows, key=lambda r: _timestamp(r['Date'])):
+            fired.extend(self.observe(row))
+        return fired
+
+    def recent_alerts(self, since=None, limit=None):
+        # since 之后的桶里的报警，按显著性排序
+        alerts = [a for a in self.alerts.values() if since is None or a['bucket_start'] >= since.isoformat(sep=' ')]
+        alerts.sort(key=lambda a: (a['z'], a['count']), reverse=True)
+        return alerts[:limit] if limit else alerts
+
+    def prune_alerts(self, keep_buckets=30):
+        if self.bucket is not None:
+            self.alerts = {k: v for k, v in self.alerts.items() if k[0] > self.bucket - keep_buckets}
+
+    def save(self, path=None):
+        path = path or Config.BURST_STATE
+        self.prune_alerts()
+        state = {
+            'bucket_seconds': self.bucket_seconds,
+            'bucket': self.bucket,
+            'first_bucket': self.first_bucket,
+            'sketch': self.sketch.table.tolist(),
+            'baselines': self.baselines,
+            'alerts': [[bucket, key, alert] for (bucket, key), alert in self.alerts.items()],
+            'seen': sorted(self._seen),
+            'events': self.events,
+            'late': self.late,
+        }
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path=None):
+        # 读取上次运行保存的状态；不存在或时间桶大小已改变时返回全新的检测器
+        path = path or Config.BURST_STATE
+        detector = cls()
+        if not os.path.exists(path):
+            return detector
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        if state['bucket_seconds'] != detector.bucket_seconds:
+            return detector
+        detector.bucket = state['bucket']
+        detector.first_bucket = state['first_bucket']
+        detector.sketch = CountMinSketch(table=np.array(state['sketch'], dtype=np.int64))
+        detector.baselines = {k: tuple(v) for k, v in state['baselines'].items()}
+        detector.alerts = {(bucket, key): alert for bucket, key, alert in state['alerts']}
+        detector._seen = {tuple(r) for r in state['seen']}
+        detector.events = state['events']
+        detector.late = state['late']
+        return detector
+
+    def stats(self):
+        return {'events': self.events, 'late': self.late, 'tracked_keys': len(self.baselines),
+                'alerts': len(self.alerts)}
@@ -0,0 +1,380 @@
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+from src.config import Config
+from src.analyzer import RAW_COLUMNS, open_cache, classify_resumable
+from src.checkpoint import Checkpoint
+from src.fetchers import HostRateLimiter, create_fetcher
+from src.llm_router import LLMRouter
+from src.metrics import metrics
+from src.preclassifier import open_preclassifier
+from src.scraper import find_first_page, scrape_company
+from src.state import StateStore
+from src.storage import ReviewStore, REPORT_COLUMNS
+from src.trends import TrendStore
+
+
+def plan_shards(days, shard_days, operators, end=None):
+    # 按 运营商 × 时间段 切分：从 end（规划时刻）往回每 shard_days 天一段，区间为 [start, end)，相邻分片不重叠
+    end = end or datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    shards = []
+    for operator in operators:
+        hi = end
+        while hi > start:
+            lo = max(start, hi - timedelta(days=shard_days))
+            shards.append({'id': f"{operator}_{lo:%Y%m%d%H%M}_{hi:%Y%m%d%H%M}", 'operator': operator,
+                           'start': lo.isoformat(), 'end': hi.isoformat()})
+            hi = lo
+    return {'days': days, 'shard_days': shard_days, 'operators': list(operators), 'end': end.isoformat(),
+            'shards': shards}
+
+
+def shard_rate(workers):
+    # 每个分片自己的限速：SCRAPER_RATE_LIMIT，且本机所有 worker 合计不超过 BACKFILL_RATE_LIMIT（接口上限）。
+    # 因此 worker 数增加时吞吐近似线性增长，直到触及接口上限
+    rate = Config.SCRAPER_RATE_LIMIT
+    if Config.BACKFILL_RATE_LIMIT:
+        rate = min(rate, Config.BACKFILL_RATE_LIMIT / workers) if rate else Config.BACKFILL_RATE_LIMIT / workers
+    return rate
+
+
+class Backfill:
+    # 历史回溯任务。目录结构（多台机器共享同一目录即可一起跑）：
+    #   plan.json                  分片计划，第一个进程创建，之后的进程（含其他机器）沿用
+    #   locks/<分片>.lock          认领锁，内容为持有者的唯一令牌，执行中定期更新 mtime；
+    #                              超过 BACKFILL_LOCK_TIMEOUT 未更新视为失效，可被（唯一一个）其他进程接管
+    #   locks/<分片>.<令牌>.retired 锁已释放或已被接管的标记
+    #   checkpoints/<分片>/        分片的断点（抓取的页 / 分类结果），中断后重新认领时从断点继续
+    #   results/<分片>.parquet     分片结果，原子写入；存在即表示该分片已完成
+    #   merged.json                全部分片合并进存储后写入，记录行数与内容摘要
+    def __init__(self, root=None):
+        self.root = root or Config.BACKFILL_DIR
+        self.plan = None
+        # 本进程持有的锁：分片 -> 令牌
+        self._tokens = {}
+        for sub in ('locks', 'checkpoints', 'results'):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def result_path(self, shard_id):
+        return self._path('results', f"{shard_id}.parquet")
+
+    def lock_path(self, shard_id):
+        return self._path('locks', f"{shard_id}.lock")
+
+    def load_plan(self, days, shard_days, operators, end=None):
+        # 已有计划且参数一致时沿用（分片边界不随启动时间变化）；参数不同时报错，避免两份计划混在一个目录里
+        path = self._path('plan.json')
+        if not os.path.exists(path):
+            plan = plan_shards(days, shard_days, operators, end)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(plan, f, ensure_ascii=False, indent=2)
+            try:
+                # link 在目标已存在时失败：多个进程同时规划时只有一份生效
+                os.link(tmp, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        with open(path, encoding='utf-8') as f:
+            plan = json.load(f)
+        if (plan['days'], plan['shard_days'], plan['operators']) != (days, shard_days, list(operators)):
+            raise ValueError(f"{self.root} 中已有不同参数的回溯计划 (days={plan['days']}, shard_days="
+                             f"{plan['shard_days']}, operators={plan['operators']})，请换一个目录或删除后重试")
+        self.plan = plan
+        return plan
+
+    # ===========================
+    # 认领
+    # ===========================
+    def claim(self, shard_id):
+        # 锁文件内容为本次认领的唯一令牌：先写临时文件再 link 成锁，锁一出现就带着令牌（与 plan.json 相同做法）
+        path = self.lock_path(shard_id)
+        token = uuid.uuid4().hex
+        tmp = self._write_token(shard_id, token)
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            return self._take_over(shard_id, token, tmp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._tokens[shard_id] = token
+        return True
+
+    def _write_token(self, shard_id, token):
+        tmp = f"{self.lock_path(shard_id)}.{token}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(f"{token} {socket.gethostname()}:{os.getpid()}\n")
+        return tmp
+
+    def _retire(self, shard_id, token):
+        # 一把锁（按令牌区分）只能被"退役"一次：持有者释放或某一个接管者，谁先 O_EXCL 建出标记谁有权改动这把锁。
+        # 标记文件保留，迟到的接管者拿着同一个旧令牌也不会再次成功
+        try:
+            os.close(os.open(self._path('locks', f"{shard_id}.{token}.retired"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def _take_over(self, shard_id, token, tmp):
+        # 锁超过 BACKFILL_LOCK_TIMEOUT 未更新时接管：只有退役成功的进程才能用自己的锁原子替换旧锁
+        path = self.lock_path(shard_id)
+        try:
+            with open(path, encoding='utf-8') as f:
+                age = time.time() - os.fstat(f.fileno()).st_mtime
+                owner = f.read().split()[0]
+        except FileNotFoundError:
+            # 锁刚被释放
+            return self.claim(shard_id)
+        if age < Config.BACKFILL_LOCK_TIMEOUT or not self._retire(shard_id, owner):
+            return False
+        os.replace(tmp, path)
+        self._tokens[shard_id] = token
+        print(f"⚠️ 分片 {shard_id} 的锁已 {age:.0f}s 未更新，接管")
+        return True
+
+    def _owner(self, shard_id):
+        try:
+            with open(self.lock_path(shard_id), encoding='utf-8') as f:
+                return f.read().split()[0]
+        except FileNotFoundError:
+            return None
+
+    def owns(self, shard_id):
+        # 锁仍由本进程持有（未被接管、未释放）
+        token = self._tokens.get(shard_id)
+        return token is not None and self._owner(shard_id) == token and \
+            not os.path.exists(self._path('locks', f"{shard_id}.{token}.retired"))
+
+    def heartbeat(self, shard_id):
+        # 只续期本进程持有的锁；锁已被其他进程接管时返回 False
+        if not self.owns(shard_id):
+            return False
+        try:
+            os.utime(self.lock_path(shard_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, shard_id):
+        # 只删除本进程持有、且尚未被接管的锁
+        token = self._tokens.pop(shard_id, None)
+        if token is None or not self._retire(shard_id, token):
+            return
+        try:
+            os.remove(self.lock_path(shard_id))
+        except FileNotFoundError:
+            pass
+
+    def status(self):
+        # 各分片状态：done / running / pending
+        out = {}
+        for shard in self.plan['shards']:
+            lock = self.lock_path(shard['id'])
+            if os.path.exists(self.result_path(shard['id'])):
+                out[shard['id']] = 'done'
+            elif os.path.exists(lock) and time.time() - os.path.getmtime(lock) < Config.BACKFILL_LOCK_TIMEOUT:
+                out[shard['id']] = 'running'
+            else:
+                out[shard['id']] = 'pending'
+        return out
+
+    # ===========================
+    # 执行
+    # ===========================
+    async def run(self, workers=None):
+        # 未完成的分片交给进程池（workers=1 时在本进程内依次执行）；被其他进程/机器认领的分片跳过
+        workers = max(1, workers or Config.BACKFILL_WORKERS)
+        todo = [s for s in self.plan['shards'] if not os.path.exists(self.result_path(s['id']))]
+        rate = shard_rate(workers)
+        print(f"⏪ 回溯计划: {len(self.plan['shards'])} 个分片，待完成 {len(todo)} | worker: {workers} | "
+              f"每个分片限速 {rate or '不限'} 次/秒 | 目录: {self.root}")
+        # 本地分类模型过期时先在主进程里重新训练一次，各分片直接加载
+        open_preclassifier()
+        # 子进程不一定继承命令行对 Config 的修改（spawn 启动方式），显式传过去
+        settings = {k: v for k, v in vars(Config).items() if k.isupper()}
+        start = time.perf_counter()
+        if workers == 1 or len(todo) <= 1:
+            results = [await run_shard_async(self.root, shard, rate) for shard in todo]
+        else:
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(pool, run_shard, self.root, shard, rate, settings) for shard in todo
+                ])
+        seconds = time.perf_counter() - start
+
+        done = [r for r in results if r['status'] == 'done']
+        rows = sum(r['rows'] for r in done)
+        stats = {'shards': len(self.plan['shards']), 'ran': len(done),
+                 'skipped': sum(r['status'] == 'skipped' for r in results),
+                 'failed': sum(r['status'] == 'failed' for r in results),
+                 'rows': rows, 'pages': sum(r['pages'] for r in done),
+                 'llm_requests': sum(r['llm_requests'] for r in done),
+                 'rows_per_sec': round(rows / seconds, 1) if seconds else 0.0}
+        for r in results:
+            if r['status'] == 'failed':
+                print(f"   ❌ 分片 {r['id']} 失败: {r['error']}（重跑时从断点继续）")
+        print(f"📦 回溯: {stats}")
+        metrics.record('backfill', stats)
+        return stats
+
+    # ===========================
+    # 合并
+    # ===========================
+    def merge(self):
+        # 全部分片完成后按确定的顺序合并：按分片 id 读取，按 运营商 / 时间 / 评论 id 排序并去重，
+        # 因此无论分片由哪个进程、哪台机器、以什么顺序完成，写入存储的内容都相同
+        status = self.status()
+        pending = [s for s, st in status.items() if st != 'done']
+        if pending:
+            print(f"⏳ 还有 {len(pending)} 个分片未完成，暂不合并: {pending[:5]}{' ...' if len(pending) > 5 else ''}")
+            return None
+        marker = self._path('merged.json')
+        if os.path.exists(marker):
+            with open(marker, encoding='utf-8') as f:
+                print(f"ℹ️ 回溯结果已合并过: {json.load(f)}")
+            return None
+        if not self.claim('merge'):
+            print("ℹ️ 其他进程正在合并")
+            return None
+        try:
+            frames = [pd.read_parquet(self.result_path(shard_id)) for shard_id in sorted(status)]
+            frames = [df for df in frames if not df.empty]
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RAW_COLUMNS)
+            if not df.empty:
+                df = (df.sort_values(['Operator', 'Date', 'Review_Id'], kind='mergesort')
+                        .drop_duplicates(['Operator', 'Review_Id'], keep='first')
+                        .reset_index(drop=True))
+                # 升级前跑完的分片结果可能缺少新加的列（如 Location），补为空值
+                ReviewStore('raw').append(df.reindex(columns=RAW_COLUMNS))
+                ReviewStore('analyzed').append(df)
+                self._update_state(df)
+                self._update_trends()
+            digest = hashlib.sha1("\n".join(
+                f"{r.Operator}\x1f{r.Review_Id}\x1f{r.L1_Category}\x1f{r.L2_Issue}" for r in df.itertuples()
+            ).encode('utf-8')).hexdigest() if not df.empty else None
+            summary = {'rows': len(df), 'shards': len(status), 'digest': digest,
+                       'merged_at': datetime.now().isoformat(timespec='seconds')}
+            with open(marker + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            os.replace(marker + '.tmp', marker)
+        finally:
+            self.release('merge')
+        print(f"🧩 回溯结果已合并进存储: {summary['rows']} 条 (摘要 {str(digest)[:12]})")
+        return df
+
+    def _update_state(self, df):
+        # 回溯到的评论记为已见，之后的增量抓取碰到它们即停止；分析失败的记入重试（仍在抓取窗口内的会被重新抓取）
+        if Config.INCREMENTAL:
+            failed = df['L2_Issue'] == 'Analysis Failed'
+            with StateStore() as state:
+                state.mark_seen(df[~failed].to_dict('records'))
+                state.mark_failed(df[failed].to_dict('records'))
+
+    def _update_trends(self):
+        # 趋势库按日替换回溯范围内的完整日期（首尾两天不完整，不写入）；计数取自合并后的存储
+        from src.reporter import clean_data
+        start = datetime.fromisoformat(self.plan['end']) - timedelta(days=self.plan['days'])
+        end_day = datetime.fromisoformat(self.plan['end']).date()
+        history = clean_data(ReviewStore('analyzed').load(columns=REPORT_COLUMNS, start=start))
+        if history.empty:
+            return
+        with TrendStore() as trends:
+            trends.update(history, since=start.date() + timedelta(days=1), until=end_day)
+
+
+# ===========================
+# 单个分片（在 worker 进程中执行）
+# ===========================
+def run_shard(root, shard, rate, settings=None):
+    for key, value in (settings or {}).items():
+        setattr(Config, key, value)
+    return asyncio.run(run_shard_async(root, shard, rate))
+
+
+async def run_shard_async(root, shard, rate):
+    job = Backfill(root)
+    shard_id = shard['id']
+    result = {'id': shard_id, 'status': 'skipped', 'rows': 0, 'pages': 0, 'llm_requests': 0}
+    if not job.claim(shard_id):
+        return result
+    # 执行期间后台定期刷新锁，长时间的 LLM 分类也不会被其他进程误判为失效；
+    # 锁仍被接管（如本进程长时间停顿）时心跳取消本分片的工作，接管者的断点与锁不能再被本进程改动
+    lost = asyncio.Event()
+    beat = asyncio.create_task(_heartbeat(job, shard_id, asyncio.current_task(), lost))
+    path = os.path.join(job._path('checkpoints'), shard_id)
+    checkpoint = Checkpoint(shard_id, resume=os.path.isdir(path), root=job._path('checkpoints'), max_age_hours=0)
+    try:
+        if os.path.exists(job.result_path(shard_id)):
+            return result
+        start = time.perf_counter()
+        rows, llm = await _scrape_and_classify(shard, rate, checkpoint)
+        df = pd.DataFrame(rows)
+        tmp = f"{job.result_path(shard_id)}.{job._tokens[shard_id]}.tmp"
+        df.to_parquet(tmp, index=False)
+        # 写结果、删断点之前再确认一次锁仍归本进程（心跳间隔内也可能被接管）
+        if not job.owns(shard_id):
+            os.remove(tmp)
+            print(f"⚠️ 分片 {shard_id} 的锁已被其他进程接管，放弃本次结果")
+            return result
+        os.replace(tmp, job.result_path(shard_id))
+        pages = len(checkpoint.pages.get(shard['operator'], {}))
+        if job.owns(shard_id):
+            checkpoint.discard()
+        print(f"   ✅ 分片 {shard_id}: {len(df)} 条 / {pages} 页, 用时 {time.perf_counter() - start:.1f}s")
+        return dict(result, status='done', rows=len(df), pages=pages, llm_requests=llm)
+    except asyncio.CancelledError:
+        if not lost.is_set():
+            raise
+        return result
+    except Exception as e:
+        return dict(result, status='failed', error=repr(e))
+    finally:
+        checkpoint.close()
+        beat.cancel()
+        # release 只删除本进程令牌对应、且尚未被接管的锁
+        job.release(shard_id)
+
+
+async def _heartbeat(job, shard_id, task, lost):
+    while True:
+        await asyncio.sleep(Config.BACKFILL_LOCK_TIMEOUT / 3)
+        if not job.heartbeat(shard_id):
+            print(f"⚠️ 分片 {shard_id} 的锁已被其他进程接管，停止本进程的抓取与分类")
+            lost.set()
+            task.cancel()
+            return
+
+
+async def _scrape_and_classify(shard, rate, checkpoint):
+    # 每个分片自己的限速器、LLM 客户端与断点；分片之间不共享近重复索引（内存映射文件不支持多进程写）
+    operator = shard['operator']
+    start, end = datetime.fromisoformat(shard['start']), datetime.fromisoformat(shard['end'])
+    async with create_fetcher(limiter=HostRateLimiter(rate)) as fetcher:
+        _, next_page, finished = checkpoint.resume_company(operator)
+        first_page = 1 if next_page or finished else await find_first_page(fetcher, operator, end)
+        rows = await scrape_company(fetcher, operator, start, checkpoint=checkpoint, until=end,
+                                    first_page=first_page)
+    if not checkpoint.resume_company(operator)[2]:
+        raise RuntimeError("抓取中断")
+
+    router = LLMRouter()
+    try:
+        with open_cache() as cache:
+            results = await classify_resumable(router, cache, rows, None, open_preclassifier(), checkpoint)
+    finally:
+        await router.close()
+    return [dict(r, **res) for r, res in zip(rows, results)], router.requests
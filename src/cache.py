@@ -0,0 +1,107 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from src.config import Config
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    # 大小写、首尾空白、连续空白不影响分类结果，归一化后复制粘贴的评论可以命中同一条缓存
+    return _WS_RE.sub(" ", str(text or "")).strip().lower()
+
+
+def cache_key(title, content, model, prompt_version):
+    raw = "\x1f".join([normalize_text(title), normalize_text(content), model, prompt_version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ClassificationCache:
+    # LLM 分类结果的磁盘缓存（内容寻址），支持 TTL + 条数上限（按最近访问淘汰）
+    def __init__(self, path=None, ttl_days=None, max_entries=None):
+        self.path = path or Config.LLM_CACHE_DB
+        self.ttl = (Config.LLM_CACHE_TTL_DAYS if ttl_days is None else ttl_days) * 86400
+        self.max_entries = Config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS classifications (
+                key TEXT PRIMARY KEY,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cls_accessed ON classifications (accessed_at);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.evict()
+        self.conn.close()
+
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT value, created_at FROM classifications WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or (self.ttl and now - row[1] > self.ttl):
+            self.misses += 1
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE classifications SET accessed_at = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value, model, prompt_version):
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?, ?, ?)",
+                (key, prompt_version, model, json.dumps(value, ensure_ascii=False), now, now)
+            )
+        self.writes += 1
+
+    def evict(self):
+        # 先删过期，再按最近访问时间删到条数上限以内
+        with self.conn:
+            if self.ttl:
+                cur = self.conn.execute("DELETE FROM classifications WHERE created_at < ?", (time.time() - self.ttl,))
+                self.evictions += cur.rowcount
+            if self.max_entries:
+                cur = self.conn.execute("""
+                    DELETE FROM classifications WHERE key IN (
+                        SELECT key FROM classifications ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+                self.evictions += cur.rowcount
+
+    def invalidate(self, keep_prompt_version=None):
+        # 不传参数清空全部；传入当前 prompt 版本则只删除旧版本 prompt 的结果
+        with self.conn:
+            if keep_prompt_version is None:
+                cur = self.conn.execute("DELETE FROM classifications")
+            else:
+                cur = self.conn.execute(
+                    "DELETE FROM classifications WHERE prompt_version != ?", (keep_prompt_version,)
+                )
+        return cur.rowcount
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses, "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
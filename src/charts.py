@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from src.config import Config
+from src.metrics import metrics
+from src.semantic import canonical_issues
+from src.trends import last_complete_day
+
+# 绘图代码有改动时递增，使旧的渲染缓存失效
+RENDER_VERSION = "2"
+
+_theme_applied = False
+
+
+def chart_style():
+    # 影响图片外观的全部配置，一并计入缓存键，并随任务传给子进程
+    return {
+        "dpi": Config.IMG_DPI,
+        "theme": Config.PLOT_THEME,
+        "brand_colors": Config.BRAND_COLORS,
+        "sentiment_colors": Config.SENTIMENT_COLORS,
+    }
+
+
+def _plotting(style):
+    # 只在真正绘图时（通常是子进程里）才导入 matplotlib / seaborn
+    global _theme_applied
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    if not _theme_applied:
+        sns.set_theme(**style["theme"])
+        _theme_applied = True
+    return plt, sns
+
+
+# ===========================
+# 输入：从聚合表中取出绘图所需的小数据（可 JSON 序列化）
+# ===========================
+def trend_inputs(cube, trends=None):
+    operators = sorted(cube.operators)
+    series = {}
+    rolling = {}
+    for op in operators:
+        trend = cube.totals(['Day', 'Sentiment'], Operator=op).sort_index()
+        series[op] = [[str(day), str(sentiment), int(n)] for (day, sentiment), n in trend.items()]
+        if trends is not None and len(trend):
+            # 投诉 7 天滑动日均（来自历史趋势库，窗口起点之前的数据也计入）
+            # 当天不在趋势库中，滑动日均只画到最近一个完整的日期
+            days = [day for day, _ in trend.index]
+            end = last_complete_day(max(days))
+            rolling[op] = [[str(day), v] for day, v in
+                           trends.rolling_series(op, 'Negative', min(days), end, window=7)
+                           if trends.covers(day, 7)] if min(days) <= end else []
+    return {"operators": operators, "series": series, "rolling": rolling}
+
+
+def category_inputs(cube, trends=None):
+    neg = cube.totals(['Operator', 'L1_Category'], Sentiment='Negative')
+    if neg.empty:
+        return None
+    cat = neg.unstack(fill_value=0).sort_index().sort_index(axis=1)
+    return {
+        "operators": [str(op) for op in cat.index],
+        "categories": [str(c) for c in cat.columns],
+        "counts": [[int(v) for v in row] for row in cat.to_numpy()],
+    }
+
+
+def deep_dive_inputs(cube, trends=None):
+    neg_ops = cube.totals('Operator', Sentiment='Negative')
+    if neg_ops.empty:
+        return None
+    # LLM 给出的 L2 写法不统一（大小写、单复数、同义改写），先归并成规范问题再统计；
+    # 只在同一 L1 分类内归并，避免不同类别下字面相近的问题被合并
+    by_l1 = {}
+    for (l1, issue), n in cube.totals(['L1_Category', 'L2_Issue'], Sentiment='Negative').items():
+        by_l1.setdefault(str(l1), {})[str(issue)] = int(n)
+    canon = {l1: canonical_issues(counts) for l1, counts in by_l1.items()}
+    panels = {}
+    for op in sorted(str(op) for op in neg_ops.index):
+        l1_counts = cube.totals('L1_Category', Operator=op, Sentiment='Negative')
+        top_l1 = l1_counts.idxmax()
+        merged = {}
+        for issue, n in cube.totals('L2_Issue', Operator=op, Sentiment='Negative', L1_Category=top_l1).items():
+            name = canon[str(top_l1)][str(issue)]
+            merged[name] = merged.get(name, 0) + int(n)
+        issues = sorted(merged.items(), key=lambda kv: -kv[1])[:5]
+        panels[op] = {
+            "top_l1": str(top_l1),
+            "issues": [[issue, n] for issue, n in issues if n >= 3],
+        }
+    return {"operators": list(panels), "panels": panels}
+
+
+# ===========================
+# 渲染：只依赖输入数据和 style，可在子进程中执行
+# ===========================
+def _grid(plt, n):
+    rows = (n + 1) // 2
+    fig, axes = plt.subplots(rows, 2, figsize=(10, 3.5 * rows), layout='constrained')
+    axes = axes.flatten()
+    for ax in axes[n:]:
+        fig.delaxes(ax)
+    return fig, axes
+
+
+def render_trend(data, style):
+    import pandas as pd
+    plt, sns = _plotting(style)
+    fig, axes = _grid(plt, len(data["operators"]))
+
+    for i, op in enumerate(data["operators"]):
+        ax = axes[i]
+        trend = pd.DataFrame(data["series"][op], columns=['Day', 'Sentiment', 'Count'])
+        if not trend.empty:
+            trend['Day'] = pd.to_datetime(trend['Day']).dt.date
+            sns.lineplot(data=trend, x='Day', y='Count', hue='Sentiment',
+                         hue_order=sorted(trend['Sentiment'].unique()),
+                         palette=style["sentiment_colors"], marker='o', ax=ax)
+            if data["rolling"].get(op):
+                avg = pd.DataFrame(data["rolling"][op], columns=['Day', 'Avg'])
+                ax.plot(pd.to_datetime(avg['Day']).dt.date, avg['Avg'], linestyle='--', linewidth=1.2,
+                        color=style["sentiment_colors"].get('Negative', '#333'), label='Negative 7d avg')
+            ax.set_title(op, fontweight='bold', color=style["brand_colors"].get(op, '#333'))
+            ax.set_xlabel('')
+            if i == 0: ax.legend(title='', loc='upper left', frameon=False)
+            else:
+                if ax.get_legend(): ax.get_legend().remove()
+        else:
+            ax.text(0.5, 0.5, "No Data", ha='center')
+    return fig
+
+
+def render_category(data, style):
+    import pandas as pd
+    plt, sns = _plotting(style)
+    fig, ax = plt.subplots(figsize=(8, 4), layout='constrained')
+    cat_data = pd.DataFrame(data["counts"],
+                            index=pd.Index(data["operators"], name='Operator'),
+                            columns=pd.Index(data["categories"], name='L1_Category'))
+    cat_data = cat_data.div(cat_data.sum(axis=1), axis=0) * 100
+    cat_data.plot(kind='bar', stacked=True, colormap='Spectral', width=0.8, ax=ax)
+    ax.set_title('Complaint Categories', fontweight='bold')
+    ax.legend(bbox_to_anchor=(1, 1), frameon=False, fontsize='small')
+    ax.tick_params(axis='x', labelrotation=0)
+    sns.despine(ax=ax)
+    return fig
+
+
+def render_deep_dive(data, style):
+    import pandas as pd
+    plt, sns = _plotting(style)
+    fig, axes = _grid(plt, len(data["operators"]))
+
+    for i, op in enumerate(data["operators"]):
+        ax = axes[i]
+        panel = data["panels"][op]
+        counts = pd.DataFrame(panel["issues"], columns=['Issue', 'Count'])
+        color = style["brand_colors"].get(op, '#333')
+        if not counts.empty:
+            sns.barplot(data=counts, x='Count', y='Issue', ax=ax, color=color)
+            ax.set_title(f"{op}: {panel['top_l1']}", fontweight='bold', color=color, fontsize=10)
+            ax.set_xlabel('')
+            ax.set_ylabel('')
+            ax.tick_params(axis='y', labelsize=8)
+        else:
+            ax.text(0.5, 0.5, "No Major Issues", ha='center')
+            ax.set_title(op, color=color)
+    return fig
+
+
+CHARTS = {
+    "trend": (trend_inputs, render_trend),
+    "category": (category_inputs, render_category),
+    "deep_dive": (deep_dive_inputs, render_deep_dive),
+}
+
+
+def render_png(name, data, style):
+    # constrained layout 已在创建 figure 时排好版，保存时不再需要 bbox_inches='tight' 的二次测量
+    plt, _ = _plotting(style)
+    fig = CHARTS[name][1](data, style)
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=style["dpi"])
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def chart_key(name, data, style):
+    raw = json.dumps([RENDER_VERSION, name, data, style], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def prune_cache(max_age_days=14):
+    # 渲染缓存只为同一批数据的重跑服务，超过两周的图片直接清理
+    if not os.path.isdir(Config.CHART_CACHE_DIR):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for entry in os.scandir(Config.CHART_CACHE_DIR):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+
+def chart_inputs(jobs, trends=None):
+    # jobs: {key: (图表名, cube)} -> {key: (图表名, 绘图数据)}；读取趋势库，须在打开趋势库的线程中调用
+    return {key: (name, CHARTS[name][0](cube, trends)) for key, (name, cube) in jobs.items()}
+
+
+def render_jobs(jobs, trends=None):
+    # jobs: {key: (图表名, cube)}，可来自多份报告的不同运营商视图；全部放进同一个进程池并行渲染，
+    # 输入数据+样式相同的图（缓存中已有，或本批内重复）只画一次。返回 {key: PNG 字节或 None}
+    return render_inputs(chart_inputs(jobs, trends))
+
+
+def render_inputs(inputs):
+    # 渲染 chart_inputs 的结果；不访问趋势库，可以放到线程里执行
+    start = time.perf_counter()
+    style = chart_style()
+    os.makedirs(Config.CHART_CACHE_DIR, exist_ok=True)
+    prune_cache()
+
+    results = {}
+    paths = {}
+    todo = {}
+    for key, (name, data) in inputs.items():
+        if data is None:
+            results[key] = None
+            continue
+        path = os.path.join(Config.CHART_CACHE_DIR, f"{chart_key(name, data, style)}.png")
+        paths[key] = path
+        if not os.path.exists(path):
+            todo[path] = (name, data)
+
+    if len(todo) > 1 and Config.CHART_WORKERS > 1:
+        with ProcessPoolExecutor(max_workers=min(Config.CHART_WORKERS, len(todo))) as pool:
+            futures = {path: pool.submit(render_png, name, data, style) for path, (name, data) in todo.items()}
+            rendered = {path: future.result() for path, future in futures.items()}
+    else:
+        rendered = {path: render_png(name, data, style) for path, (name, data) in todo.items()}
+
+    for path, png in rendered.items():
+        with open(path + '.tmp', 'wb') as f:
+            f.write(png)
+        os.replace(path + '.tmp', path)
+    for key, path in paths.items():
+        if path in rendered:
+            results[key] = rendered[path]
+        else:
+            with open(path, 'rb') as f:
+                results[key] = f.read()
+
+    elapsed = time.perf_counter() - start
+    metrics.count('charts_rendered', len(rendered))
+    metrics.count('charts_reused', len(inputs) - len(rendered))
+    metrics.count('chart_render_ms', round(elapsed * 1000))
+    print(f"🎨 图表渲染: {len(rendered)} 张新绘制, {len(inputs) - len(rendered)} 张命中缓存/重复/无数据, "
+          f"用时 {elapsed:.2f}s")
+    return results
+
+
+def render_charts(cube, names=None, trends=None):
+    # 并行渲染一个 cube 的全部图表。返回 {name: BytesIO 或 None}
+    names = names or list(CHARTS)
+    results = render_jobs({name: (name, cube) for name in names}, trends)
+    return {name: (BytesIO(png) if png else None) for name, png in results.items()}
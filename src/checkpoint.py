@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from src.config import Config
+from src.state import review_hash
+
+
+def _encode(value):
+    # 行里的 datetime / pandas.Timestamp / numpy 标量转成 JSON 可写的值
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _decode(row):
+    if isinstance(row.get('Date'), str):
+        row['Date'] = datetime.fromisoformat(row['Date'])
+    return row
+
+
+def row_key(row):
+    # 同一条评论同一版本内容只分类一次
+    return str(row['Operator']), str(row['Review_Id']), review_hash(row)
+
+
+class Checkpoint:
+    # 一次运行的断点：CHECKPOINT_DIR/<命令>/ 下的只追加 JSONL 日志，每条记录写入后 fsync。
+    #   pages.jsonl       每抓完一页记一条（该页的行 + 页码），运营商抓完时记结束标记
+    #   classified.jsonl  每分类完一批记一条（带分类结果的行）
+    #   stages.jsonl      已完成的阶段 / 已送达的报告
+    # 进程崩溃最多丢掉正在写的最后一行（读取时跳过不完整的行）。--resume 时从日志恢复，只做剩下的工作；
+    # 整个命令成功结束后删除断点
+    def __init__(self, command, resume=False, root=None, max_age_hours=None):
+        self.path = os.path.join(root or Config.CHECKPOINT_DIR, command)
+        self.command = command
+        self.max_age_hours = Config.CHECKPOINT_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+        self._files = {}
+        self.pages = {}
+        self.finished = set()
+        self.classified = {}
+        self.stages = set()
+        meta = self._load_meta()
+        if resume and self._resumable(meta):
+            self.meta = meta
+            self._replay()
+            print(f"♻️ 从断点恢复 ({self.path}): 已抓取 {sum(len(r) for p in self.pages.values() for r in p.values())} 条"
+                  f" / 已分类 {len(self.classified)} 条 / 已完成阶段 {sorted(self.stages) or '-'}")
+        else:
+            if meta is not None:
+                print(f"🗑️ 丢弃未完成的断点 {self.path}" + ("" if resume else "（未指定 --resume）"))
+            self.discard()
+            now = datetime.now().replace(microsecond=0)
+            # 时间窗口在首次运行时确定，恢复时沿用，保证前后两段抓取的范围一致
+            self.meta = {'command': command, 'started_at': now.isoformat(),
+                         'cutoff': (now - timedelta(days=Config.DAYS_TO_SCRAPE)).isoformat(),
+                         'operators': Config.TARGET_OPERATORS}
+            os.makedirs(self.path, exist_ok=True)
+            self._write_json('meta.json', self.meta)
+        self.cutoff = datetime.fromisoformat(self.meta['cutoff'])
+
+    def _load_meta(self):
+        try:
+            with open(os.path.join(self.path, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _resumable(self, meta):
+        if meta is None:
+            print("ℹ️ 没有可恢复的断点，重新开始")
+            return False
+        age = datetime.now() - datetime.fromisoformat(meta['started_at'])
+        if self.max_age_hours and age > timedelta(hours=self.max_age_hours):
+            print(f"⚠️ 断点已过期（{age}），重新开始")
+            return False
+        if meta.get('operators') != Config.TARGET_OPERATORS:
+            print(f"⚠️ 断点的运营商范围 {meta.get('operators')} 与本次不同，重新开始")
+            return False
+        return True
+
+    def _write_json(self, name, data):
+        path = os.path.join(self.path, name)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _read(self, name):
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            return
+        good = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError(line)
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                yield record
+        # 崩溃时写了一半的最后一行：截掉，否则恢复后追加的记录会接在半行后面，下次恢复时一起丢失
+        if good < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good)
+
+    def _replay(self):
+        for rec in self._read('pages.jsonl'):
+            if rec.get('done'):
+                self.finished.add(rec['company'])
+            else:
+                self.pages.setdefault(rec['company'], {})[rec['page']] = [_decode(r) for r in rec['rows']]
+        for rec in self._read('classified.jsonl'):
+            for row in rec['rows']:
+                row = _decode(row)
+                self.classified[row_key(row)] = row
+        self.stages = {rec['stage'] for rec in self._read('stages.jsonl')}
+
+    def _append(self, name, record):
+        f = self._files.get(name)
+        if f is None:
+            f = self._files[name] = open(os.path.join(self.path, name), 'a', encoding='utf-8')
+        f.write(json.dumps(record, ensure_ascii=False, default=_encode) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    # ===========================
+    # 抓取
+    # ===========================
+    def resume_company(self, company):
+        # 返回 (已抓取的行, 下一个要抓的页码（还没抓过任何页时为 None）, 是否已抓完)
+        pages = self.pages.get(company, {})
+        rows = [row for n in sorted(pages) for row in pages[n]]
+        return rows, max(pages) + 1 if pages else None, company in self.finished
+
+    def add_page(self, company, page, rows):
+        self.pages.setdefault(company, {})[page] = rows
+        self._append('pages.jsonl', {'company': company, 'page': page, 'rows': rows})
+
+    def finish_company(self, company):
+        self.finished.add(company)
+        self._append('pages.jsonl', {'company': company, 'done': True})
+
+    # ===========================
+    # 分类
+    # ===========================
+    def lookup(self, row):
+        # 该评论（同一版本内容）已分类时返回带结果的行，否则返回 None
+        return self.classified.get(row_key(row))
+
+    def split(self, rows):
+        # 返回 (已分类的行, 仍需分类的行)
+        done, todo = [], []
+        for row in rows:
+            hit = self.lookup(row)
+            if hit is None:
+                todo.append(row)
+            else:
+                done.append(hit)
+        return done, todo
+
+    def add_classified(self, rows):
+        # 分析失败的行不记入，恢复时重新分类
+        rows = [r for r in rows if r.get('L2_Issue') != 'Analysis Failed']
+        if not rows:
+            return
+        for row in rows:
+            self.classified[row_key(row)] = row
+        self._append('classified.jsonl', {'rows': rows})
+
+    def classified_rows(self):
+        return list(self.classified.values())
+
+    # ===========================
+    # 阶段
+    # ===========================
+    def done(self, stage):
+        return stage in self.stages
+
+    def mark(self, stage):
+        self.stages.add(stage)
+        self._append('stages.jsonl', {'stage': stage, 'at': datetime.now().isoformat(timespec='seconds')})
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def discard(self):
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def complete(self):
+        # 命令成功结束：断点不再需要
+        self.discard()
+        print(f"🧹 运行完成，已清理断点 {self.path}")
+
+
+def open_checkpoint(command, resume=False):
+    # CHECKPOINT=0 时不记录断点
+    return Checkpoint(command, resume) if Config.CHECKPOINT else None
@@ -1,3 +1,4 @@
+import json
 import os
 
 # 尝试加载本地 .env (用于本地调试)
@@ -8,26 +9,124 @@ except ImportError:
     pass
 
 class Config:
-    # 基础路径
-    RAW_FILE = "raw_reviews.csv"
-    ANALYZED_FILE = "analyzed_reviews.csv"
+    # 基础路径：原始 / 已分析评论按 运营商+周 分区存为 Parquet（DATA_DIR/raw, DATA_DIR/analyzed），只追加
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    # 流水线模式下攒够多少行写一次存储（避免产生大量小文件）
+    STORE_FLUSH_ROWS = int(os.getenv("STORE_FLUSH_ROWS", "500"))
+    # 增量模式：状态库记录已抓取的评论，存储中累积全部已分析的评论
+    INCREMENTAL = os.getenv("INCREMENTAL", "1") == "1"
+    STATE_DB = os.getenv("STATE_DB", "scraper_state.db")
+    # 趋势库：按日累计的评论数，用于滑动均值与周/月环比
+    TREND_DB = os.getenv("TREND_DB", "trends.db")
+    # 突发检测：按时间桶统计 运营商×故障(×位置) 的投诉数，超出 EWMA 基线 BURST_THRESHOLD 倍标准差即报警
+    BURST_STATE = os.getenv("BURST_STATE", "burst_state.json")
+    BURST_BUCKET_HOURS = float(os.getenv("BURST_BUCKET_HOURS", "12"))
+    BURST_THRESHOLD = float(os.getenv("BURST_THRESHOLD", "3"))
+    BURST_MIN_COUNT = int(os.getenv("BURST_MIN_COUNT", "3"))
+    BURST_CAPACITY = int(os.getenv("BURST_CAPACITY", "5000"))
+    BURST_ALPHA = float(os.getenv("BURST_ALPHA", "0.1"))
+    # 运行指标：各阶段耗时/内存与计数，写出 JSON 清单（METRICS_DIR）与 Prometheus textfile
+    METRICS = os.getenv("METRICS", "1") == "1"
+    METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+    METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE", os.path.join(METRICS_DIR, "hellopeter.prom"))
+    # 可选剖析整个运行：cprofile 或 pyinstrument（需另行安装），结果写入 METRICS_DIR
+    PROFILE = os.getenv("PROFILE", "").lower()
+    # 断点：抓取的页与分类结果边跑边追加到 CHECKPOINT_DIR 下的 JSONL 日志（fsync），
+    # 失败后以 --resume 重跑只做剩下的工作；超过 CHECKPOINT_MAX_AGE_HOURS 的断点不再恢复
+    CHECKPOINT = os.getenv("CHECKPOINT", "1") == "1"
+    CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "checkpoint")
+    CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "24"))
+    # 历史回溯（main.py backfill）：按 运营商 × BACKFILL_SHARD_DAYS 天切成分片，进程池并行执行；
+    # 计划、认领锁、断点与分片结果都在 BACKFILL_DIR 下，多台机器共享该目录即可一起跑。
+    # 每个分片按 SCRAPER_RATE_LIMIT 限速，本机全部 worker 合计不超过 BACKFILL_RATE_LIMIT 次/秒（0 = 不设合计上限）
+    BACKFILL_DIR = os.getenv("BACKFILL_DIR", "backfill")
+    BACKFILL_DAYS = int(os.getenv("BACKFILL_DAYS", "365"))
+    BACKFILL_SHARD_DAYS = int(os.getenv("BACKFILL_SHARD_DAYS", "30"))
+    BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+    BACKFILL_RATE_LIMIT = float(os.getenv("BACKFILL_RATE_LIMIT", "8"))
+    BACKFILL_LOCK_TIMEOUT = float(os.getenv("BACKFILL_LOCK_TIMEOUT", "900"))
+    # 流水线模式：抓取与分类同时进行（STREAMING=0 时退回分阶段执行）
+    STREAMING = os.getenv("STREAMING", "1") == "1"
+    PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "16"))
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
     
     # 爬虫配置
     TARGET_OPERATORS = ["vodacom", "mtn", "telkom", "rain-internet-service-provider"]
     DAYS_TO_SCRAPE = 7
+    # 抓取后端：http（默认，直连 JSON API）或 playwright（可选回退，需要 Chromium）
+    SCRAPER_BACKEND = os.getenv("SCRAPER_BACKEND", "http")
+    HELLOPETER_API_BASE = os.getenv("HELLOPETER_API_BASE", "https://api.hellopeter.com")
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+    # 并发抓取：连接池 / 页面池大小 / 每个 host 每秒请求数 / 每个运营商同时预取的页数
+    SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", "4"))
+    SCRAPER_RATE_LIMIT = float(os.getenv("SCRAPER_RATE_LIMIT", "2"))
+    SCRAPER_PAGE_WINDOW = int(os.getenv("SCRAPER_PAGE_WINDOW", "3"))
     
     # LLM 配置 (从环境变量读取)
     LLM_API_KEY = os.getenv("LLM_API_KEY")
     LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.deepseek.com")
     LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-chat")
+    # 自适应并发 (AIMD)：初始/最小/最大并发，目标延迟(秒)，每分钟 token 预算(0=不限)，最大重试次数
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "10"))
+    LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_TARGET_LATENCY = float(os.getenv("LLM_TARGET_LATENCY", "15"))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    # 模型路由：不超过 LLM_ROUTE_MAX_CHARS 字符、且最多命中一类问题关键词的评论送便宜快速的 LLM_CHEAP_MODEL，
+    # 其余送 LLM_MODEL；AI 综述用 LLM_SUMMARY_MODEL（默认 LLM_MODEL）。LLM_CHEAP_MODEL 为空时不分流
+    LLM_CHEAP_MODEL = os.getenv("LLM_CHEAP_MODEL", "")
+    LLM_SUMMARY_MODEL = os.getenv("LLM_SUMMARY_MODEL", "")
+    LLM_ROUTE_MAX_CHARS = int(os.getenv("LLM_ROUTE_MAX_CHARS", "300"))
+    # 备用端点（OpenAI 兼容）：主端点重试 LLM_FAILOVER_RETRIES 次后仍失败、或单次请求超过 LLM_FAILOVER_LATENCY 秒时改发备用端点；
+    # 主端点连续失败 LLM_FAILOVER_ERRORS 次后 LLM_FAILOVER_COOLDOWN 秒内直接走备用端点。LLM_FALLBACK_BASE_URL 为空时不启用
+    LLM_FALLBACK_BASE_URL = os.getenv("LLM_FALLBACK_BASE_URL", "")
+    LLM_FALLBACK_API_KEY = os.getenv("LLM_FALLBACK_API_KEY")
+    LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")
+    LLM_FAILOVER_RETRIES = int(os.getenv("LLM_FAILOVER_RETRIES", "1"))
+    LLM_FAILOVER_LATENCY = float(os.getenv("LLM_FAILOVER_LATENCY", "60"))
+    LLM_FAILOVER_ERRORS = int(os.getenv("LLM_FAILOVER_ERRORS", "3"))
+    LLM_FAILOVER_COOLDOWN = float(os.getenv("LLM_FAILOVER_COOLDOWN", "60"))
+    # 各模型价格 {模型: [输入, 输出]}（美元 / 百万 token），JSON；用于按路由统计成本，未配置的模型计 0
+    LLM_PRICES = json.loads(os.getenv("LLM_PRICES", "{}"))
+    # 每次请求分类的评论条数，<=1 时退回逐条模式
+    LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+    # 分类结果缓存 (按标题+正文+模型+prompt 版本寻址)
+    LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "llm_cache.db")
+    LLM_CACHE_TTL_DAYS = int(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+    # 近重复评论去重：MinHash 签名相似度达到阈值即复用已有分类结果（索引为内存映射文件）
+    SEMANTIC_DEDUPE = os.getenv("SEMANTIC_DEDUPE", "1") == "1"
+    SEMANTIC_INDEX_DIR = os.getenv("SEMANTIC_INDEX_DIR", ".semantic_index")
+    NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+    # 深度分析图中 L2 问题归并的相似度阈值（字符 n-gram 向量的余弦相似度），只在同一 L1 分类内归并；
+    # 0.75 合并大小写 / 单复数 / 语序变化，"Cancellation Fee" 与 "Contract Cancellation" 这类不同问题保持分开
+    ISSUE_CLUSTER_THRESHOLD = float(os.getenv("ISSUE_CLUSTER_THRESHOLD", "0.75"))
+    # 本地预分类：关键词规则 + 用历史 LLM 标注训练的线性模型，置信度 >= 阈值的评论不调用 LLM；
+    # 其中 PRECLASSIFY_AUDIT_RATE 比例仍送 LLM，用来统计一致率
+    PRECLASSIFY = os.getenv("PRECLASSIFY", "1") == "1"
+    PRECLASSIFY_THRESHOLD = float(os.getenv("PRECLASSIFY_THRESHOLD", "0.9"))
+    PRECLASSIFY_AUDIT_RATE = float(os.getenv("PRECLASSIFY_AUDIT_RATE", "0.05"))
+    PRECLASSIFIER_MODEL = os.getenv("PRECLASSIFIER_MODEL", "preclassifier.npz")
+    PRECLASSIFIER_DIM = 2 ** 14
+    PRECLASSIFIER_MIN_SAMPLES = int(os.getenv("PRECLASSIFIER_MIN_SAMPLES", "500"))
+    PRECLASSIFIER_RETRAIN_DAYS = 7
     
     # 邮件配置 (从环境变量读取)
-    SMTP_SERVER = "smtp.gmail.com"
-    SMTP_PORT = 587
+    SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+    SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+    SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+    SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "4"))
+    # 重试后仍未送达的邮件存为 .eml，下次运行开始时补发
+    OUTBOX_DIR = os.getenv("OUTBOX_DIR", "outbox")
     EMAIL_SENDER = os.getenv("EMAIL_SENDER")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
     # 支持多个接收人，用逗号分隔
     EMAIL_RECEIVERS = os.getenv("EMAIL_RECEIVERS", "").split(",")
+    # 多受众报告：JSON 列表，每项定义 name / operators / sections / language / recipients（见 report_specs.example.json）；
+    # 文件不存在时只发一份全量报告给 EMAIL_RECEIVERS
+    REPORT_SPECS = os.getenv("REPORT_SPECS", "report_specs.json")
     
     # 视觉配置 (保留你的配色)
     BRAND_COLORS = {
@@ -37,3 +136,10 @@ class Config:
     }
     SENTIMENT_COLORS = {'Negative': '#D32F2F', 'Positive': '#388E3C'}
     IMG_DPI = 70
+    # 邮件内嵌图片：超过该宽度按比例缩小，并量化为调色板 PNG
+    IMG_MAX_WIDTH = int(os.getenv("IMG_MAX_WIDTH", "800"))
+    IMG_COLORS = int(os.getenv("IMG_COLORS", "128"))
+    PLOT_THEME = {"style": "whitegrid", "font": "sans-serif"}
+    # 图表在进程池中并行渲染；输入数据与样式不变的图直接复用缓存
+    CHART_WORKERS = int(os.getenv("CHART_WORKERS", str(min(3, os.cpu_count() or 1))))
+    CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", ".chart_cache")
@@ -0,0 +1,55 @@
+import pandas as pd
+
+# 报告用到的全部维度：一次 groupby 得到每个组合的评论数，各章节只读这张小表
+DIMENSIONS = ['Day', 'Operator', 'Sentiment', 'L1_Category', 'L2_Issue', 'Service_Type', 'Location']
+VOICE_COLUMNS = ['Operator', 'L2_Issue', 'Content', 'Url', 'Urgency']
+
+
+class ReportCube:
+    def __init__(self, counts, top_urgent, operators, report_day, total):
+        self.counts = counts
+        self.top_urgent = top_urgent
+        # 运营商按在数据中首次出现的顺序
+        self.operators = operators
+        self.report_day = report_day
+        self.total = total
+        self._by_operator = {op: part for op, part in counts.groupby('Operator', observed=True, sort=False)}
+
+    def slice(self, **filters):
+        data = self.counts
+        if 'Operator' in filters:
+            data = self._by_operator.get(filters.pop('Operator'), data.iloc[:0])
+        for col, value in filters.items():
+            data = data[data[col] == value]
+        return data
+
+    def count(self, **filters):
+        return int(self.slice(**filters)['Count'].sum())
+
+    def totals(self, by, **filters):
+        # 按 by 汇总评论数，只保留出现过的取值，降序（同数量保持原有顺序）
+        data = self.slice(**filters)
+        out = data.groupby(by, observed=True, sort=False)['Count'].sum()
+        return out[out > 0].sort_values(ascending=False, kind='stable')
+
+    def subset(self, operators):
+        # 只保留部分运营商的视图（共享底层数据，不重新扫描原始行）
+        keep = [op for op in self.operators if op in set(operators)]
+        counts = self.counts[self.counts['Operator'].isin(keep)]
+        top_urgent = {op: rows for op, rows in self.top_urgent.items() if op in keep}
+        return ReportCube(counts, top_urgent, keep, self.report_day, int(counts['Count'].sum()))
+
+
+def build_cube(df, top_k=3):
+    # 单次扫描：维度组合计数 + 每个运营商按 Urgency 排序的前 top_k 条负面评论
+    counts = df.groupby(DIMENSIONS, observed=True, dropna=False).size().reset_index(name='Count')
+
+    neg_df = df[df['Sentiment'] == 'Negative']
+    ranked = neg_df.sort_values('Urgency', ascending=False, kind='stable')
+    ranked = ranked.groupby('Operator', observed=True, sort=False).head(top_k)
+    top_urgent = {}
+    for row in ranked[VOICE_COLUMNS].to_dict('records'):
+        top_urgent.setdefault(row['Operator'], []).append(row)
+
+    operators = [str(op) for op in pd.unique(df['Operator'])]
+    return ReportCube(counts, top_urgent, operators, df['Day'].max(), len(df))
@@ -0,0 +1,143 @@
+import asyncio
+import random
+from urllib.parse import urlsplit
+from src.config import Config
+from src.metrics import metrics
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# 这些状态码视为临时故障，退避后重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    # 按 host 限速：同一 host 两次请求的发起间隔至少 1/rate 秒（代替原来每页固定 sleep）
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def backoff_delay(attempt, retry_after=None, base=0.5, cap=30.0):
+    # 优先服从服务端的 Retry-After（秒），否则指数退避 + 抖动
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+
+class HttpFetcher:
+    # 无浏览器后端：httpx 连接池 + keep-alive + gzip，429/5xx 自动重试
+    def __init__(self, limiter, concurrency=None, max_retries=None, timeout=None, transport=None):
+        self.limiter = limiter
+        self.concurrency = max(1, concurrency or Config.SCRAPER_CONCURRENCY)
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or Config.HTTP_TIMEOUT
+        # 可注入 httpx 传输层（测试中用 httpx.MockTransport 代替网络）
+        self.transport = transport
+        self._client = None
+        self._slots = None
+
+    async def __aenter__(self):
+        import httpx
+        self._client = httpx.AsyncClient(
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+            },
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=self.concurrency,
+                                max_keepalive_connections=self.concurrency),
+            transport=self.transport,
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    async def fetch_text(self, url):
+        import httpx
+        attempt = 0
+        while True:
+            retry_after = None
+            async with self._slots:
+                await self.limiter.wait(url)
+                try:
+                    resp = await self._client.get(url)
+                    if resp.status_code not in RETRY_STATUS:
+                        resp.raise_for_status()
+                        metrics.count('pages_fetched')
+                        metrics.count('bytes_fetched', len(resp.content))
+                        return resp.text
+                    retry_after = resp.headers.get("Retry-After")
+                    error = httpx.HTTPStatusError(f"HTTP {resp.status_code}", request=resp.request, response=resp)
+                except (httpx.TransportError, httpx.TimeoutException) as e:
+                    error = e
+
+            if attempt >= self.max_retries:
+                raise error
+            metrics.count('http_retries')
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+            attempt += 1
+
+
+class PlaywrightFetcher:
+    # 可选回退：一个 Chromium + 一个 context 下的多个 page 轮流借用
+    def __init__(self, limiter, concurrency=None):
+        self.limiter = limiter
+        self.size = max(1, concurrency or Config.SCRAPER_CONCURRENCY)
+        self._pages = asyncio.Queue()
+        self._pw = None
+        self._browser = None
+
+    async def __aenter__(self):
+        from playwright.async_api import async_playwright
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(headless=True)
+        context = await self._browser.new_context(user_agent=USER_AGENT)
+        for _ in range(self.size):
+            self._pages.put_nowait(await context.new_page())
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._browser.close()
+        await self._pw.stop()
+
+    async def fetch_text(self, url):
+        page = await self._pages.get()
+        try:
+            await self.limiter.wait(url)
+            await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+            # 获取页面文本内容而不是HTML，因为API返回JSON
+            text = await page.evaluate("() => document.body.innerText")
+            metrics.count('pages_fetched')
+            metrics.count('bytes_fetched', len(text.encode('utf-8')))
+            return text
+        finally:
+            self._pages.put_nowait(page)
+
+
+FETCHERS = {"http": HttpFetcher, "playwright": PlaywrightFetcher}
+
+
+def create_fetcher(backend=None, limiter=None):
+    backend = (backend or Config.SCRAPER_BACKEND).lower()
+    if backend not in FETCHERS:
+        raise ValueError(f"未知的抓取后端: {backend}（可选: {', '.join(FETCHERS)}）")
+    return FETCHERS[backend](limiter or HostRateLimiter(Config.SCRAPER_RATE_LIMIT))
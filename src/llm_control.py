@@ -0,0 +1,168 @@
+import asyncio
+import time
+import openai
+from src.config import Config
+from src.fetchers import backoff_delay
+
+
+def is_retryable(error):
+    # 429 / 5xx / 超时 / 连接错误可重试；其余 4xx（鉴权、参数错误）直接失败
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_after_of(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    return response.headers.get('retry-after')
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class TokenBudget:
+    # 每分钟 token 预算（令牌桶，连续回填）；tpm<=0 表示不限
+    def __init__(self, tokens_per_minute):
+        self.capacity = float(tokens_per_minute)
+        self.available = self.capacity
+        self.rate = self.capacity / 60.0
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens):
+        if self.capacity <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= tokens:
+                    self.available -= tokens
+                    return
+                await asyncio.sleep((tokens - self.available) / self.rate)
+
+    def settle(self, estimated, actual):
+        # 用真实 usage 修正预扣的估算值；请求失败时 actual=0，全额退回
+        if self.capacity > 0 and actual is not None:
+            self._refill()
+            self.available = min(self.capacity, self.available + estimated - actual)
+
+
+class LLMController:
+    # AIMD 自适应并发 + 抖动指数退避（服从 Retry-After）+ TPM 预算 + 运行统计
+    def __init__(self, initial=None, min_limit=None, max_limit=None, target_latency=None,
+                 tokens_per_minute=None, max_retries=None):
+        # 并发下限至少为 1，否则 AIMD 把上限压到 1 以下后所有请求都会一直等待
+        self.min_limit = max(1, Config.LLM_MIN_CONCURRENCY if min_limit is None else min_limit)
+        self.max_limit = Config.LLM_MAX_CONCURRENCY if max_limit is None else max_limit
+        self.limit = float(Config.LLM_CONCURRENCY if initial is None else initial)
+        self.target_latency = Config.LLM_TARGET_LATENCY if target_latency is None else target_latency
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.budget = TokenBudget(Config.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute)
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+        self._last_decrease = 0.0
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.retryable_errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = []
+        self.peak_limit = self.limit
+
+    async def _acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+
+    async def _release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def _on_success(self, latency):
+        async with self._cond:
+            if latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.peak_limit = max(self.peak_limit, self.limit)
+            elif latency > 2 * self.target_latency:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            self._cond.notify_all()
+
+    def _latency_window(self):
+        # 最近请求的延迟中位数：这段时间内返回的 429 来自减半之前就已发出的请求；还没有成功请求时用目标延迟
+        recent = self.latencies[-50:]
+        return percentile(recent, 0.5) if recent else self.target_latency
+
+    async def _on_throttle(self):
+        # 一个延迟窗口（最近的 p50 延迟）内只减半一次，避免同一波 429 把并发压到底
+        async with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease > self._latency_window():
+                self.limit = max(self.min_limit, self.limit * 0.5)
+                self._last_decrease = now
+
+    async def call(self, make_request, estimated_tokens=0):
+        attempt = 0
+        while True:
+            await self.budget.acquire(estimated_tokens)
+            await self._acquire()
+            start = time.monotonic()
+            self.requests += 1
+            try:
+                response = await make_request()
+            except Exception as e:
+                await self._release()
+                self.budget.settle(estimated_tokens, 0)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self.failures += 1
+                    raise
+                self.retryable_errors += 1
+                await self._on_throttle()
+                self.retries += 1
+                await asyncio.sleep(backoff_delay(attempt, retry_after_of(e)))
+                attempt += 1
+                continue
+
+            latency = time.monotonic() - start
+            await self._release()
+            self.latencies.append(latency)
+            await self._on_success(latency)
+
+            usage = getattr(response, 'usage', None)
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.completion_tokens += usage.completion_tokens or 0
+                self.budget.settle(estimated_tokens, usage.total_tokens)
+            return response
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "retryable_errors": self.retryable_errors,
+            "p50_latency": round(percentile(self.latencies, 0.5), 3),
+            "p95_latency": round(percentile(self.latencies, 0.95), 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "final_concurrency": round(self.limit, 1),
+            "peak_concurrency": round(self.peak_limit, 1),
+        }
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from openai import AsyncOpenAI
+from src.config import Config
+from src.llm_control import LLMController, percentile
+from src.preclassifier import issue_hits
+
+# 路由：cheap / strong 用于评论分类，summary 用于 AI 综述
+ROUTES = ['cheap', 'strong', 'summary']
+
+
+class Endpoint:
+    # 一个 OpenAI 兼容端点：自己的连接池与 LLMController（并发 / 退避 / TPM 预算按端点各自计算）
+    def __init__(self, name, base_url, api_key, model=None, max_retries=None):
+        self.name = name
+        self.model = model
+        # 重试交给 LLMController 统一处理（退避 + 限流），SDK 自带重试关闭
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.controller = LLMController(max_retries=max_retries)
+
+
+class RouteStats:
+    def __init__(self, model):
+        self.model = model
+        self.requests = 0
+        self.fallback = 0
+        self.failovers = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies = []
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "served_by_fallback": self.fallback,
+            "failovers": self.failovers,
+            "failures": self.failures,
+            "p50_latency": round(percentile(self.latencies, 0.5), 3),
+            "p95_latency": round(percentile(self.latencies, 0.95), 3),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 4),
+        }
+
+
+def request_cost(model, usage):
+    # LLM_PRICES: {模型: [输入, 输出] 美元 / 百万 token}；未配置价格的模型计 0
+    price = Config.LLM_PRICES.get(model)
+    if not price or usage is None:
+        return 0.0
+    return ((usage.prompt_tokens or 0) * price[0] + (usage.completion_tokens or 0) * price[1]) / 1e6
+
+
+class LLMRouter:
+    # 模型路由 + 端点故障转移：
+    #   - 分流：短且只涉及一类问题的评论送便宜快速的 LLM_CHEAP_MODEL，长评论或同时命中多类问题关键词的送 LLM_MODEL
+    #   - 故障转移：主端点（重试 LLM_FAILOVER_RETRIES 次后）仍失败、或单次请求超过 LLM_FAILOVER_LATENCY 秒时
+    #     改发备用端点；主端点连续失败 LLM_FAILOVER_ERRORS 次后熔断 LLM_FAILOVER_COOLDOWN 秒，期间直接走备用端点
+    #   - 按路由统计请求数、故障转移次数、延迟分位数、token 与成本，用于调整分流阈值
+    def __init__(self):
+        self.fallback = None
+        retries = None
+        if Config.LLM_FALLBACK_BASE_URL:
+            self.fallback = Endpoint('fallback', Config.LLM_FALLBACK_BASE_URL,
+                                     Config.LLM_FALLBACK_API_KEY or Config.LLM_API_KEY, Config.LLM_FALLBACK_MODEL)
+            # 有备用端点时主端点少重试，尽快转移
+            retries = Config.LLM_FAILOVER_RETRIES
+        self.primary = Endpoint('primary', Config.LLM_BASE_URL, Config.LLM_API_KEY, max_retries=retries)
+        self.models = {
+            'cheap': Config.LLM_CHEAP_MODEL or Config.LLM_MODEL,
+            'strong': Config.LLM_MODEL,
+            'summary': Config.LLM_SUMMARY_MODEL or Config.LLM_MODEL,
+        }
+        self.routes = {}
+        self._primary_errors = 0
+        self._open_until = 0.0
+
+    def route(self, row):
+        # 评论分类的路由；未配置 LLM_CHEAP_MODEL 时全部走 strong
+        if not Config.LLM_CHEAP_MODEL:
+            return 'strong'
+        text = f"{row.get('Title', '')}. {row.get('Content', '')}".lower()
+        if len(text) > Config.LLM_ROUTE_MAX_CHARS or len(issue_hits(text)) > 1:
+            return 'strong'
+        return 'cheap'
+
+    def model(self, route):
+        return self.models[route]
+
+    @property
+    def requests(self):
+        return self.primary.controller.requests + (self.fallback.controller.requests if self.fallback else 0)
+
+    async def _call(self, endpoint, model, messages, estimated_tokens, timeout, kwargs):
+        async def request():
+            # 超时抛出的 TimeoutError 不可重试：由 LLMController 计为失败并释放并发名额，交给调用方转移
+            return await asyncio.wait_for(
+                endpoint.client.chat.completions.create(model=model, messages=messages, **kwargs), timeout)
+        return await endpoint.controller.call(request, estimated_tokens)
+
+    async def complete(self, route, messages, estimated_tokens=0, **kwargs):
+        # 按路由选模型发出一次 chat.completions 请求，必要时转移到备用端点；两个端点都失败时抛出最后的异常
+        model = self.models[route]
+        entry = self.routes.setdefault(route, RouteStats(model))
+        entry.requests += 1
+        start = time.monotonic()
+        # 熔断期间直接走备用端点；主端点的单次请求只在有备用端点时设超时，备用端点是最后一道，不设超时
+        endpoint = self.fallback if self.fallback and start < self._open_until else self.primary
+        timeout = Config.LLM_FAILOVER_LATENCY or None if self.fallback and endpoint is self.primary else None
+        try:
+            response = await self._call(endpoint, endpoint.model or model, messages, estimated_tokens, timeout,
+                                        kwargs)
+            if endpoint is self.primary:
+                self._primary_errors = 0
+        except Exception:
+            if endpoint is not self.primary or self.fallback is None:
+                entry.failures += 1
+                raise
+            self._primary_errors += 1
+            if self._primary_errors >= Config.LLM_FAILOVER_ERRORS:
+                self._open_until = time.monotonic() + Config.LLM_FAILOVER_COOLDOWN
+            entry.failovers += 1
+            endpoint = self.fallback
+            try:
+                response = await self._call(endpoint, endpoint.model or model, messages, estimated_tokens, None,
+                                            kwargs)
+            except Exception:
+                entry.failures += 1
+                raise
+
+        entry.latencies.append(time.monotonic() - start)
+        entry.fallback += endpoint is self.fallback
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            entry.prompt_tokens += usage.prompt_tokens or 0
+            entry.completion_tokens += usage.completion_tokens or 0
+            entry.cost += request_cost(endpoint.model or model, usage)
+        return response
+
+    def stats(self):
+        return {route: self.routes[route].stats() for route in ROUTES if route in self.routes}
+
+    async def close(self):
+        await self.primary.client.close()
+        if self.fallback:
+            await self.fallback.client.close()
@@ -0,0 +1,204 @@
+import os
+import smtplib
+import time
+import uuid
+from email.charset import Charset, QP, BASE64
+from email.mime.text import MIMEText
+from email.parser import BytesParser
+from io import BytesIO
+from src.config import Config
+from src.fetchers import backoff_delay
+
+
+# ===========================
+# 邮件体积：图表量化为调色板 PNG，HTML 正文选较短的传输编码
+# ===========================
+def optimize_png(png, max_width=None, colors=None):
+    # 图表颜色很少，量化成调色板 PNG 通常能小好几倍；过宽的图按比例缩小。结果不比原图小时保留原图
+    try:
+        from PIL import Image
+    except ImportError:
+        return png
+    max_width = max_width or Config.IMG_MAX_WIDTH
+    img = Image.open(BytesIO(png)).convert('RGB')
+    if img.width > max_width:
+        img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+    img = img.quantize(colors=colors or Config.IMG_COLORS, method=Image.Quantize.MEDIANCUT)
+    out = BytesIO()
+    img.save(out, format='PNG', optimize=True)
+    data = out.getvalue()
+    return data if len(data) < len(png) else png
+
+
+def html_part(html):
+    # 去掉模板缩进与空行；正文以 quoted-printable 与 base64 中较短的一种编码
+    # （英文为主时 QP 更短，中文为主时 base64 更短）
+    html = "\n".join(line.strip() for line in html.splitlines() if line.strip())
+    best = None
+    for encoding in (QP, BASE64):
+        charset = Charset('utf-8')
+        charset.body_encoding = encoding
+        part = MIMEText(html, 'html', charset)
+        if best is None or len(part.as_bytes()) < len(best.as_bytes()):
+            best = part
+    return best
+
+
+# ===========================
+# 投递：复用一个已登录的连接，临时错误退避重试，最终失败的写入发件箱；
+# 被永久拒收（5xx）的邮件重试也不会成功，放进发件箱下的 failed/ 留待人工处理，不再自动补发
+# ===========================
+def is_transient(error):
+    # 断线 / 超时 / 4xx 回复可重试；5xx（鉴权失败、收件人被拒）重试也不会成功
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class Mailer:
+    # 一个 SMTP 连接发送全部邮件，只握手/登录一次；断线时自动重连。
+    # 配置了密码时必须先 STARTTLS 再登录，服务端不支持则拒绝发送（不明文传密码）；
+    # 只有不登录的本地 SMTP 替身走明文连接
+    def __init__(self, host=None, port=None, user=None, password=None, max_retries=None, timeout=None,
+                 outbox=None, backoff=1.0):
+        self.host = host or Config.SMTP_SERVER
+        self.port = port or Config.SMTP_PORT
+        self.user = user if user is not None else Config.EMAIL_SENDER
+        self.password = password if password is not None else Config.EMAIL_PASSWORD
+        self.max_retries = Config.SMTP_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or Config.SMTP_TIMEOUT
+        self.outbox = outbox or Config.OUTBOX_DIR
+        self.backoff = backoff
+        self.server = None
+        # 连接层面持续失败后，本次运行剩余邮件直接进发件箱，不再逐封等待重试
+        self.unavailable = False
+        self.connects = 0
+        self.sent = 0
+        self.retries = 0
+        self.queued = 0
+        self.resent = 0
+        self.failed = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.password:
+                if not server.has_extn('starttls'):
+                    raise smtplib.SMTPNotSupportedError(f"{self.host}:{self.port} 不支持 STARTTLS，拒绝明文登录")
+                server.starttls()
+                server.ehlo()
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.connects += 1
+
+    def _disconnect(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                self.server.close()
+            self.server = None
+
+    def close(self):
+        self._disconnect()
+
+    def _deliver(self, msg):
+        # 返回 None 表示已送达，否则返回最后一次的异常
+        error = None
+        for attempt in range(self.max_retries + 1):
+            connecting = self.server is None
+            try:
+                if connecting:
+                    self._connect()
+                connecting = False
+                refused = self.server.send_message(msg)
+                if refused:
+                    print(f"⚠️ 部分收件人被拒: {refused}")
+                return None
+            except Exception as e:
+                error = e
+                # 出错后连接状态不确定，丢弃，下次尝试重新建立
+                self._disconnect()
+                if not is_transient(e) or attempt == self.max_retries:
+                    break
+                self.retries += 1
+                delay = backoff_delay(attempt, base=self.backoff)
+                print(f"⚠️ 邮件发送失败 ({e})，{delay:.1f}s 后重试...")
+                time.sleep(delay)
+        if connecting and is_transient(error):
+            self.unavailable = True
+        return error
+
+    def send(self, msg):
+        # True 表示已送达；临时失败的邮件写入发件箱，下次运行补发，无需重新生成
+        error = ConnectionError("SMTP 服务不可用") if self.unavailable else self._deliver(msg)
+        if error is None:
+            self.sent += 1
+            print(f"✅ 邮件发送成功！({msg['To']})")
+            return True
+        if not is_transient(error):
+            path = self.enqueue(msg, folder=self.failed_dir)
+            self.failed += 1
+            print(f"❌ 邮件被拒收: {error}，不再重试，已存入 {path}")
+            return False
+        path = self.enqueue(msg)
+        self.queued += 1
+        print(f"❌ 发送失败: {error}，已存入发件箱 {path}")
+        return False
+
+    @property
+    def failed_dir(self):
+        return os.path.join(self.outbox, 'failed')
+
+    def enqueue(self, msg, folder=None):
+        folder = folder or self.outbox
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.eml")
+        with open(path + '.tmp', 'wb') as f:
+            f.write(msg.as_bytes())
+        os.replace(path + '.tmp', path)
+        return path
+
+    def flush_outbox(self):
+        # 按时间顺序补发以往运行未送达的邮件；临时失败的留在发件箱，被永久拒收的移到 failed/
+        if not os.path.isdir(self.outbox):
+            return 0
+        for name in sorted(n for n in os.listdir(self.outbox) if n.endswith('.eml')):
+            if self.unavailable:
+                break
+            path = os.path.join(self.outbox, name)
+            with open(path, 'rb') as f:
+                msg = BytesParser().parse(f)
+            error = self._deliver(msg)
+            if error is None:
+                os.remove(path)
+                self.resent += 1
+                print(f"📮 发件箱补发成功: {msg['Subject']} ({msg['To']})")
+            elif not is_transient(error):
+                os.makedirs(self.failed_dir, exist_ok=True)
+                os.replace(path, os.path.join(self.failed_dir, name))
+                self.failed += 1
+                print(f"❌ 发件箱邮件被拒收: {name} ({error})，已移到 {self.failed_dir}")
+            else:
+                print(f"❌ 发件箱补发失败: {name} ({error})")
+        return self.resent
+
+    def stats(self):
+        return {'sent': self.sent, 'resent': self.resent, 'queued': self.queued, 'failed': self.failed,
+                'retries': self.retries, 'connects': self.connects}
@@ -0,0 +1,228 @@
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PREFIX = "hellopeter"
+
+
+def current_rss():
+    # 当前常驻内存（字节）；没有 /proc 时退回进程峰值
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return peak_rss()
+
+
+def peak_rss(children=False):
+    # 进程（或已结束子进程中最大的）峰值常驻内存；Linux 上 ru_maxrss 单位为 KB
+    if resource is None:
+        return 0
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss * 1024
+
+
+def _metric_name(*parts):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', "_".join(str(p) for p in parts if p)).lower()
+
+
+def flatten(stats, prefix=''):
+    # {'agreement': {'L2_Issue': 0.9}} -> {'agreement_l2_issue': 0.9}；只保留数值
+    out = {}
+    for key, value in stats.items():
+        name = _metric_name(prefix, key)
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+class RunMetrics:
+    # 一次运行的性能记录：各阶段耗时 / CPU / 内存峰值，以及抓取、LLM、缓存、渲染、投递等计数。
+    # 运行结束时写出 JSON 清单（并追加到历史）和 Prometheus textfile，便于跨运行对比
+    def __init__(self, sample_interval=0.2):
+        self.sample_interval = sample_interval
+        self.started_at = None
+        # 本次运行的子命令（run-all / scrape / analyze / report / backfill）
+        self.command = None
+        self.stages = {}
+        self.counters = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._profiler = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        if self._sampler is None and Config.METRICS:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        if Config.PROFILE:
+            self._start_profiler(Config.PROFILE)
+
+    def _sample(self):
+        # 后台线程定期采样 RSS，记到当前所有进行中的阶段上
+        while not self._stop.wait(self.sample_interval):
+            rss = current_rss()
+            with self._lock:
+                for name in self._active:
+                    self._active[name] = max(self._active[name], rss)
+
+    @contextmanager
+    def stage(self, name):
+        # 可嵌套；同名阶段多次进入时耗时累加。异步代码中计的是包含等待的墙钟时间
+        with self._lock:
+            self._active[name] = current_rss()
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+            with self._lock:
+                peak = max(self._active.pop(name), current_rss())
+                entry = self.stages.setdefault(name, {'seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0,
+                                                      'peak_rss_bytes': 0})
+                entry['seconds'] += wall
+                entry['cpu_seconds'] += cpu
+                entry['calls'] += 1
+                entry['peak_rss_bytes'] = max(entry['peak_rss_bytes'], peak)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, group, stats):
+        # 把各组件现有的 stats() 字典并入计数（覆盖同名值，多次调用以最后一次为准）
+        self.counters.update(flatten(stats, group))
+
+    # ===========================
+    # 可选剖析：PROFILE=cprofile | pyinstrument
+    # ===========================
+    def _start_profiler(self, kind):
+        if kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("⚠️ 未安装 pyinstrument，改用 cProfile")
+                kind = 'cprofile'
+            else:
+                self._profiler = ('pyinstrument', Profiler(async_mode='enabled'))
+        if kind == 'cprofile':
+            import cProfile
+            self._profiler = ('cprofile', cProfile.Profile())
+        if self._profiler is None:
+            print(f"⚠️ 未知的 PROFILE: {kind}（可选: cprofile, pyinstrument）")
+            return
+        if kind == 'pyinstrument':
+            self._profiler[1].start()
+        else:
+            self._profiler[1].enable()
+
+    def _stop_profiler(self, stamp):
+        kind, profiler = self._profiler
+        self._profiler = None
+        if kind == 'pyinstrument':
+            profiler.stop()
+            path = os.path.join(Config.METRICS_DIR, f"profile-{stamp}.html")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(profiler.output_html())
+        else:
+            import pstats
+            profiler.disable()
+            path = os.path.join(Config.METRICS_DIR, f"profile-{stamp}.prof")
+            profiler.dump_stats(path)
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+        print(f"🔬 剖析结果: {path}")
+
+    # ===========================
+    # 输出
+    # ===========================
+    def manifest(self, status='ok'):
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'command': self.command,
+            'status': status,
+            'seconds': round(time.perf_counter() - self._t0, 3),
+            'cpu_seconds': round(time.process_time() - self._cpu0, 3),
+            'peak_rss_bytes': peak_rss(),
+            'peak_rss_children_bytes': peak_rss(children=True),
+            'stages': {name: {k: round(v, 3) if isinstance(v, float) else v for k, v in entry.items()}
+                       for name, entry in self.stages.items()},
+            'counters': self.counters,
+            'config': {'streaming': Config.STREAMING, 'incremental': Config.INCREMENTAL,
+                       'scraper_backend': Config.SCRAPER_BACKEND, 'llm_model': Config.LLM_MODEL,
+                       'llm_batch_size': Config.LLM_BATCH_SIZE, 'pipeline_workers': Config.PIPELINE_WORKERS},
+        }
+
+    def prometheus(self, manifest):
+        # node_exporter textfile collector 格式
+        lines = []
+
+        def gauge(name, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            for labels, value in samples:
+                label = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label}}} {value}" if label else f"{PREFIX}_{name} {value}")
+
+        gauge("run_timestamp_seconds", "Start time of the last run",
+              [({}, int(self.started_at.timestamp()) if self.started_at else 0)])
+        gauge("run_success", "1 if the last run finished without error", [({}, int(manifest['status'] == 'ok'))])
+        gauge("run_seconds", "Wall time of the last run", [({}, manifest['seconds'])])
+        gauge("run_cpu_seconds", "CPU time of the last run", [({}, manifest['cpu_seconds'])])
+        gauge("peak_rss_bytes", "Peak resident memory of the main process", [({}, manifest['peak_rss_bytes'])])
+        stages = manifest['stages']
+        gauge("stage_seconds", "Wall time per stage", [({'stage': s}, e['seconds']) for s, e in stages.items()])
+        gauge("stage_cpu_seconds", "CPU time per stage", [({'stage': s}, e['cpu_seconds']) for s, e in stages.items()])
+        gauge("stage_peak_rss_bytes", "Peak resident memory sampled during the stage",
+              [({'stage': s}, e['peak_rss_bytes']) for s, e in stages.items()])
+        for name, value in sorted(manifest['counters'].items()):
+            gauge(name, f"Run counter {name}", [({}, value)])
+        return "\n".join(lines) + "\n"
+
+    def finish(self, status='ok'):
+        if self.started_at is None:
+            return None
+        self._stop.set()
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+        stamp = self.started_at.strftime('%Y%m%d-%H%M%S')
+        if self._profiler is not None:
+            self._stop_profiler(stamp)
+        if not Config.METRICS:
+            return None
+
+        manifest = self.manifest(status)
+        path = os.path.join(Config.METRICS_DIR, f"run-{stamp}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        # 历史：每次运行一行，用于跨运行的性能趋势
+        with open(os.path.join(Config.METRICS_DIR, 'runs.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(manifest, ensure_ascii=False) + "\n")
+        textfile = Config.METRICS_TEXTFILE
+        os.makedirs(os.path.dirname(textfile) or '.', exist_ok=True)
+        with open(textfile + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.prometheus(manifest))
+        os.replace(textfile + '.tmp', textfile)
+
+        slowest = sorted(manifest['stages'].items(), key=lambda kv: -kv[1]['seconds'])[:5]
+        print(f"⏱️ 运行指标: {manifest['seconds']}s, 峰值内存 {manifest['peak_rss_bytes'] / 2 ** 20:.0f} MB | "
+              + ", ".join(f"{name} {entry['seconds']}s" for name, entry in slowest))
+        print(f"📝 运行清单: {path} | Prometheus: {textfile}")
+        return manifest
+
+
+# 进程内唯一的运行记录，各模块直接导入使用
+metrics = RunMetrics()
@@ -0,0 +1,121 @@
+import asyncio
+import pandas as pd
+from src.config import Config
+from src.scraper import crawl
+from src.analyzer import open_cache, open_index, classify_records, log_stats
+from src.preclassifier import open_preclassifier
+from src.llm_router import LLMRouter
+from src.metrics import metrics
+from src.storage import ReviewStore
+
+# 队列结束标记
+STOP = object()
+
+
+class StoreAppender:
+    # 边跑边追加写存储：攒够 flush_rows 行写一次，关闭时写出剩余的行
+    def __init__(self, store, flush_rows=None):
+        self.store = store
+        self.flush_rows = flush_rows or Config.STORE_FLUSH_ROWS
+        self._rows = []
+
+    def append(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self.store.append(pd.DataFrame(self._rows))
+            self._rows = []
+
+    def close(self):
+        self.flush()
+
+
+async def wait_all_or_fail(tasks):
+    # 任意一个任务异常立即抛出（其余任务由调用方取消）
+    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in done:
+        if not task.cancelled() and task.exception():
+            raise task.exception()
+
+
+async def run_pipeline(state=None, backend=None, checkpoint=None):
+    # 抓取 → 分类 → 落盘 三段并行：有界队列提供背压，抓到一页就开始分类。
+    # 传入断点时抓到的页、分类完的行都即时记入断点；恢复时断点中已分类的行不再送分类
+    print(f"🔀 [Step 1+2] 流水线模式 | 分类 worker: {Config.PIPELINE_WORKERS} | 队列: {Config.PIPELINE_QUEUE_SIZE}")
+    page_queue = asyncio.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+    out_queue = asyncio.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+    router = LLMRouter()
+    cache = open_cache()
+    index = open_index()
+    pre = open_preclassifier()
+    raw_writer = StoreAppender(ReviewStore('raw'))
+    analyzed_writer = StoreAppender(ReviewStore('analyzed'))
+    analyzed = []
+
+    async def on_rows(rows):
+        raw_writer.append(rows)
+        await page_queue.put(rows)
+
+    async def produce():
+        await crawl(backend, state, on_rows=on_rows, checkpoint=checkpoint)
+        for _ in range(Config.PIPELINE_WORKERS):
+            await page_queue.put(STOP)
+
+    async def classify_worker():
+        while True:
+            rows = await page_queue.get()
+            if rows is STOP:
+                return
+            # 队列里已有的页顺带凑成一个完整批次
+            stop_seen = False
+            while len(rows) < Config.LLM_BATCH_SIZE and not page_queue.empty():
+                more = page_queue.get_nowait()
+                if more is STOP:
+                    stop_seen = True
+                    break
+                rows = rows + more
+            done, rows = checkpoint.split(rows) if checkpoint else ([], rows)
+            results = await classify_records(router, cache, rows, index, pre) if rows else []
+            classified = [dict(r, **res) for r, res in zip(rows, results)]
+            if checkpoint:
+                checkpoint.add_classified(classified)
+            await out_queue.put(done + classified)
+            if stop_seen:
+                return
+
+    async def write():
+        while True:
+            rows = await out_queue.get()
+            if rows is STOP:
+                return
+            analyzed_writer.append(rows)
+            analyzed.extend(rows)
+
+    producer = asyncio.create_task(produce())
+    workers = [asyncio.create_task(classify_worker()) for _ in range(Config.PIPELINE_WORKERS)]
+    writer = asyncio.create_task(write())
+    tasks = [producer, *workers, writer]
+    try:
+        await wait_all_or_fail([producer, *workers])
+        await out_queue.put(STOP)
+        await wait_all_or_fail([writer])
+    finally:
+        # 出错或被取消时干净地停掉所有阶段，已完成的行写出到存储
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raw_writer.close()
+        analyzed_writer.close()
+        log_stats(router, cache, index, pre)
+        cache.close()
+        await router.close()
+
+    if not analyzed:
+        print("\n⚠️ [流水线] 未抓取到任何数据。")
+        return pd.DataFrame()
+    metrics.count('reviews_analyzed', len(analyzed))
+    print(f"\n✅ [流水线完成] 抓取并分析 {len(analyzed)} 条，已保存至 {raw_writer.store.path} / {analyzed_writer.store.path}")
+    return pd.DataFrame(analyzed)
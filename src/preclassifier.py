@@ -0,0 +1,264 @@
+import os
+import random
+import re
+import time
+import zlib
+import numpy as np
+from src.config import Config
+from src.rules import PRODUCT_RULES
+
+# ===========================
+# 规则层：关键词命中即可确定 L1/L2 的"简单"评论
+# ===========================
+ISSUE_RULES = [
+    ('Network', 'No Signal/Dead Zone', [r'no signal', r'no network', r'dead zone', r'no coverage', r'no reception']),
+    ('Network', 'Slow Internet/High Latency', [r'slow (internet|speed|connection|data)', r'high latency', r'very slow', r'speed is']),
+    ('Network', 'Intermittent Drop', [r'keeps? (dropping|disconnecting)', r'intermittent', r'drops? (out|every)']),
+    ('Network', 'Load Shedding Impact', [r'load ?shedding']),
+    ('Billing', 'Double Debit', [r'double debit', r'debited twice', r'charged twice', r'debit(ed)? .{0,20}twice']),
+    ('Billing', 'Refund Delay', [r'refund']),
+    ('Billing', 'Cancellation Failure', [r'cancel(l)?(ed|ation)?.{0,40}(still|again|continue)', r'can ?not cancel', r"can't cancel"]),
+    ('Billing', 'Price Increase', [r'price increase', r'increased? (my|the) (price|fee)']),
+    ('Technical_Repair', 'Router Faulty', [r'router (is )?(faulty|broken|not working|dead)', r'faulty router']),
+    ('Technical_Repair', 'Technician No-Show', [r'technician .{0,30}(never|did not|didn\'t|no) ?(show|pitch|arrive|come)', r'no.?show']),
+    ('Technical_Repair', 'Fibre Break', [r'fib(re|er) (break|cut|damaged)', r'cable (cut|stolen|damaged)']),
+    ('Customer_Service', 'Call Center Unreachable', [r'on hold', r'call (centre|center) .{0,30}(unreachable|not answer|no answer)', r'nobody (answers|picks up)']),
+    ('Customer_Service', 'Rude Agent', [r'\brude\b', r'unprofessional']),
+    ('Customer_Service', 'Chatbot Loop', [r'chat ?bot', r'\bbot\b']),
+]
+POSITIVE_WORDS = re.compile(r'\b(thank(s| you)?|great|excellent|amazing|awesome|helpful|happy|well done|appreciate)\b')
+NEGATIVE_WORDS = re.compile(r"\b(not|no|never|worst|terrible|useless|still|again|nobody|can't|cannot|didn't)\b")
+
+_COMPILED = [(l1, l2, re.compile('|'.join(patterns))) for l1, l2, patterns in ISSUE_RULES]
+_PRODUCT = [(name, re.compile('|'.join(re.escape(k) for k in keywords))) for name, keywords in PRODUCT_RULES]
+
+
+def _text(row):
+    return f"{row.get('Title', '')}. {row.get('Content', '')}".lower()
+
+
+def _rating(row):
+    try:
+        return int(row.get('Raw_Rating') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def service_type(text):
+    # 与 clean_data 的产品线规则一致
+    for name, pattern in _PRODUCT:
+        if pattern.search(text):
+            return name
+    return 'MBB'
+
+
+def summarize(row):
+    # 本地层不生成摘要，取正文第一句代替
+    content = str(row.get('Content', '') or '').strip()
+    return re.split(r'(?<=[.!?])\s', content, maxsplit=1)[0][:160] or str(row.get('Title', ''))
+
+
+def issue_hits(text):
+    # 小写文本命中的 (L1, L2) 问题规则集合
+    return {(l1, l2) for l1, l2, pattern in _COMPILED if pattern.search(text)}
+
+
+def rule_classify(row):
+    # 返回 (结果, 置信度)；没有规则命中时返回 (None, 0)
+    text = _text(row)
+    rating = _rating(row)
+    hits = issue_hits(text)
+    positive = bool(POSITIVE_WORDS.search(text))
+    negative = bool(NEGATIVE_WORDS.search(text))
+
+    if len(hits) == 1:
+        (l1, l2), = hits
+        # 问题关键词 + 低分是最确定的情形；高分或带感谢词时可能是"问题已解决"的表扬
+        confidence = 0.95 if rating and rating <= 2 and not positive else 0.6
+        sentiment = 'Negative'
+    elif not hits and rating >= 4 and positive and not negative and len(text) < 200:
+        # 简短的好评
+        l1, l2, sentiment, confidence = 'Customer_Service', 'Positive Feedback', 'Positive', 0.9
+    else:
+        return None, 0.0
+    return {
+        'L1_Category': l1, 'L2_Issue': l2, 'Service_Type': service_type(text),
+        'Sentiment': sentiment, 'Summary': summarize(row),
+    }, confidence
+
+
+# ===========================
+# 模型层：哈希词袋特征 + 多分类逻辑回归（numpy 实现），用缓存下来的 LLM 标注训练
+# ===========================
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def features(texts, dim=None):
+    # 词 unigram + bigram 哈希到 dim 维，L2 归一化
+    dim = dim or Config.PRECLASSIFIER_DIM
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = _TOKEN_RE.findall(text.lower())
+        for gram in tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]:
+            out[row, zlib.crc32(gram.encode('utf-8')) % dim] += 1
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.where(norms == 0, 1, norms)
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def fit_softmax(X, y, n_classes, epochs=30, lr=0.5, l2=1e-4, seed=0):
+    rng = np.random.default_rng(seed)
+    W = np.zeros((X.shape[1], n_classes), dtype=np.float32)
+    b = np.zeros(n_classes, dtype=np.float32)
+    onehot = np.eye(n_classes, dtype=np.float32)[y]
+    for _ in range(epochs):
+        for idx in np.array_split(rng.permutation(len(X)), max(1, len(X) // 256)):
+            p = _softmax(X[idx] @ W + b)
+            grad = p - onehot[idx]
+            W -= lr * (X[idx].T @ grad / len(idx) + l2 * W)
+            b -= lr * grad.mean(axis=0)
+    return W, b
+
+
+class LinearModel:
+    # 两个 softmax：L1|L2 组合标签、Sentiment；置信度取两者概率的较小值
+    def __init__(self, issue_labels, issue_W, issue_b, sent_labels, sent_W, sent_b):
+        self.issue_labels = list(issue_labels)
+        self.issue_W, self.issue_b = issue_W, issue_b
+        self.sent_labels = list(sent_labels)
+        self.sent_W, self.sent_b = sent_W, sent_b
+
+    @classmethod
+    def train(cls, texts, l1, l2, sentiment, min_support=5):
+        # 样本太少的 L2 不参与训练（模型不会预测它们，这些评论交给 LLM）
+        joint = [f"{a}\x1f{b}" for a, b in zip(l1, l2)]
+        counts = {}
+        for label in joint:
+            counts[label] = counts.get(label, 0) + 1
+        keep = [i for i, label in enumerate(joint) if counts[label] >= min_support]
+        X = features([texts[i] for i in keep])
+        issue_labels = sorted({joint[i] for i in keep})
+        sent_labels = sorted({sentiment[i] for i in keep})
+        y_issue = np.array([issue_labels.index(joint[i]) for i in keep])
+        y_sent = np.array([sent_labels.index(sentiment[i]) for i in keep])
+        issue_W, issue_b = fit_softmax(X, y_issue, len(issue_labels))
+        sent_W, sent_b = fit_softmax(X, y_sent, len(sent_labels))
+        return cls(issue_labels, issue_W, issue_b, sent_labels, sent_W, sent_b)
+
+    def predict(self, rows):
+        texts = [_text(r) for r in rows]
+        X = features(texts, self.issue_W.shape[0])
+        p_issue = _softmax(X @ self.issue_W + self.issue_b)
+        p_sent = _softmax(X @ self.sent_W + self.sent_b)
+        out = []
+        for row, text, pi, ps in zip(rows, texts, p_issue, p_sent):
+            l1, l2 = self.issue_labels[int(pi.argmax())].split('\x1f')
+            result = {
+                'L1_Category': l1, 'L2_Issue': l2, 'Service_Type': service_type(text),
+                'Sentiment': self.sent_labels[int(ps.argmax())], 'Summary': summarize(row),
+            }
+            out.append((result, float(min(pi.max(), ps.max()))))
+        return out
+
+    def save(self, path):
+        np.savez(path + '.tmp.npz', issue_labels=np.array(self.issue_labels), issue_W=self.issue_W,
+                 issue_b=self.issue_b, sent_labels=np.array(self.sent_labels), sent_W=self.sent_W, sent_b=self.sent_b)
+        os.replace(path + '.tmp.npz', path)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['issue_labels'], data['issue_W'], data['issue_b'],
+                   data['sent_labels'], data['sent_W'], data['sent_b'])
+
+
+def train_from_store(store=None, min_samples=None):
+    # 只用 LLM 给出的标注训练（本地层自己的输出不回流），样本不足时返回 None
+    from src.storage import ReviewStore
+    store = store or ReviewStore('analyzed')
+    min_samples = Config.PRECLASSIFIER_MIN_SAMPLES if min_samples is None else min_samples
+    df = store.load(columns=['Title', 'Content', 'L1_Category', 'L2_Issue', 'Sentiment', 'Label_Source'])
+    df = df[(df['Label_Source'].isna() | (df['Label_Source'] == 'llm')) & (df['L2_Issue'] != 'Analysis Failed')]
+    df = df.dropna(subset=['L1_Category', 'L2_Issue', 'Sentiment'])
+    if len(df) < min_samples:
+        return None
+    texts = [_text(r) for r in df[['Title', 'Content']].to_dict('records')]
+    return LinearModel.train(texts, df['L1_Category'].astype(str).tolist(), df['L2_Issue'].astype(str).tolist(),
+                             df['Sentiment'].astype(str).tolist())
+
+
+# ===========================
+# 组合：规则 → 模型 → LLM；抽样审计本地结果与 LLM 的一致率
+# ===========================
+class PreClassifier:
+    def __init__(self, model=None, threshold=None, audit_rate=None, seed=None):
+        self.model = model
+        self.threshold = Config.PRECLASSIFY_THRESHOLD if threshold is None else threshold
+        self.audit_rate = Config.PRECLASSIFY_AUDIT_RATE if audit_rate is None else audit_rate
+        self._rng = random.Random(seed)
+        self.seen = 0
+        self.skipped = {'rules': 0, 'model': 0}
+        self.audited = 0
+        self.agree = {'L1_Category': 0, 'L2_Issue': 0, 'Sentiment': 0}
+
+    def predict(self, rows):
+        # 返回与 rows 对齐的 (结果, 来源)；置信度不足的为 (None, None)
+        self.seen += len(rows)
+        out = [None] * len(rows)
+        rest = []
+        for i, row in enumerate(rows):
+            result, confidence = rule_classify(row)
+            if result is not None and confidence >= self.threshold:
+                out[i] = (dict(result, Confidence=confidence), 'rules')
+            else:
+                rest.append(i)
+        if self.model is not None and rest:
+            for i, (result, confidence) in zip(rest, self.model.predict([rows[i] for i in rest])):
+                if confidence >= self.threshold:
+                    out[i] = (dict(result, Confidence=round(confidence, 3)), 'model')
+        return [o if o is not None else (None, None) for o in out]
+
+    def should_audit(self):
+        return self._rng.random() < self.audit_rate
+
+    def record(self, source, local, llm=None):
+        # source: 本地结果被采用时记跳过数；llm 不为空时记审计一致率
+        if llm is None:
+            self.skipped[source] += 1
+            return
+        if llm.get('L2_Issue') == 'Analysis Failed':
+            return
+        self.audited += 1
+        for field in self.agree:
+            self.agree[field] += str(local.get(field)) == str(llm.get(field))
+
+    def stats(self):
+        skipped = sum(self.skipped.values())
+        agreement = {f: round(n / self.audited, 3) for f, n in self.agree.items()} if self.audited else {}
+        return {
+            'seen': self.seen, 'skipped_rules': self.skipped['rules'], 'skipped_model': self.skipped['model'],
+            'skip_rate': round(skipped / self.seen, 3) if self.seen else 0.0,
+            'audited': self.audited, 'agreement': agreement,
+        }
+
+
+def open_preclassifier():
+    # PRECLASSIFY=0 时不启用；模型文件不存在或超过 PRECLASSIFIER_RETRAIN_DAYS 天时用存储中的 LLM 标注重新训练
+    if not Config.PRECLASSIFY:
+        return None
+    path = Config.PRECLASSIFIER_MODEL
+    model = None
+    stale = not os.path.exists(path) or time.time() - os.path.getmtime(path) > Config.PRECLASSIFIER_RETRAIN_DAYS * 86400
+    if stale:
+        model = train_from_store()
+        if model is not None:
+            model.save(path)
+            print(f"🧮 本地分类模型已重新训练: {len(model.issue_labels)} 个问题类别")
+    if model is None and os.path.exists(path):
+        model = LinearModel.load(path)
+    return PreClassifier(model)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+from src.config import Config
+from src.charts import CHARTS, chart_inputs, render_inputs
+from src.mailer import optimize_png
+from src.metrics import metrics
+from src.reporter import (LANGUAGE_NAMES, VALID_OPERATORS, normalize_operator, generate_deep_insight_summary,
+                          generate_customer_voice, generate_cluster_table, build_report_email)
+
+# 报告可选章节，按邮件中的顺序
+SECTIONS = ['summary', 'trend', 'category', 'deep_dive', 'voice', 'clusters']
+
+
+class ReportSpec:
+    # 一份报告的受众：运营商子集、章节、语言与收件人。
+    # 收件人可写 "$ENV_NAME"，运行时从该环境变量读取逗号分隔的地址（便于放在 Secrets 中）
+    def __init__(self, name, recipients, operators=None, sections=None, language='zh', title=None):
+        self.name = name
+        self.operators = [normalize_operator(op) for op in operators] if operators else list(VALID_OPERATORS)
+        self.sections = [s for s in SECTIONS if s in sections] if sections else list(SECTIONS)
+        self.language = language
+        self.title = title
+        self.recipients = []
+        for entry in recipients:
+            if entry.startswith('$'):
+                self.recipients += os.getenv(entry[1:], "").split(",")
+            else:
+                self.recipients.append(entry)
+        self.recipients = [r.strip() for r in self.recipients if r.strip()]
+
+        unknown = set(self.operators) - set(VALID_OPERATORS)
+        if unknown:
+            raise ValueError(f"报告 {name}: 未知运营商 {sorted(unknown)}")
+        if sections and set(sections) - set(SECTIONS):
+            raise ValueError(f"报告 {name}: 未知章节 {sorted(set(sections) - set(SECTIONS))}")
+        if language not in LANGUAGE_NAMES:
+            raise ValueError(f"报告 {name}: 不支持的语言 {language}")
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data.get('recipients', []), data.get('operators'), data.get('sections'),
+                   data.get('language', 'zh'), data.get('title'))
+
+
+def load_specs(path=None):
+    # 未配置 REPORT_SPECS 文件时退回单份报告：全部运营商、全部章节，发给 EMAIL_RECEIVERS
+    path = path or Config.REPORT_SPECS
+    if not os.path.exists(path):
+        return [ReportSpec('default', ['$EMAIL_RECEIVERS'])]
+    with open(path, encoding='utf-8') as f:
+        specs = [ReportSpec.from_dict(item) for item in json.load(f)]
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"报告名称重复: {names}")
+    return specs
+
+
+class ReportBuilder:
+    # 所有报告共用同一个 cube：运营商视图与章节输出按 (章节, 运营商集合, 语言) 记忆，
+    # 相同受众视图的章节（尤其是 AI 综述）只生成一次，图表在一个进程池里一起渲染；
+    # AI 综述是异步的 LLM 请求，与图表渲染同时进行
+    def __init__(self, cube, trends=None, alerts=()):
+        self.cube = cube
+        self.trends = trends
+        self.alerts = list(alerts)
+        self._views = {}
+        self._sections = {}
+        self.computed = 0
+        self.reused = 0
+
+    def view(self, operators):
+        # 只保留数据中出现过的运营商，按 cube 原顺序；集合相同的视图共用
+        key = tuple(op for op in self.cube.operators if op in set(operators))
+        if key not in self._views:
+            self._views[key] = self.cube if key == tuple(self.cube.operators) else self.cube.subset(key)
+        return key, self._views[key]
+
+    def _compute(self, section, key, language):
+        view = self._views[key]
+        if section == 'voice':
+            return generate_customer_voice(view, language)
+        if section == 'clusters':
+            alerts = [a for a in self.alerts if normalize_operator(a['operator']) in key]
+            return generate_cluster_table(alerts, language)
+        raise KeyError(section)
+
+    def section(self, section, key, language):
+        memo = (section, key, language)
+        if memo in self._sections:
+            self.reused += 1
+        else:
+            self._sections[memo] = self._compute(section, key, language)
+            self.computed += 1
+        return self._sections[memo]
+
+    async def render_charts(self, specs):
+        # 图表与语言无关，按 (图表, 运营商集合) 去重后一次性渲染；邮件用的压缩版本也只做一次。
+        # 绘图数据在本线程准备（趋势库连接不能跨线程），渲染放到线程里等进程池，不阻塞事件循环
+        jobs = {}
+        for spec in specs:
+            key, view = self.view(spec.operators)
+            for name in spec.sections:
+                if name in CHARTS and (name, key, None) not in self._sections:
+                    jobs[(name, key, None)] = (name, view)
+        with metrics.stage('report_charts'):
+            inputs = chart_inputs(jobs, self.trends)
+            rendered = await asyncio.to_thread(render_inputs, inputs)
+            self._sections.update({key: optimize_png(png) if png else png for key, png in rendered.items()})
+        self.computed += len(jobs)
+
+    async def summarize(self, specs):
+        # 按 (运营商集合, 语言) 去重后并发生成 AI 综述，共用一个 LLM 路由（连接池与统计）
+        from src.llm_router import LLMRouter
+        todo = {}
+        for spec in specs:
+            key, view = self.view(spec.operators)
+            if 'summary' in spec.sections and ('summary', key, spec.language) not in self._sections:
+                todo[('summary', key, spec.language)] = view
+        if not todo:
+            return
+        router = LLMRouter()
+        try:
+            with metrics.stage('report_summary'):
+                texts = await asyncio.gather(*[generate_deep_insight_summary(view, self.trends, memo[2], router)
+                                               for memo, view in todo.items()])
+        finally:
+            await router.close()
+        self._sections.update(zip(todo, texts))
+        self.computed += len(todo)
+        metrics.record('llm_route', router.stats())
+
+    async def build(self, specs):
+        # 返回 [(spec, 邮件)]；数据中没有该受众运营商或没有收件人的报告跳过
+        active = []
+        for spec in specs:
+            if not self.view(spec.operators)[0]:
+                print(f"⚠️ 报告 {spec.name}: 窗口内没有 {spec.operators} 的评论，跳过")
+            elif not spec.recipients:
+                print(f"⚠️ 报告 {spec.name}: 未配置收件人，跳过")
+            else:
+                active.append(spec)
+        # 图表渲染与 AI 综述的 LLM 请求同时进行
+        await asyncio.gather(self.render_charts(active), self.summarize(active))
+
+        messages = []
+        used = set()
+        for spec in active:
+            key, view = self.view(spec.operators)
+            sections = {}
+            for name in spec.sections:
+                if name in CHARTS or name == 'summary':
+                    memo = (name, key, None if name in CHARTS else spec.language)
+                    self.reused += memo in used
+                    used.add(memo)
+                    sections[name] = self._sections[memo]
+                else:
+                    sections[name] = self.section(name, key, spec.language)
+            messages.append((spec, build_report_email(view, sections, spec.recipients, spec.language, spec.title)))
+        return messages
+
+    def stats(self):
+        return {'views': len(self._views), 'sections_computed': self.computed, 'sections_reused': self.reused}
@@ -1,17 +1,73 @@
+import re
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import smtplib
 from datetime import datetime
-from openai import OpenAI
-from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from src.config import Config
+from src.charts import render_charts
+from src.mailer import Mailer, html_part
+from src.rules import PRODUCT_RULES
+from src.trends import last_complete_day
+
+OPERATOR_ALIASES = {
+    'rain-internet-service-provider': 'Rain', 'rain 5g': 'Rain',
+    'mtn-service-provider': 'MTN', 'vodacom-provider': 'Vodacom',
+    'telkom-sa': 'Telkom'
+}
+VALID_OPERATORS = ['Vodacom', 'MTN', 'Rain', 'Telkom']
+
+PRODUCT_PATTERNS = [(name, '|'.join(re.escape(k) for k in keywords)) for name, keywords in PRODUCT_RULES]
+
+CATEGORICAL_COLUMNS = ['Operator', 'Sentiment', 'L1_Category', 'L2_Issue', 'Service_Type']
+
+# 报告语言：邮件中的固定文案按语言取；AI 综述按语言写 prompt
+LANGUAGE_NAMES = {'zh': '中文', 'en': '英文'}
+REPORT_TEXT = {
+    'zh': {
+        'subject': "📊 HelloPeter 电信舆情周报",
+        'title': "🇿🇦 HelloPeter 电信舆情深度分析",
+        'summary': "🤖 AI 首席分析师综述:",
+        'summary_unavailable': "AI 分析服务暂时不可用。",
+        'trend': ("舆情走势 (正向 vs 负向)", "红线代表投诉，绿线代表表扬。分运营商展示。"),
+        'category': ("投诉类别占比", "网络、计费、服务等问题的构成比例。"),
+        'deep_dive': ("核心痛点下钻 (过滤低频)", "仅展示该运营商投诉量 >= 3 的具体技术/业务故障。"),
+        'voice': ("客户原声 (典型投诉)", ""),
+        'clusters': ("集中爆发监控 (Cluster Monitor)", ""),
+        'cluster_headers': ["发现时间", "运营商", "地点", "核心问题", "爆发量"],
+        'no_clusters': "✅ No clusters.",
+        'no_negative': "No negative reviews.",
+        'view_original': "[点击查看原文]",
+    },
+    'en': {
+        'subject': "📊 HelloPeter Telecom Sentiment Weekly",
+        'title': "🇿🇦 HelloPeter Telecom Sentiment Deep Dive",
+        'summary': "🤖 AI Chief Analyst Summary:",
+        'summary_unavailable': "The AI analysis service is temporarily unavailable.",
+        'trend': ("Sentiment Trend (Positive vs Negative)", "Red: complaints, green: praise. One panel per operator."),
+        'category': ("Complaint Categories", "Share of network, billing, service and other issues."),
+        'deep_dive': ("Top Pain Points", "Only issues with at least 3 complaints for the operator are shown."),
+        'voice': ("Customer Voice (Typical Complaints)", ""),
+        'clusters': ("Cluster Monitor", ""),
+        'cluster_headers': ["Detected", "Operator", "Location", "Issue", "Count"],
+        'no_clusters': "✅ No clusters.",
+        'no_negative': "No negative reviews.",
+        'view_original': "[View original]",
+    },
+}
+
+
+def normalize_operator(name):
+    name = OPERATOR_ALIASES.get(name, name)
+    return 'MTN' if name.upper() == 'MTN' else name.title()
+
+
+def _as_text(series):
+    # 与 str(x) 保持一致：缺失值变成 'nan'（存储读出的类别列先转回普通对象列）
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    return series.fillna('nan').astype(str)
 
-# 设置 Backend 防止无头模式报错
-plt.switch_backend('Agg')
 
 def clean_data(df):
     df.columns = df.columns.str.lower().str.strip()
@@ -28,68 +84,86 @@ def clean_data(df):
         if col not in df.columns: df[col] = 'Unknown'
     if 'Url' not in df.columns: df['Url'] = ''
     if 'Urgency' not in df.columns: df['Urgency'] = 0
+    # 评论里没提到地点时存储中为 null
+    df['Location'] = df['Location'].astype(object).where(df['Location'].notna(), 'Unknown')
 
-    op_clean_map = {
-        'rain-internet-service-provider': 'Rain', 'rain 5g': 'Rain',
-        'mtn-service-provider': 'MTN', 'vodacom-provider': 'Vodacom',
-        'telkom-sa': 'Telkom'
-    }
-    df['Operator'] = df['Operator'].astype(str).str.strip().replace(op_clean_map)
-    df['Operator'] = df['Operator'].apply(lambda x: 'MTN' if x.upper() == 'MTN' else x.title())
-    df = df[df['Operator'].isin(['Vodacom', 'MTN', 'Rain', 'Telkom'])]
-    
-    # 修复 Sentiment 大小写
-    df['Sentiment'] = df['Sentiment'].apply(lambda s: 'Positive' if 'positive' in str(s).lower() else 'Negative')
+    # 运营商名 / 情感 / 产品线取值很少：先 factorize，只对唯一值做字符串处理，再按编码取回
+    codes, uniques = pd.factorize(df['Operator'].astype(str), use_na_sentinel=False)
+    df['Operator'] = np.array([normalize_operator(str(op).strip()) for op in uniques], dtype=object)[codes]
+    df = df[df['Operator'].isin(VALID_OPERATORS)].copy()
 
-    def classify_product(row):
-        text = str(row['Service_Type']).lower() + " " + str(row.get('Content', '')).lower()
-        op = str(row['Operator'])
-        if any(x in text for x in ['fibre', 'fiber', 'openserve', 'vumatel']): return 'Fibre'
-        if any(x in text for x in ['router', 'wifi', 'home', 'cpe', 'fixed', 'rain one']): return 'FWA'
-        if any(x in text for x in ['phone', 'mobile', 'sim', 'roaming', 'upgrade']): return 'MBB'
-        return 'FWA' if op == 'Rain' else 'MBB'
+    # 修复 Sentiment 大小写
+    codes, uniques = pd.factorize(_as_text(df['Sentiment']), use_na_sentinel=False)
+    is_positive = np.array(['positive' in s.lower() for s in uniques], dtype=bool)[codes]
+    df['Sentiment'] = np.where(is_positive, 'Positive', 'Negative')
+
+    # 产品线：Service_Type + 正文 拼成一列小写文本，每条规则一个合并正则；
+    # 前面规则已命中的行不再参与后续匹配，最后 np.select 按规则顺序取值
+    codes, uniques = pd.factorize(_as_text(df['Service_Type']), use_na_sentinel=False)
+    service = pd.Series(np.array([u.lower() for u in uniques], dtype=object)[codes], index=df.index)
+    text = service + " " + _as_text(df['Content']).str.lower()
+    remaining = np.ones(len(df), dtype=bool)
+    conditions = []
+    for _, pattern in PRODUCT_PATTERNS:
+        hit = np.zeros(len(df), dtype=bool)
+        if remaining.any():
+            hit[remaining] = text[remaining].str.contains(pattern, regex=True).to_numpy(dtype=bool)
+        remaining &= ~hit
+        conditions.append(hit)
+    fallback = np.where(df['Operator'] == 'Rain', 'FWA', 'MBB')
+    df['Service_Type'] = np.select(conditions, [name for name, _ in PRODUCT_PATTERNS], default=fallback)
 
-    df['Service_Type'] = df.apply(classify_product, axis=1)
     df['Date'] = pd.to_datetime(df['Date'])
     df['Day'] = df['Date'].dt.date
     df['Urgency'] = pd.to_numeric(df['Urgency'], errors='coerce').fillna(0)
-    return df
 
-def plot_to_buffer():
-    buf = BytesIO()
-    plt.savefig(buf, format='png', dpi=Config.IMG_DPI, bbox_inches='tight')
-    buf.seek(0)
-    plt.close()
-    return buf
+    # 类别按取值排序：从存储读出的类别顺序取决于写入顺序，统一后各章节输出才稳定
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return df
 
 # ===========================
 # 🧠 核心：深度思考 AI 综述 (保留 Prompt)
 # ===========================
-def generate_deep_insight_summary(df):
-    print("🧠 生成深度 AI 思考综述 (中文)...")
-    dossier = f"报告日期: {df['Day'].max()}\n"
-    dossier += f"总评论数: {len(df)}\n\n"
+def _pct(value):
+    return "无基线" if value is None else f"{value:+.1f}%"
+
+
+def _avg(value):
+    return "历史不足" if value is None else f"{value} 条"
+
+
+async def generate_deep_insight_summary(cube, trends=None, language='zh', router=None):
+    # 异步请求 LLM（summary 路由），生成期间事件循环可以同时做别的事（如等待图表渲染）；
+    # 不传 router 时临时创建一个
+    print(f"🧠 生成深度 AI 思考综述 ({LANGUAGE_NAMES[language]})...")
+    dossier = f"报告日期: {cube.report_day}\n"
+    dossier += f"总评论数: {cube.total}\n\n"
 
-    for op in df['Operator'].unique():
-        op_df = df[df['Operator'] == op]
-        neg_df = op_df[op_df['Sentiment']=='Negative']
-        neg_count = len(neg_df)
-        pos_count = len(op_df[op_df['Sentiment']=='Positive'])
+    for op in cube.operators:
+        neg_count = cube.count(Operator=op, Sentiment='Negative')
+        pos_count = cube.count(Operator=op, Sentiment='Positive')
 
         dossier += f"运营商: {op.upper()}\n"
         dossier += f"  - 数据: {neg_count} 条投诉 vs {pos_count} 条表扬\n"
+        if trends is not None:
+            # 历史基线：滑动日均与环比，来自趋势库（不受本次抓取窗口限制），截至最近一个完整的日期
+            avg = trends.rolling(op, 'Negative', last_complete_day(cube.report_day))
+            delta = trends.deltas(op, 'Negative', last_complete_day(cube.report_day))
+            dossier += (f"  - 投诉趋势: 近7天日均 {_avg(avg[7])} (周环比 {_pct(delta['wow'])}), "
+                        f"近28天日均 {_avg(avg[28])} (月环比 {_pct(delta['mom'])}), 近90天日均 {_avg(avg[90])}\n")
 
         if neg_count > 0:
-            top_issues = neg_df['L2_Issue'].value_counts().head(3).to_dict()
+            top_issues = cube.totals('L2_Issue', Operator=op, Sentiment='Negative').head(3).to_dict()
             dossier += f"  - Top 3 具体故障: {top_issues}\n"
-            if not neg_df['Service_Type'].empty:
-                top_prod = neg_df['Service_Type'].value_counts().idxmax()
-                dossier += f"  - 重灾区产品: {top_prod}\n"
+            top_prod = cube.totals('Service_Type', Operator=op, Sentiment='Negative').idxmax()
+            dossier += f"  - 重灾区产品: {top_prod}\n"
         dossier += "\n"
 
     # --- 你的 Prompt 开始 ---
     prompt = f"""
-    你是一位南非电信市场的首席战略分析师。请根据以下本周舆情数据，写一份中文的《执行摘要》。
+    你是一位南非电信市场的首席战略分析师。请根据以下本周舆情数据，写一份{LANGUAGE_NAMES[language]}的《执行摘要》。
 
     数据档案:
     {dossier}
@@ -101,139 +175,79 @@ def generate_deep_insight_summary(df):
        - 例如：如果 Vodacom 全是 Billing 问题，请分析是否可能存在“系统性计费错误”。
     3. **策略建议**: 针对每个运营商最严重的问题，给出一条简短的改进建议。
     4. **格式**: 使用 HTML 格式（<br>换行，<b>加粗关键点</b>），语言简练专业。不要写废话。
+    5. **语言**: 全文使用{LANGUAGE_NAMES[language]}。
     """
     # --- 你的 Prompt 结束 ---
 
+    own = router is None
     try:
-        client = OpenAI(api_key=Config.LLM_API_KEY, base_url=Config.LLM_BASE_URL)
-        response = client.chat.completions.create(
-            model=Config.LLM_MODEL,
+        if own:
+            # 只有生成综述时才需要 openai（导入耗时较长），放到这里按需导入
+            from src.llm_router import LLMRouter
+            router = LLMRouter()
+        response = await router.complete(
+            'summary',
             messages=[{"role": "user", "content": prompt}],
+            estimated_tokens=len(prompt) // 3 + 1500,
             temperature=0.4
         )
         return response.choices[0].message.content
     except Exception as e:
         print(f"AI 生成失败: {e}")
-        return "AI 分析服务暂时不可用。"
+        return REPORT_TEXT[language]['summary_unavailable']
+    finally:
+        if own and router is not None:
+            await router.close()
 
 # ===========================
-# 📊 绘图函数集 (保留原有逻辑)
+# 📊 绘图函数集：实际绘制在 src/charts.py（进程池 + 渲染缓存）
 # ===========================
-def plot_trend(df):
-    operators = sorted(df['Operator'].unique())
-    rows = (len(operators) + 1) // 2
-    fig, axes = plt.subplots(rows, 2, figsize=(10, 3.5 * rows))
-    axes = axes.flatten() if len(operators) > 1 else [axes]
-
-    for i, op in enumerate(operators):
-        ax = axes[i]
-        op_data = df[df['Operator'] == op]
-        trend = op_data.groupby(['Day', 'Sentiment']).size().reset_index(name='Count')
-        if not trend.empty:
-            sns.lineplot(data=trend, x='Day', y='Count', hue='Sentiment',
-                         palette=Config.SENTIMENT_COLORS, marker='o', ax=ax)
-            ax.set_title(op, fontweight='bold', color=Config.BRAND_COLORS.get(op, '#333'))
-            ax.set_xlabel('')
-            if i == 0: ax.legend(title='', loc='upper left', frameon=False)
-            else:
-                if ax.get_legend(): ax.get_legend().remove()
-        else:
-            ax.text(0.5, 0.5, "No Data", ha='center')
-    if len(operators) > 1:
-        for j in range(i + 1, len(axes)): fig.delaxes(axes[j])
-    plt.tight_layout()
-    return plot_to_buffer()
-
-def plot_category(df):
-    plt.figure(figsize=(8, 4))
-    neg_df = df[df['Sentiment'] == 'Negative']
-    if neg_df.empty: return None
-    cat_data = pd.crosstab(neg_df['Operator'], neg_df['L1_Category'], normalize='index') * 100
-    if not cat_data.empty:
-        cat_data.plot(kind='bar', stacked=True, colormap='Spectral', width=0.8, ax=plt.gca())
-        plt.title('Complaint Categories', fontweight='bold')
-        plt.legend(bbox_to_anchor=(1, 1), frameon=False, fontsize='small')
-        plt.xticks(rotation=0)
-        sns.despine()
-        return plot_to_buffer()
-    return None
-
-def plot_deep_dive(df):
-    neg_df = df[df['Sentiment'] == 'Negative']
-    if neg_df.empty: return None
-    operators = sorted(neg_df['Operator'].unique())
-    rows = (len(operators) + 1) // 2
-    fig, axes = plt.subplots(rows, 2, figsize=(10, 3.5 * rows))
-    axes = axes.flatten() if len(operators) > 1 else [axes]
-
-    for i, op in enumerate(operators):
-        ax = axes[i]
-        op_data = neg_df[neg_df['Operator'] == op]
-        if not op_data.empty:
-            top_l1 = op_data['L1_Category'].value_counts().idxmax()
-            target = op_data[op_data['L1_Category'] == top_l1]
-            counts = target['L2_Issue'].value_counts().head(5).reset_index()
-            counts.columns = ['Issue', 'Count']
-            counts = counts[counts['Count'] >= 3]
+def plot_trend(cube, trends=None):
+    return render_charts(cube, ['trend'], trends)['trend']
 
-            color = Config.BRAND_COLORS.get(op, '#333')
-            if not counts.empty:
-                sns.barplot(data=counts, x='Count', y='Issue', ax=ax, color=color)
-                ax.set_title(f"{op}: {top_l1}", fontweight='bold', color=color, fontsize=10)
-                ax.set_xlabel('')
-                ax.set_ylabel('')
-                ax.tick_params(axis='y', labelsize=8)
-            else:
-                ax.text(0.5, 0.5, "No Major Issues", ha='center')
-                ax.set_title(op, color=color)
-    if len(operators) > 1:
-        for j in range(i + 1, len(axes)): fig.delaxes(axes[j])
-    plt.tight_layout()
-    return plot_to_buffer()
-
-def generate_cluster_table(df):
-    target = df[(df['Location'] != 'Unknown') & (df['Sentiment'] == 'Negative')]
-    if target.empty: return "<tr><td colspan='5'>No clusters.</td></tr>"
-    clusters = target.groupby(['Day', 'Operator', 'Location', 'L2_Issue']).size().reset_index(name='count')
-    clusters = clusters[clusters['count'] >= 2].sort_values('count', ascending=False).head(5)
+def plot_category(cube):
+    return render_charts(cube, ['category'])['category']
 
+def plot_deep_dive(cube):
+    return render_charts(cube, ['deep_dive'])['deep_dive']
+
+def generate_cluster_table(alerts, language='zh'):
+    # 突发报警（src/anomaly.py 在线检测得出），按显著性排序取前 5
     html = ""
-    if not clusters.empty:
-        for _, row in clusters.iterrows():
-            c = Config.BRAND_COLORS.get(row['Operator'], '#333')
-            html += f"""
+    for alert in alerts[:5]:
+        op = normalize_operator(alert['operator'])
+        c = Config.BRAND_COLORS.get(op, '#333')
+        location = 'All' if alert['location'] == '*' else alert['location']
+        html += f"""
             <tr style="border-bottom:1px solid #eee;">
-                <td style="padding:5px;">{row['Day']}</td>
-                <td style="color:{c};font-weight:bold;padding:5px;">{row['Operator']}</td>
-                <td style="padding:5px;">{row['Location']}</td>
-                <td style="padding:5px;">{row['L2_Issue']}</td>
-                <td style="padding:5px;"><span style="background:#e74c3c;color:#fff;padding:2px 6px;border-radius:4px;font-size:11px;">{row['count']}</span></td>
+                <td style="padding:5px;">{alert['detected_at'][:16]}</td>
+                <td style="color:{c};font-weight:bold;padding:5px;">{op}</td>
+                <td style="padding:5px;">{location}</td>
+                <td style="padding:5px;">{alert['issue']}</td>
+                <td style="padding:5px;"><span style="background:#e74c3c;color:#fff;padding:2px 6px;border-radius:4px;font-size:11px;" title="baseline {alert['baseline']}, z={alert['z']}">{alert['count']}</span></td>
             </tr>"""
-    else:
-        html = "<tr><td colspan='5' style='padding:5px; color:green;'>✅ No clusters.</td></tr>"
+    if not html:
+        html = f"<tr><td colspan='5' style='padding:5px; color:green;'>{REPORT_TEXT[language]['no_clusters']}</td></tr>"
     return html
 
-def generate_customer_voice(df):
+def generate_customer_voice(cube, language='zh'):
     print("🗣️ 提取客户原声 (Top 3)...")
-    # 筛选负面评论
-    neg_df = df[df['Sentiment'] == 'Negative']
-    if neg_df.empty: return "No negative reviews."
+    # 负面评论已在 build_cube 时按运营商取好 Top 3
+    text = REPORT_TEXT[language]
+    if not cube.top_urgent: return text['no_negative']
 
     html_cards = ""
     # 按运营商排序确保顺序固定
-    operators = sorted(neg_df['Operator'].unique())
+    operators = sorted(cube.top_urgent)
 
     for op in operators:
-        op_data = neg_df[neg_df['Operator'] == op]
-        if op_data.empty: continue
-
         # --- 修改开始 ---
         # 逻辑变更：不再只取 Top Issue 的一条，而是取该运营商最新的 3 条负面评论
         # 如果你的 analyzer.py 未来实现了 Urgency 打分，这里也会自动优先展示高优先级的
-        # 目前默认按时间排序（因为爬虫是从第一页开始抓的，通常是按时间倒序）
-        target_reviews = op_data.sort_values('Urgency', ascending=False).head(3)
+        # 目前默认按时间排序（因为爬虫是从第一页开始抓的，通常是按时间倒序；稳定排序保证同分时保持该顺序）
+        target_reviews = cube.top_urgent[op]
         
-        for _, row in target_reviews.iterrows():
+        for row in target_reviews:
             # 动态获取每条评论的具体问题，而不是笼统的显示 Top Issue
             issue = row.get('L2_Issue', 'General Issue')
             
@@ -248,7 +262,7 @@ def generate_customer_voice(df):
             url = str(row.get('Url', ''))
             link_html = ''
             if url.startswith('http'):
-                 link_html = f'<a href="{url}" target="_blank" style="color:#007bff;text-decoration:none;font-size:12px;">[点击查看原文]</a>'
+                 link_html = f'<a href="{url}" target="_blank" style="color:#007bff;text-decoration:none;font-size:12px;">{text["view_original"]}</a>'
 
             # 获取品牌颜色
             color = Config.BRAND_COLORS.get(op, '#333')
@@ -269,77 +283,86 @@ def generate_customer_voice(df):
 
     return html_cards
 
-def send_report(df, ai_summary, buf_trend, buf_cat, buf_deep, voice_html, cluster_html):
+def _section_heading(number, title, note):
+    html = f'''
+        <h3 style="margin-top:30px; color:#34495e; border-left:4px solid #FFCB05; padding-left:10px;">{number}. {title}</h3>'''
+    if note:
+        html += f'''
+        <p style="font-size:12px; color:gray;">{note}</p>'''
+    return html
+
+
+def build_report_email(cube, sections, receivers, language='zh', title=None):
+    # sections: 按出现顺序的 {章节名: 内容}；summary/voice/clusters 为 HTML，图表为 PNG 字节（无数据时为 None）
     print("📧 组装邮件...")
+    text = REPORT_TEXT[language]
     msg = MIMEMultipart('related')
-    msg['Subject'] = f"📊 HelloPeter 电信舆情周报: {df['Day'].max()}"
+    subject = f"{text['subject']}: {cube.report_day}"
+    msg['Subject'] = f"{subject} ({title})" if title else subject
     msg['From'] = Config.EMAIL_SENDER
-    msg['To'] = ", ".join(Config.EMAIL_RECEIVERS)
+    msg['To'] = ", ".join(receivers)
 
     # --- HTML 模板保留 ---
-    html_body = f"""
-    <html>
-    <body style="font-family: 'Microsoft YaHei', Arial, sans-serif; color:#333; max-width:800px; line-height:1.6;">
-        <h2 style="color:#2c3e50; border-bottom:3px solid #3498db; padding-bottom:10px;">🇿🇦 HelloPeter 电信舆情深度分析</h2>
-
+    body = ""
+    images = []
+    # 按实际渲染的章节顺序编号；综述框本身不显示序号，但占第 1 位（与完整报告的编号一致）
+    number = 0
+    for name, content in sections.items():
+        number += 1
+        if name == 'summary':
+            body += f"""
         <div style="background:#f0f7ff; padding:20px; border-radius:8px; border-left:5px solid #0072CE; margin-bottom:25px;">
-            <b style="color:#0072CE; font-size:16px;">🤖 AI 首席分析师综述:</b><br>
-            <div style="margin-top:10px; font-size:14px;">{ai_summary}</div>
+            <b style="color:#0072CE; font-size:16px;">{text['summary']}</b><br>
+            <div style="margin-top:10px; font-size:14px;">{content}</div>
         </div>
-
-        <h3 style="margin-top:30px; color:#34495e; border-left:4px solid #FFCB05; padding-left:10px;">2. 舆情走势 (正向 vs 负向)</h3>
-        <p style="font-size:12px; color:gray;">红线代表投诉，绿线代表表扬。分运营商展示。</p>
-        <img src="cid:trend_img" style="width:100%; border:1px solid #eee; border-radius:5px;">
-
-        <h3 style="margin-top:30px; color:#34495e; border-left:4px solid #FFCB05; padding-left:10px;">3. 投诉类别占比</h3>
-        <p style="font-size:12px; color:gray;">网络、计费、服务等问题的构成比例。</p>
-        <img src="cid:cat_img" style="width:100%; border:1px solid #eee; border-radius:5px;">
-
-        <h3 style="margin-top:30px; color:#34495e; border-left:4px solid #FFCB05; padding-left:10px;">4. 核心痛点下钻 (过滤低频)</h3>
-        <p style="font-size:12px; color:gray;">仅展示该运营商投诉量 >= 3 的具体技术/业务故障。</p>
-        <img src="cid:deep_img" style="width:100%; border:1px solid #eee; border-radius:5px;">
-
-        <h3 style="margin-top:30px; color:#34495e; border-left:4px solid #FFCB05; padding-left:10px;">5. 客户原声 (典型投诉)</h3>
+"""
+            continue
+        body += _section_heading(number, *text[name])
+        if name == 'voice':
+            body += f"""
         <div style="background:#f9f9f9; padding:15px; border-radius:5px;">
-            {voice_html}
+            {content}
         </div>
-
-        <h3 style="margin-top:30px; color:#34495e; border-left:4px solid #FFCB05; padding-left:10px;">6. 集中爆发监控 (Cluster Monitor)</h3>
+"""
+        elif name == 'clusters':
+            headers = "".join(f'\n                <th style="padding:8px;text-align:left;">{h}</th>'
+                              for h in text['cluster_headers'])
+            body += f"""
         <table style="width:100%; border-collapse:collapse; font-size:13px;">
-            <tr style="background:#fff8e1;">
-                <th style="padding:8px;text-align:left;">日期</th>
-                <th style="padding:8px;text-align:left;">运营商</th>
-                <th style="padding:8px;text-align:left;">地点</th>
-                <th style="padding:8px;text-align:left;">核心问题</th>
-                <th style="padding:8px;text-align:left;">爆发量</th>
+            <tr style="background:#fff8e1;">{headers}
             </tr>
-            {cluster_html}
+            {content}
         </table>
+"""
+        else:
+            # 图表：以 cid 内嵌
+            body += f"""
+        <img src="cid:{name}_img" style="width:100%; border:1px solid #eee; border-radius:5px;">
+"""
+            if content is not None:
+                images.append((content, f'<{name}_img>'))
 
+    html_body = f"""
+    <html>
+    <body style="font-family: 'Microsoft YaHei', Arial, sans-serif; color:#333; max-width:800px; line-height:1.6;">
+        <h2 style="color:#2c3e50; border-bottom:3px solid #3498db; padding-bottom:10px;">{text['title']}</h2>
+{body}
         <p style="font-size:12px; color:#999; margin-top:40px; text-align:center;">
             Automated by Telecom AI Analyst • {datetime.now().strftime('%Y-%m-%d %H:%M')}
         </p>
     </body>
     </html>
     """
-    msg.attach(MIMEText(html_body, 'html'))
+    msg.attach(html_part(html_body))
 
-    def attach_image(buffer, content_id):
-        if buffer is None: return
-        img = MIMEImage(buffer.read())
+    for png, content_id in images:
+        img = MIMEImage(png)
         img.add_header('Content-ID', content_id)
         msg.attach(img)
+    return msg
 
-    attach_image(buf_trend, '<trend_img>')
-    attach_image(buf_cat, '<cat_img>')
-    attach_image(buf_deep, '<deep_img>')
 
-    try:
-        server = smtplib.SMTP(Config.SMTP_SERVER, Config.SMTP_PORT)
-        server.starttls()
-        server.login(Config.EMAIL_SENDER, Config.EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print("✅ 邮件发送成功！")
-    except Exception as e:
-        print(f"❌ 发送失败: {e}")
+def send_report(msg):
+    # 单封发送；批量发送请直接复用同一个 Mailer
+    with Mailer() as mailer:
+        return mailer.send(msg)
@@ -0,0 +1,61 @@
+import re
+
+# 报告（clean_data）、本地预分类与抓取共用的关键词规则，单独成模块，分类侧不必导入报告模块
+
+# 产品线关键词规则，按顺序匹配，先命中者优先
+PRODUCT_RULES = [
+    ('Fibre', ['fibre', 'fiber', 'openserve', 'vumatel']),
+    ('FWA', ['router', 'wifi', 'home', 'cpe', 'fixed', 'rain one']),
+    ('MBB', ['phone', 'mobile', 'sim', 'roaming', 'upgrade']),
+]
+
+# 地名表：评论中提到的城市 / 城区 -> 规范名称（突发检测按 运营商 × 故障 × 地点 计数）。
+# 只收录不易与人名、普通词混淆的地名；同一地点的别名指向同一个规范名称
+LOCATIONS = {
+    'Johannesburg': ['johannesburg', 'joburg', 'jozi', 'jhb'],
+    'Cape Town': ['cape town', 'cpt'],
+    'Durban': ['durban', 'ethekwini'],
+    'Durban North': ['durban north'],
+    'Pretoria': ['pretoria', 'tshwane', 'pta'],
+    'Pretoria East': ['pretoria east'],
+    'Port Elizabeth': ['port elizabeth', 'gqeberha'],
+    'East London': ['east london'],
+    'Bloemfontein': ['bloemfontein', 'bloem'],
+    'Polokwane': ['polokwane'],
+    'Nelspruit': ['nelspruit', 'mbombela'],
+    'Kimberley': ['kimberley'],
+    'Pietermaritzburg': ['pietermaritzburg', 'pmb'],
+    'Rustenburg': ['rustenburg'],
+    'Stellenbosch': ['stellenbosch'],
+    'Soweto': ['soweto'],
+    'Sandton': ['sandton'],
+    'Midrand': ['midrand'],
+    'Centurion': ['centurion'],
+    'Randburg': ['randburg'],
+    'Roodepoort': ['roodepoort'],
+    'Tembisa': ['tembisa'],
+    'Benoni': ['benoni'],
+    'Boksburg': ['boksburg'],
+    'Germiston': ['germiston'],
+    'Kempton Park': ['kempton park'],
+    'Krugersdorp': ['krugersdorp'],
+    'Vereeniging': ['vereeniging'],
+    'Vanderbijlpark': ['vanderbijlpark'],
+    'Umhlanga': ['umhlanga'],
+    'Pinetown': ['pinetown'],
+    'Khayelitsha': ['khayelitsha'],
+    'Mitchells Plain': ["mitchells plain", "mitchell's plain"],
+    'Bellville': ['bellville'],
+    'Mamelodi': ['mamelodi'],
+    'Soshanguve': ['soshanguve'],
+}
+_LOCATION_NAMES = {alias: name for name, aliases in LOCATIONS.items() for alias in aliases}
+# 长的别名优先匹配（"Durban North" 先于 "Durban"）
+_LOCATION_RE = re.compile(r'\b(' + '|'.join(re.escape(a) for a in sorted(_LOCATION_NAMES, key=len, reverse=True))
+                          + r')\b', re.IGNORECASE)
+
+
+def extract_location(text):
+    # 评论中第一个提到的地点的规范名称；没有提到时为 None
+    match = _LOCATION_RE.search(str(text or ''))
+    return _LOCATION_NAMES[match.group(1).lower()] if match else None
@@ -1,85 +1,178 @@
 import asyncio
 import json
-import random
 import pandas as pd
 from datetime import datetime, timedelta
-from playwright.async_api import async_playwright
 from src.config import Config
+from src.fetchers import create_fetcher
+from src.metrics import metrics
+from src.rules import extract_location
+from src.state import filter_new_rows
+from src.storage import ReviewStore
 
-async def run_scraper():
-    print(f"🕷️ [Step 1] 启动爬虫 | 目标：{Config.TARGET_OPERATORS} | 范围：最近 {Config.DAYS_TO_SCRAPE} 天")
-    cutoff_date = datetime.now() - timedelta(days=Config.DAYS_TO_SCRAPE)
-    all_data = []
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+def review_url(company, page_num):
+    return f"{Config.HELLOPETER_API_BASE}/consumer/business/{company}/reviews?page={page_num}"
+
+
+def parse_reviews(company, content, cutoff_date, until=None):
+    # 返回 (本页有效行, 是否已越过时间窗口, 本页是否有数据)；传入 until 时不晚于它的评论才保留（回溯分片的上界）
+    try:
+        reviews = json.loads(content).get('data', [])
+    except:
+        reviews = []
+
+    rows = []
+    reached_cutoff = False
+    for item in reviews:
+        created_at = item.get('created_at', '')
+        try:
+            review_date = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
+        except:
+            review_date = datetime.now()
+
+        if review_date < cutoff_date:
+            reached_cutoff = True
+            continue
+        if until is not None and review_date >= until:
+            continue
+
+        rows.append({
+            "Operator": company,
+            "Date": review_date,
+            "Title": item.get('review_title', ''),
+            "Content": item.get('review_content', ''),
+            "Raw_Rating": item.get('review_rating', 0),
+            # 尝试构建URL，逻辑取自原代码
+            "Url": f"https://www.hellopeter.com/{company}/reviews/review-{item.get('id')}",
+            "Review_Id": str(item.get('id')),
+            # 评论中提到的城市 / 城区，用于按地点的突发检测
+            "Location": extract_location(f"{item.get('review_title', '')}. {item.get('review_content', '')}"),
+        })
+    return rows, reached_cutoff, bool(reviews)
+
+
+def _oldest(content):
+    # 本页最早一条评论的时间；空页返回 None
+    try:
+        reviews = json.loads(content).get('data', [])
+    except ValueError:
+        return None
+    dates = []
+    for item in reviews:
+        try:
+            dates.append(datetime.strptime(item.get('created_at', ''), "%Y-%m-%d %H:%M:%S"))
+        except ValueError:
+            pass
+    return min(dates) if dates else None
+
+
+async def find_first_page(fetcher, company, until):
+    # 评论按时间倒序分页：找到第一个含有早于 until 的评论的页。先按 1, 2, 4, 8... 倍增探测越过 until 的页，
+    # 再在最后一段里二分，只需 O(log 页数) 次请求，回溯较早的时间段时不必从第 1 页翻起
+    async def older(page):
+        oldest = _oldest(await fetcher.fetch_text(review_url(company, page)))
+        return oldest is None or oldest < until
+
+    lo, hi = 0, 1
+    while not await older(hi):
+        lo, hi = hi, hi * 2
+    # 此时第 lo 页全部不早于 until（lo=0 表示没有这样的页），第 hi 页已含更早的评论（或已无数据）
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if await older(mid):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+async def scrape_company(fetcher, company, cutoff_date, state=None, on_rows=None, checkpoint=None, until=None,
+                         first_page=1):
+    # 同一运营商一次预取 SCRAPER_PAGE_WINDOW 页，再按页码顺序套用原来的停止规则，
+    # 因此结果顺序与逐页抓取完全一致，越过停止点的预取页直接丢弃。
+    # 传入 state 时只保留新增/已修改的评论，并在碰到已知评论后停止翻页；
+    # 传入 on_rows 时每页结果立即交给下游（流水线模式）；
+    # 传入 checkpoint 时每页处理完即记入断点，恢复时先交出已抓取的行，再从下一页继续；
+    # 传入 until / first_page 时只抓 [cutoff_date, until) 内的评论，从 first_page 开始翻（回溯分片）
+    print(f"🏢 正在处理: {company}")
+    window = max(1, Config.SCRAPER_PAGE_WINDOW)
+    rows = []
+    page_num = first_page
+    resumed_ids = set()
+    if checkpoint is not None:
+        rows, next_page, finished = checkpoint.resume_company(company)
+        page_num = next_page or first_page
+        # 中断期间有新评论时，旧评论会往后顺延到后面的页，恢复后抓到的重复行丢掉
+        resumed_ids = {r['Review_Id'] for r in rows}
+        if rows:
+            print(f"   ♻️ [{company}] 断点中已有 {len(rows)} 条（抓到第 {page_num - 1} 页）")
+            if on_rows:
+                await on_rows(rows)
+        if finished:
+            return rows
+
+    while True:
+        batch = list(range(page_num, page_num + window))
+        results = await asyncio.gather(
+            *[fetcher.fetch_text(review_url(company, n)) for n in batch],
+            return_exceptions=True
+        )
+        for n, content in zip(batch, results):
+            if isinstance(content, Exception):
+                print(f"   ❌ [{company}] 错误: {content}")
+                return rows
+
+            page_rows, reached_cutoff, has_data = parse_reviews(company, content, cutoff_date, until)
+            if not has_data:
+                print(f"   -> [{company}] 无更多数据，停止该运营商。")
+                if checkpoint is not None:
+                    checkpoint.finish_company(company)
+                return rows
+
+            fresh_rows, reached_known = filter_new_rows(state, company, page_rows, cutoff_date)
+            if resumed_ids:
+                fresh_rows = [r for r in fresh_rows if r['Review_Id'] not in resumed_ids]
+            rows.extend(fresh_rows)
+            if checkpoint is not None:
+                checkpoint.add_page(company, n, fresh_rows)
+            if fresh_rows:
+                print(f"   [{company}] 第 {n} 页: 抓取 {len(fresh_rows)} 条")
+                if on_rows:
+                    await on_rows(fresh_rows)
+            if reached_known:
+                print(f"   -> [{company}] 已到达上次抓取位置，停止该运营商。")
+            if reached_cutoff or reached_known:
+                if checkpoint is not None:
+                    checkpoint.finish_company(company)
+                return rows
+        page_num += window
+
+
+async def crawl(backend=None, state=None, on_rows=None, checkpoint=None):
+    backend = backend or Config.SCRAPER_BACKEND
+    print(f"🕷️ [Step 1] 启动爬虫 | 目标：{Config.TARGET_OPERATORS} | 范围：最近 {Config.DAYS_TO_SCRAPE} 天 | 后端：{backend} | 并发：{Config.SCRAPER_CONCURRENCY} | 增量：{'是' if state else '否'}")
+    # 从断点恢复时沿用首次运行确定的时间窗口
+    cutoff_date = checkpoint.cutoff if checkpoint else datetime.now() - timedelta(days=Config.DAYS_TO_SCRAPE)
+
+    async with create_fetcher(backend) as fetcher:
+        # 各运营商并行抓取，最后按 TARGET_OPERATORS 顺序拼接
+        per_company = await asyncio.gather(
+            *[scrape_company(fetcher, company, cutoff_date, state, on_rows, checkpoint) for company in Config.TARGET_OPERATORS]
         )
-        page = await context.new_page()
-
-        for company in Config.TARGET_OPERATORS:
-            print(f"\n🏢 正在处理: {company}")
-            page_num = 1
-            stop_company = False
-
-            while not stop_company:
-                url = f"https://api.hellopeter.com/consumer/business/{company}/reviews?page={page_num}"
-                try:
-                    await page.goto(url, timeout=30000, wait_until="domcontentloaded")
-                    # 获取页面文本内容而不是HTML，因为API返回JSON
-                    content = await page.evaluate("() => document.body.innerText")
-
-                    try:
-                        reviews = json.loads(content).get('data', [])
-                    except:
-                        reviews = []
-
-                    if not reviews:
-                        print("   -> 无更多数据，停止该运营商。")
-                        break
-
-                    valid_count = 0
-                    for item in reviews:
-                        created_at = item.get('created_at', '')
-                        try:
-                            review_date = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S")
-                        except:
-                            review_date = datetime.now()
-
-                        if review_date < cutoff_date:
-                            stop_company = True
-                            continue 
-
-                        all_data.append({
-                            "Operator": company,
-                            "Date": review_date,
-                            "Title": item.get('review_title', ''),
-                            "Content": item.get('review_content', ''),
-                            "Raw_Rating": item.get('review_rating', 0),
-                            # 尝试构建URL，逻辑取自原代码
-                            "Url": f"https://www.hellopeter.com/{company}/reviews/review-{item.get('id')}"
-                        })
-                        valid_count += 1
-
-                    if valid_count > 0:
-                        print(f"   第 {page_num} 页: 抓取 {valid_count} 条")
-                        page_num += 1
-                        await asyncio.sleep(random.uniform(0.5, 1.5))
-                    else:
-                        stop_company = True
-
-                except Exception as e:
-                    print(f"   ❌ 错误: {e}")
-                    break
-
-        await browser.close()
+    rows = [row for rows in per_company for row in rows]
+    metrics.count('reviews_scraped', len(rows))
+    return rows
+
+
+async def run_scraper(backend=None, state=None, checkpoint=None):
+    all_data = await crawl(backend, state, checkpoint=checkpoint)
 
     if all_data:
         df = pd.DataFrame(all_data)
-        # 保存中间文件，方便调试，也符合你原有的流程
-        df.to_csv(Config.RAW_FILE, index=False, encoding='utf-8-sig')
-        print(f"\n✅ [Step 1 完成] 数据已保存至 {Config.RAW_FILE} (共 {len(df)} 条)")
+        # 原始评论追加进列式存储，方便调试和回溯
+        store = ReviewStore('raw')
+        store.append(df)
+        print(f"\n✅ [Step 1 完成] 数据已保存至 {store.path} (共 {len(df)} 条)")
         return df
     else:
         print("\n⚠️ [Step 1 警告] 未抓取到任何数据。")
@@ -0,0 +1,192 @@
+import os
+import zlib
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.cache import normalize_text
+from src.config import Config
+
+# MinHash 签名长度与 LSH 分带：64 个哈希分 16 带、每带 4 个。
+# Jaccard 0.8 的两条评论至少有一带完全相同的概率 > 99.9%
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(32)
+
+
+def shingle_hashes(text, n=SHINGLE):
+    # 归一化文本按字节取 n-gram，每个 n-gram 打包成整数后混合成 32 位哈希
+    data = np.frombuffer(normalize_text(text).encode('utf-8'), dtype=np.uint8)
+    if len(data) < n:
+        data = np.pad(data, (0, n - len(data)))
+    windows = sliding_window_view(data, n).astype(np.uint64)
+    packed = (windows << (np.arange(n, dtype=np.uint64) * np.uint64(8))).sum(axis=1)
+    return np.unique((packed * _GOLDEN) >> _SHIFT)
+
+
+def minhash(text):
+    # multiply-shift 哈希族：每个排列取 n-gram 哈希的最小值
+    h = shingle_hashes(text)
+    return ((_A[:, None] * h[None, :] + _B[:, None]) >> _SHIFT).min(axis=1).astype(np.uint32)
+
+
+def band_hashes(signatures):
+    sigs = np.asarray(signatures, dtype=np.uint32).reshape(-1, BANDS, ROWS).astype(np.uint64)
+    return (sigs * _BAND_MIX).sum(axis=2)
+
+
+def similarity(sig, signatures):
+    # 签名逐位相同的比例 ≈ Jaccard 相似度
+    return (np.asarray(signatures) == sig).mean(axis=-1)
+
+
+class NearDupIndex:
+    # 近重复评论索引：MinHash 签名与对应的分类缓存键追加写入磁盘，读取时内存映射；
+    # 每一带的哈希排好序后用二分查找找候选，再用签名相似度确认
+    def __init__(self, path=None, threshold=None):
+        self.path = path or Config.SEMANTIC_INDEX_DIR
+        self.threshold = Config.NEAR_DUP_THRESHOLD if threshold is None else threshold
+        os.makedirs(self.path, exist_ok=True)
+        self._sig_path = os.path.join(self.path, 'signatures.u32')
+        self._key_path = os.path.join(self.path, 'keys.bin')
+        self.hits = 0
+        self.lookups = 0
+
+        # 两个文件可能因中途退出长度不一致，以较短的为准
+        size = lambda p: os.path.getsize(p) if os.path.exists(p) else 0
+        n = min(size(self._sig_path) // (NUM_PERM * 4), size(self._key_path) // 64)
+        if n:
+            self._sigs = np.memmap(self._sig_path, dtype=np.uint32, mode='r', shape=(n, NUM_PERM))
+            self._keys = np.memmap(self._key_path, dtype='S64', mode='r', shape=(n,))
+        else:
+            self._sigs = np.zeros((0, NUM_PERM), dtype=np.uint32)
+            self._keys = np.zeros(0, dtype='S64')
+        bands = band_hashes(self._sigs) if n else np.zeros((0, BANDS), dtype=np.uint64)
+        self._order = [np.argsort(bands[:, b], kind='stable') for b in range(BANDS)]
+        self._sorted = [bands[order, b] for b, order in enumerate(self._order)]
+
+        # 本次运行新加入的条目：放在内存里，下次打开时并入排序数组
+        self._recent = {}
+        self._recent_sigs = []
+        self._recent_keys = []
+        self._truncate(n)
+
+    def _truncate(self, n):
+        for path, width in ((self._sig_path, NUM_PERM * 4), (self._key_path, 64)):
+            if os.path.exists(path) and os.path.getsize(path) != n * width:
+                with open(path, 'r+b') as f:
+                    f.truncate(n * width)
+
+    def __len__(self):
+        return len(self._keys) + len(self._recent_keys)
+
+    def query(self, sig):
+        # 返回最相似且相似度 ≥ threshold 的已有条目的缓存键，没有则返回 None
+        self.lookups += 1
+        bands = band_hashes(sig)[0]
+        base = len(self._keys)
+        found = []
+        for b in range(BANDS):
+            lo = np.searchsorted(self._sorted[b], bands[b], side='left')
+            hi = np.searchsorted(self._sorted[b], bands[b], side='right')
+            found.append(self._order[b][lo:hi])
+            found.append(np.asarray(self._recent.get((b, int(bands[b])), ()), dtype=np.int64))
+        ids = np.unique(np.concatenate(found))
+        if not len(ids):
+            return None
+
+        old, new = ids[ids < base], ids[ids >= base]
+        sigs = self._sigs[old]
+        if len(new):
+            sigs = np.concatenate([sigs, np.stack([self._recent_sigs[i - base] for i in new])])
+        ids = np.concatenate([old, new])
+        scores = similarity(sig, sigs)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        self.hits += 1
+        i = int(ids[best])
+        key = self._keys[i] if i < base else self._recent_keys[i - base]
+        return key.decode('ascii')
+
+    def add(self, sig, key):
+        i = len(self)
+        for b, h in enumerate(band_hashes(sig)[0]):
+            self._recent.setdefault((b, int(h)), []).append(i)
+        self._recent_sigs.append(sig)
+        self._recent_keys.append(key.encode('ascii'))
+        # 先写签名再写键：中途退出时多出来的签名会在下次打开时截掉
+        with open(self._sig_path, 'ab') as f:
+            f.write(np.asarray(sig, dtype=np.uint32).tobytes())
+        with open(self._key_path, 'ab') as f:
+            f.write(key.encode('ascii').ljust(64, b'\0'))
+
+    def stats(self):
+        return {'entries': len(self), 'lookups': self.lookups, 'near_dup_hits': self.hits}
+
+
+def group_near_duplicates(signatures, threshold=None):
+    # 一批签名内部的近重复分组：返回每条对应的代表（组内第一条）下标
+    threshold = Config.NEAR_DUP_THRESHOLD if threshold is None else threshold
+    buckets = {}
+    reps = []
+    for i, sig in enumerate(signatures):
+        rep = i
+        bands = band_hashes(sig)[0]
+        seen = set()
+        for b in range(BANDS):
+            for j in buckets.get((b, int(bands[b])), ()):
+                if j not in seen:
+                    seen.add(j)
+                    if similarity(sig, signatures[j]) >= threshold:
+                        rep = j
+                        break
+            if rep != i:
+                break
+        reps.append(rep)
+        if rep == i:
+            for b in range(BANDS):
+                buckets.setdefault((b, int(bands[b])), []).append(i)
+    return reps
+
+
+# ===========================
+# L2 问题归并：字符 n-gram 哈希向量 + 余弦相似度贪心聚类
+# ===========================
+def embed(texts, dim=512, n=3):
+    # 本地、离线的文本向量：词边界补空格后取字符 n-gram，哈希到 dim 维并 L2 归一化
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f" {normalize_text(text).replace('/', ' ')} "
+        for i in range(max(1, len(padded) - n + 1)):
+            out[row, zlib.crc32(padded[i:i + n].encode('utf-8')) % dim] += 1
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.where(norms == 0, 1, norms)
+
+
+def canonical_issues(counts, threshold=None):
+    # counts: {问题描述: 评论数}。按数量从多到少，与已有的规范问题足够相似就并入，否则自成一组；
+    # 每组以数量最多的写法作为规范名称。返回 {原写法: 规范名称}
+    threshold = Config.ISSUE_CLUSTER_THRESHOLD if threshold is None else threshold
+    labels = sorted(counts, key=lambda k: (-counts[k], str(k)))
+    if not labels:
+        return {}
+    vectors = embed([str(label) for label in labels])
+    canon_idx = []
+    mapping = {}
+    for i, label in enumerate(labels):
+        if canon_idx:
+            sims = vectors[canon_idx] @ vectors[i]
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold:
+                mapping[label] = labels[canon_idx[best]]
+                continue
+        canon_idx.append(i)
+        mapping[label] = label
+    return mapping
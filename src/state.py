@@ -0,0 +1,118 @@
+import hashlib
+import sqlite3
+from datetime import datetime
+from src.config import Config
+
+
+def review_hash(row):
+    # 标题 / 正文 / 评分任一变化都视为"已修改"的评论
+    raw = f"{row.get('Title', '')}\x1f{row.get('Content', '')}\x1f{row.get('Raw_Rating', '')}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _iso(value):
+    return value.isoformat(sep=' ') if hasattr(value, 'isoformat') else str(value)
+
+
+class StateStore:
+    # 增量抓取状态：每个运营商已见过的评论 id / 内容哈希，以及最新一条的高水位；
+    # 分析失败的评论记入 retries，下次运行翻页到它们为止，重新抓取和分析
+    def __init__(self, path=None):
+        self.path = path or Config.STATE_DB
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                operator TEXT NOT NULL,
+                review_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (operator, review_id)
+            );
+            CREATE TABLE IF NOT EXISTS watermarks (
+                operator TEXT PRIMARY KEY,
+                created_at TEXT NOT NULL,
+                review_id TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS retries (
+                operator TEXT NOT NULL,
+                review_id TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (operator, review_id)
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def watermark(self, operator):
+        row = self.conn.execute(
+            "SELECT created_at, review_id FROM watermarks WHERE operator = ?", (operator,)
+        ).fetchone()
+        return (datetime.fromisoformat(row[0]), row[1]) if row else None
+
+    def known_hashes(self, operator, review_ids):
+        if not review_ids:
+            return {}
+        marks = ",".join("?" * len(review_ids))
+        rows = self.conn.execute(
+            f"SELECT review_id, content_hash FROM reviews WHERE operator = ? AND review_id IN ({marks})",
+            (operator, *review_ids)
+        ).fetchall()
+        return dict(rows)
+
+    def oldest_retry(self, operator, since=None):
+        # 待重试评论中最早的时间；早于 since（已移出抓取窗口）的不再重试，顺带删除
+        with self.conn:
+            if since is not None:
+                self.conn.execute("DELETE FROM retries WHERE operator = ? AND created_at < ?",
+                                  (operator, _iso(since)))
+            row = self.conn.execute("SELECT MIN(created_at) FROM retries WHERE operator = ?", (operator,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def mark_failed(self, rows):
+        # 分析失败的评论：不记为已见，下次运行继续翻页直到重新抓到它们
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO retries VALUES (?, ?, ?)",
+                                  [(r['Operator'], str(r['Review_Id']), _iso(r['Date'])) for r in rows])
+
+    def mark_seen(self, rows):
+        # 在下游（分析 + 历史落盘）成功之后再调用，避免失败的评论被当成已处理
+        with self.conn:
+            for r in rows:
+                created_at = _iso(r['Date'])
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO reviews VALUES (?, ?, ?, ?)",
+                    (r['Operator'], str(r['Review_Id']), created_at, review_hash(r))
+                )
+                self.conn.execute("DELETE FROM retries WHERE operator = ? AND review_id = ?",
+                                  (r['Operator'], str(r['Review_Id'])))
+                self.conn.execute("""
+                    INSERT INTO watermarks VALUES (?, ?, ?)
+                    ON CONFLICT(operator) DO UPDATE SET created_at = excluded.created_at, review_id = excluded.review_id
+                    WHERE excluded.created_at > watermarks.created_at
+                """, (r['Operator'], created_at, str(r['Review_Id'])))
+
+
+def filter_new_rows(state, company, page_rows, cutoff_date=None):
+    # 返回 (新增或已修改的行, 是否已碰到已知评论)；评论按时间倒序，碰到已知即可停止翻页。
+    # 还有上次分析失败、尚未重新抓到的评论时，继续翻页直到越过其中最早的一条
+    if state is None:
+        return page_rows, False
+    known = state.known_hashes(company, [str(r['Review_Id']) for r in page_rows])
+    mark = state.watermark(company)
+    fresh = [r for r in page_rows if known.get(str(r['Review_Id'])) != review_hash(r)]
+    reached_known = any(known.get(str(r['Review_Id'])) == review_hash(r) for r in page_rows)
+    if mark and any(r['Date'] < mark[0] for r in page_rows):
+        reached_known = True
+    if reached_known and page_rows:
+        pending = state.oldest_retry(company, cutoff_date)
+        if pending is not None and min(r['Date'] for r in page_rows) > pending:
+            reached_known = False
+    return fresh, reached_known
+
@@ -0,0 +1,177 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from src.config import Config
+
+# 列式存储：按 运营商 / ISO 周 分区的 Parquet 数据集（hive 目录风格），只追加不覆盖
+PARTITION_COLUMNS = ['Operator', 'Week']
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+RAW_SCHEMA = pa.schema([
+    ('Operator', pa.string()),
+    ('Week', pa.string()),
+    ('Date', pa.timestamp('us')),
+    ('Review_Id', pa.string()),
+    ('Title', pa.string()),
+    ('Content', pa.string()),
+    ('Raw_Rating', pa.int16()),
+    ('Url', pa.string()),
+    # 评论中提到的地点（没有提到为 null；早期写入的文件没有这一列，读出同样为 null）
+    ('Location', pa.string()),
+    ('Ingested_At', pa.timestamp('us')),
+])
+
+ANALYZED_SCHEMA = pa.schema(list(RAW_SCHEMA) + [
+    ('L1_Category', CATEGORY),
+    ('L2_Issue', CATEGORY),
+    ('Service_Type', CATEGORY),
+    ('Sentiment', CATEGORY),
+    ('Summary', pa.string()),
+    # 标注来源：llm / rules / model（本地预分类），以及本地预分类的置信度
+    ('Label_Source', CATEGORY),
+    ('Confidence', pa.float32()),
+])
+
+SCHEMAS = {'raw': RAW_SCHEMA, 'analyzed': ANALYZED_SCHEMA}
+
+# 报告（clean_data + build_cube）实际用到的列
+REPORT_COLUMNS = ['Operator', 'Date', 'Content', 'Url', 'L1_Category', 'L2_Issue', 'Service_Type', 'Sentiment',
+                  'Location']
+
+
+def iso_week(dates):
+    iso = dates.dt.isocalendar()
+    return iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)
+
+
+def weeks_between(start, end):
+    # 日期范围覆盖到的全部 ISO 周，用于分区裁剪
+    weeks = []
+    day = start.date()
+    while day <= end.date():
+        year, week, _ = day.isocalendar()
+        label = f"{year}-W{week:02d}"
+        if label not in weeks:
+            weeks.append(label)
+        day += timedelta(days=1)
+    return weeks
+
+
+class ReviewStore:
+    def __init__(self, kind='analyzed', root=None):
+        self.kind = kind
+        self.schema = SCHEMAS[kind]
+        self.path = os.path.join(root or Config.DATA_DIR, kind)
+
+    def _to_table(self, df):
+        df = df.copy()
+        df['Date'] = pd.to_datetime(df['Date'])
+        df['Week'] = iso_week(df['Date'])
+        df['Review_Id'] = df['Review_Id'].astype(str)
+        df['Ingested_At'] = pd.Timestamp(datetime.now())
+        if 'Confidence' in df.columns:
+            df['Confidence'] = pd.to_numeric(df['Confidence'], errors='coerce')
+        if 'Raw_Rating' in df.columns:
+            df['Raw_Rating'] = pd.to_numeric(df['Raw_Rating'], errors='coerce').fillna(0).astype('int16')
+        for field in self.schema:
+            if field.name not in df.columns:
+                df[field.name] = None
+            elif pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+                # 字符串/类别列统一为字符串，缺失保持为 null
+                df[field.name] = df[field.name].astype(object).where(df[field.name].notna(), None).astype(object)
+        return pa.Table.from_pandas(df[self.schema.names], schema=self.schema, preserve_index=False)
+
+    def append(self, df):
+        if df is None or df.empty:
+            return 0
+        ds.write_dataset(
+            self._to_table(df), self.path, format='parquet',
+            partitioning=PARTITION_COLUMNS, partitioning_flavor='hive',
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        return len(df)
+
+    def _dataset(self, path=None, schema=None):
+        return ds.dataset(path or self.path, format='parquet', partitioning='hive', schema=schema or self.schema)
+
+    def exists(self):
+        return os.path.isdir(self.path) and any(os.scandir(self.path))
+
+    def load(self, columns=None, start=None, end=None, operators=None, dedupe=True):
+        # 只读需要的列与日期范围：Week/Operator 走目录裁剪，Date 走 Parquet 统计信息
+        if not self.exists():
+            return pd.DataFrame(columns=columns or self.schema.names)
+        dataset = self._dataset()
+
+        flt = None
+        def both(expr):
+            return expr if flt is None else flt & expr
+        if start is not None:
+            end_for_weeks = end or datetime.now()
+            flt = both(ds.field('Week').isin(weeks_between(start, end_for_weeks)))
+            flt = both(ds.field('Date') >= pa.scalar(start, pa.timestamp('us')))
+        if end is not None:
+            flt = both(ds.field('Date') <= pa.scalar(end, pa.timestamp('us')))
+        if operators:
+            flt = both(ds.field('Operator').isin(list(operators)))
+
+        wanted = [c for c in (columns or self.schema.names) if c in self.schema.names]
+        read_cols = list(dict.fromkeys(wanted + (['Operator', 'Date', 'Review_Id', 'Ingested_At'] if dedupe else [])))
+        df = dataset.to_table(columns=read_cols, filter=flt).to_pandas()
+        for col in PARTITION_COLUMNS:
+            # 分区列取值来自目录名，读出后同样转成类别类型
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+
+        if dedupe and not df.empty:
+            df = latest_versions(df)
+            df = df.sort_values(['Operator', 'Date'], ascending=[True, False], kind='stable')
+        return df[wanted].reset_index(drop=True)
+
+    def compact(self, min_files=4):
+        # 每次运行都会给涉及的分区新增一个小文件；文件数达到 min_files 的分区合并成一个（顺带去重）
+        if not self.exists():
+            return 0
+        file_schema = pa.schema([f for f in self.schema if f.name not in PARTITION_COLUMNS])
+        merged = 0
+        for op_dir in os.scandir(self.path):
+            if not op_dir.is_dir():
+                continue
+            for week_dir in os.scandir(op_dir.path):
+                files = [e.path for e in os.scandir(week_dir.path) if e.name.endswith('.parquet')]
+                if len(files) < min_files:
+                    continue
+                table = self._dataset(files, file_schema).to_table()
+                df = latest_versions(table.to_pandas(), keys=['Review_Id'])
+                table = pa.Table.from_pandas(df, schema=file_schema, preserve_index=False)
+                # 先写新文件再删旧文件：中途失败最多留下重复行，读取时会被去重。
+                # 临时文件以 '.' 开头，数据集扫描会忽略它，崩溃残留的半个文件不会被读到
+                name = f"part-{uuid.uuid4().hex}-0.parquet"
+                tmp = os.path.join(week_dir.path, f".{name}.tmp")
+                pq.write_table(table, tmp)
+                os.replace(tmp, os.path.join(week_dir.path, name))
+                for path in files:
+                    os.remove(path)
+                merged += 1
+        return merged
+
+
+def latest_versions(df, keys=('Operator', 'Review_Id')):
+    # 同一条评论被多次写入（修改过 / 非增量重跑）时保留最后写入的版本
+    df = df.sort_values('Ingested_At', kind='stable')
+    return df.drop_duplicates(subset=list(keys), keep='last')
+
+
+def load_report_window(store=None, days=None):
+    # 报告只读需要的列和最近 days 天（同一评论取最新版本）
+    store = store or ReviewStore('analyzed')
+    days = days or Config.DAYS_TO_SCRAPE
+    start = datetime.now() - timedelta(days=days)
+    window = store.load(columns=REPORT_COLUMNS, start=start)
+    print(f"📚 读取报告窗口: 最近 {days} 天共 {len(window)} 条 ({store.path})")
+    return window
@@ -0,0 +1,173 @@
+import sqlite3
+from datetime import date, timedelta
+from src.config import Config
+
+WINDOWS = (7, 28, 90)
+# 累计表里 l1 为空串表示该运营商+情感下全部类别的合计
+ALL = ''
+
+
+def _day(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def last_complete_day(day=None):
+    # 当天还在产生评论、不写入趋势库；基线最多算到昨天
+    yesterday = date.today() - timedelta(days=1)
+    return yesterday if day is None else min(day, yesterday)
+
+
+def pct_change(current, previous):
+    if not previous:
+        return None
+    return round((current - previous) / previous * 100, 1)
+
+
+class TrendStore:
+    # 历史趋势：按 日 × 运营商 × 情感 × L1 × L2 记录评论数，并维护按日累计值。
+    # 任意窗口的合计 = 两个累计值之差，新的一天到来只需写入当天，无需回扫历史
+    def __init__(self, path=None):
+        self.path = path or Config.TREND_DB
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_counts (
+                day TEXT NOT NULL,
+                operator TEXT NOT NULL,
+                sentiment TEXT NOT NULL,
+                l1 TEXT NOT NULL,
+                l2 TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (day, operator, sentiment, l1, l2)
+            );
+            CREATE TABLE IF NOT EXISTS cumulative (
+                operator TEXT NOT NULL,
+                sentiment TEXT NOT NULL,
+                l1 TEXT NOT NULL,
+                day TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (operator, sentiment, l1, day)
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self):
+        return self.conn.execute("SELECT 1 FROM daily_counts LIMIT 1").fetchone() is None
+
+    def first_day(self):
+        row = self.conn.execute("SELECT MIN(day) FROM daily_counts").fetchone()
+        return date.fromisoformat(row[0]) if row[0] else None
+
+    def covers(self, day, days):
+        # 历史是否完整覆盖 (day - days, day]；不足时不给出均值/环比，避免把"没数据"当成"零投诉"
+        first = self.first_day()
+        return first is not None and first <= day - timedelta(days=days - 1)
+
+    def update(self, df, since=None, until=None):
+        # df 为 clean_data 之后的数据；since 之前的日期不完整（窗口起点被截断），until 及之后的日期也不完整
+        # （当天还会有新评论，而下次运行的窗口不再覆盖它），都不写入。
+        # 替换 [since, until) 内的每一天（未给出时取 df 的首末日期），没有评论的日期记为 0：
+        # 与已有计数的差值顺延加到之后的累计值上
+        data = df if since is None else df[df['Day'] >= since]
+        data = data if until is None else data[data['Day'] < until]
+        first = since if since is not None else (min(data['Day']) if len(data) else None)
+        last = until - timedelta(days=1) if until is not None else (max(data['Day']) if len(data) else None)
+        if first is None or last is None or first > last:
+            return 0
+        bounds = (_day(first), _day(last))
+        counts = data.groupby(['Day', 'Operator', 'Sentiment', 'L1_Category', 'L2_Issue'],
+                              observed=True).size()
+
+        new = {(_day(day), str(op), str(s), str(l1), str(l2)): int(n)
+               for (day, op, s, l1, l2), n in counts.items() if n > 0}
+        old = {tuple(row[:5]): row[5] for row in self.conn.execute(
+            "SELECT day, operator, sentiment, l1, l2, count FROM daily_counts WHERE day BETWEEN ? AND ?", bounds)}
+
+        deltas = {}
+        for key in new.keys() | old.keys():
+            delta = new.get(key, 0) - old.get(key, 0)
+            if delta:
+                day, op, s, l1, _ = key
+                for level in (ALL, l1):
+                    deltas[(op, s, level, day)] = deltas.get((op, s, level, day), 0) + delta
+
+        with self.conn:
+            self.conn.execute("DELETE FROM daily_counts WHERE day BETWEEN ? AND ?", bounds)
+            self.conn.executemany("INSERT INTO daily_counts VALUES (?, ?, ?, ?, ?, ?)",
+                                  [(*key, n) for key, n in new.items()])
+            for (op, s, l1, day), delta in sorted(deltas.items(), key=lambda kv: kv[0][3]):
+                if delta == 0:
+                    continue
+                # 当天还没有累计行时，先按前一个累计值补一行，再把差值加到当天及之后的所有行
+                self.conn.execute("""
+                    INSERT OR IGNORE INTO cumulative VALUES (?, ?, ?, ?, ?)
+                """, (op, s, l1, day, self._cumulative(op, s, l1, day)))
+                self.conn.execute("""
+                    UPDATE cumulative SET total = total + ?
+                    WHERE operator = ? AND sentiment = ? AND l1 = ? AND day >= ?
+                """, (delta, op, s, l1, day))
+        return len(new)
+
+    def _cumulative(self, operator, sentiment, l1, day):
+        # 截至 day（含）的累计评论数
+        row = self.conn.execute("""
+            SELECT total FROM cumulative
+            WHERE operator = ? AND sentiment = ? AND l1 = ? AND day <= ?
+            ORDER BY day DESC LIMIT 1
+        """, (operator, sentiment, l1, _day(day))).fetchone()
+        return row[0] if row else 0
+
+    def window_total(self, operator, sentiment, day, days, l1=ALL):
+        # (day - days, day] 区间内的评论数
+        return (self._cumulative(operator, sentiment, l1, day)
+                - self._cumulative(operator, sentiment, l1, day - timedelta(days=days)))
+
+    def rolling(self, operator, sentiment, day, l1=ALL):
+        # 截至 day 的 7/28/90 天日均（历史不足的窗口为 None）
+        return {w: round(self.window_total(operator, sentiment, day, w, l1) / w, 2) if self.covers(day, w) else None
+                for w in WINDOWS}
+
+    def deltas(self, operator, sentiment, day, l1=ALL):
+        # 周环比（最近 7 天 vs 前 7 天）与月环比（最近 28 天 vs 前 28 天），单位 %
+        out = {}
+        for name, w in (('wow', 7), ('mom', 28)):
+            if not self.covers(day, 2 * w):
+                out[name] = None
+                continue
+            current = self.window_total(operator, sentiment, day, w, l1)
+            previous = self.window_total(operator, sentiment, day - timedelta(days=w), w, l1)
+            out[name] = pct_change(current, previous)
+        return out
+
+    def rolling_series(self, operator, sentiment, start, end, window=7, l1=ALL):
+        # start..end 每天的 window 天滑动日均：只读取 [start - window, end] 范围的累计行
+        rows = self.conn.execute("""
+            SELECT day, total FROM cumulative
+            WHERE operator = ? AND sentiment = ? AND l1 = ? AND day BETWEEN ? AND ?
+            ORDER BY day
+        """, (operator, sentiment, l1, _day(start - timedelta(days=window)), _day(end))).fetchall()
+        base = self._cumulative(operator, sentiment, l1, start - timedelta(days=window + 1))
+
+        cum = {}
+        level = base
+        idx = 0
+        day = start - timedelta(days=window)
+        while day <= end:
+            while idx < len(rows) and rows[idx][0] <= _day(day):
+                level = rows[idx][1]
+                idx += 1
+            cum[day] = level
+            day += timedelta(days=1)
+        series = []
+        day = start
+        while day <= end:
+            series.append((day, round((cum[day] - cum[day - timedelta(days=window)]) / window, 2)))
+            day += timedelta(days=1)
+        return series
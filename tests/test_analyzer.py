@@ -0,0 +1,20 @@
+from datetime import datetime
+import pandas as pd
+from src.analyzer import pending_reviews
+from src.storage import ReviewStore
+
+
+def test_failed_analysis_is_pending_again(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.config.Config.DATA_DIR", str(tmp_path))
+    raw = pd.DataFrame({
+        'Operator': 'Vodacom', 'Date': datetime.now().strftime('%Y-%m-%d'), 'Review_Id': ['1', '2'],
+        'Title': 't', 'Content': ['no signal', 'charged twice'], 'Raw_Rating': 1, 'Url': 'u',
+    })
+    ReviewStore('raw').append(raw)
+    analyzed = raw.assign(L1_Category=['Network', 'Unknown'], L2_Issue=['No Signal', 'Analysis Failed'],
+                          Service_Type='MBB', Sentiment=['Negative', 'Neutral'], Summary='')
+    ReviewStore('analyzed').append(analyzed)
+
+    # 分析成功的不再待分析；分析失败的那条要重新送 LLM
+    pending = pending_reviews(days=7)
+    assert list(pending['Review_Id']) == ['2']
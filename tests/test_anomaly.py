@@ -0,0 +1,86 @@
+import json
+from datetime import datetime, timedelta
+import numpy as np
+from src.anomaly import ANY_LOCATION, SEP, BurstDetector, CountMinSketch, event_keys
+from src.rules import extract_location
+from src.scraper import parse_reviews
+
+START = datetime(2026, 1, 5)
+
+
+def test_location_is_extracted_from_the_review_text():
+    assert extract_location("No signal in Durban North since Friday") == "Durban North"
+    assert extract_location("jhb fibre is down") == "Johannesburg"
+    assert extract_location("The router is broken") is None
+    page = json.dumps({"data": [{"id": 1, "created_at": "2026-01-05 10:00:00", "review_title": "Outage in Soweto",
+                                 "review_content": "No network", "review_rating": 1}]})
+    rows, _, _ = parse_reviews("vodacom", page, START - timedelta(days=1))
+    assert rows[0]["Location"] == "Soweto"
+
+
+def test_event_keys_add_a_location_key_only_when_known():
+    row = {"Operator": "MTN", "L2_Issue": "Network Outage"}
+    assert event_keys(dict(row, Location="Soweto")) == [SEP.join(("MTN", "Network Outage", ANY_LOCATION)),
+                                                        SEP.join(("MTN", "Network Outage", "Soweto"))]
+    for location in [None, "Unknown", " ", float("nan")]:
+        assert len(event_keys(dict(row, Location=location))) == 1
+
+
+def test_count_min_sketch_never_underestimates():
+    rng = np.random.default_rng(0)
+    sketch = CountMinSketch(width=64, depth=4)
+    truth = {}
+    for key in rng.integers(0, 500, 3000):
+        truth[str(key)] = truth.get(str(key), 0) + 1
+        sketch.add(str(key))
+    assert all(sketch.estimate(k) >= n for k, n in truth.items())
+    assert sketch.estimate("never-added") >= 0
+
+
+def events(hour, n, location="Soweto", issue="Network Outage", sentiment="Negative", start_id=0):
+    t = START + timedelta(hours=hour)
+    return [{"Operator": "MTN", "Date": t + timedelta(seconds=i), "Review_Id": f"{hour}-{start_id + i}",
+             "L2_Issue": issue, "Sentiment": sentiment, "Location": location} for i in range(n)]
+
+
+def detector():
+    return BurstDetector(bucket_hours=1, threshold=3.0, min_count=5, capacity=100, alpha=0.3)
+
+
+def test_steady_traffic_does_not_alert_and_a_burst_does():
+    det = detector()
+    for hour in range(12):
+        assert det.observe_rows(events(hour, 2)) == []
+    fired = det.observe_rows(events(12, 15))
+    locations = {a["location"] for a in fired}
+    # 同一故障：全局 与 Soweto 两个 key 都报警，报警只在越过阈值时触发一次，计数随后更新
+    assert locations == {ANY_LOCATION, "Soweto"}
+    alert = det.recent_alerts()[0]
+    assert alert["operator"] == "MTN" and alert["issue"] == "Network Outage" and alert["count"] == 15
+
+
+def test_positive_failed_and_duplicate_reviews_are_ignored():
+    det = detector()
+    for hour in range(12):
+        det.observe_rows(events(hour, 2))
+    noise = (events(12, 15, sentiment="Positive", start_id=100) + events(12, 15, issue="Analysis Failed", start_id=200)
+             + events(12, 4) * 5)
+    assert det.observe_rows(noise) == []
+
+
+def test_state_survives_save_and_load(tmp_path, monkeypatch):
+    # load() 用配置构造检测器；时间桶大小与保存时不同会丢弃状态
+    for key, value in {"BURST_BUCKET_HOURS": 1, "BURST_THRESHOLD": 3.0, "BURST_MIN_COUNT": 5,
+                       "BURST_CAPACITY": 100, "BURST_ALPHA": 0.3}.items():
+        monkeypatch.setattr(f"src.config.Config.{key}", value)
+    path = str(tmp_path / "burst.json")
+    det = BurstDetector()
+    for hour in range(12):
+        det.observe_rows(events(hour, 2))
+    det.save(path)
+    loaded = BurstDetector.load(path)
+    assert loaded.baselines == det.baselines
+    assert {a["location"] for a in loaded.observe_rows(events(12, 15))} == {ANY_LOCATION, "Soweto"}
+    # 早于当前桶的评论（迟到数据）不参与检测
+    assert loaded.observe_rows(events(3, 20, start_id=500)) == []
+    assert loaded.stats()["late"] == 20
@@ -0,0 +1,88 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from src.backfill import Backfill, run_shard_async
+from src.checkpoint import Checkpoint
+
+
+def make_stale(job, shard_id):
+    past = time.time() - 3600
+    os.utime(job.lock_path(shard_id), (past, past))
+
+
+def test_stale_lock_is_taken_over_and_old_owner_loses_it(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.config.Config.BACKFILL_LOCK_TIMEOUT", 60)
+    # 两个实例相当于两个进程（各自的令牌）
+    old, new = Backfill(str(tmp_path)), Backfill(str(tmp_path))
+    assert old.claim('s1')
+    assert not new.claim('s1')
+
+    make_stale(old, 's1')
+    assert new.claim('s1')
+    # 原持有者恢复后：心跳发现锁已易主，释放时也不能删掉接管者的锁
+    assert not old.heartbeat('s1')
+    old.release('s1')
+    assert os.path.exists(new.lock_path('s1'))
+    assert new.heartbeat('s1')
+    new.release('s1')
+    assert not os.path.exists(new.lock_path('s1'))
+    assert not [n for n in os.listdir(tmp_path / 'locks') if n.endswith(('.lock', '.tmp'))]
+
+
+def test_only_one_process_takes_over_a_stale_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.config.Config.BACKFILL_LOCK_TIMEOUT", 60)
+    for round_ in range(30):
+        shard_id = f"s{round_}"
+        Backfill(str(tmp_path)).claim(shard_id)
+        make_stale(Backfill(str(tmp_path)), shard_id)
+        jobs = [Backfill(str(tmp_path)) for _ in range(8)]
+        barrier = threading.Barrier(len(jobs))
+        won = []
+
+        def contend(job):
+            barrier.wait()
+            if job.claim(shard_id):
+                won.append(job)
+
+        threads = [threading.Thread(target=contend, args=(job,)) for job in jobs]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(won) == 1
+        assert won[0].heartbeat(shard_id)
+
+
+@pytest.mark.parametrize('stalls', [True, False])
+def test_worker_that_lost_its_lock_leaves_the_new_owner_alone(tmp_path, monkeypatch, stalls):
+    # 第一个 worker 执行到一半时锁过期并被接管：
+    # stalls=True  之后仍在工作，由心跳取消；stalls=False  马上完成，由写结果前的检查拦下
+    monkeypatch.setattr("src.config.Config.BACKFILL_LOCK_TIMEOUT", 0.3)
+    root = str(tmp_path)
+    shard = {'id': 's1', 'operator': 'Vodacom', 'start': '2026-01-01T00:00:00', 'end': '2026-01-08T00:00:00'}
+    new = Backfill(root)
+    taken = {}
+
+    async def scrape_and_classify(shard, rate, checkpoint):
+        checkpoint.add_page('Vodacom', 1, [{'Operator': 'Vodacom', 'Review_Id': '1'}])
+        make_stale(new, 's1')
+        assert new.claim('s1')
+        taken['checkpoint'] = Checkpoint('s1', resume=True, root=new._path('checkpoints'), max_age_hours=0)
+        if stalls:
+            await asyncio.sleep(10)
+        return [{'Operator': 'Vodacom', 'Review_Id': '1'}], 0
+
+    monkeypatch.setattr("src.backfill._scrape_and_classify", scrape_and_classify)
+    start = time.perf_counter()
+    result = asyncio.run(run_shard_async(root, shard, rate=None))
+    assert result['status'] == 'skipped'
+    assert time.perf_counter() - start < 5
+
+    # 接管者的断点、锁都还在，结果未被写入
+    assert taken['checkpoint'].resume_company('Vodacom')[1] == 2
+    assert os.path.exists(os.path.join(new._path('checkpoints'), 's1', 'pages.jsonl'))
+    assert new.heartbeat('s1')
+    assert not os.path.exists(new.result_path('s1'))
+    assert not [n for n in os.listdir(tmp_path / 'results')]
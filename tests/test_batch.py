@@ -0,0 +1,81 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from src.analyzer import FAILED_RESULT, classify_rows, parse_batch_response
+
+
+def item(index=None, **overrides):
+    out = {"L1_Category": "Network", "L2_Issue": "No Signal/Dead Zone", "Service_Type": "MBB",
+           "Sentiment": "Negative", "Summary": "No signal."}
+    if index is not None:
+        out["index"] = index
+    out.update(overrides)
+    return out
+
+
+def test_parser_aligns_results_by_index():
+    content = json.dumps({"results": [item(2, Summary="third"), item(0, Summary="first")]})
+    results = parse_batch_response(content, 3)
+    assert [r and r["Summary"] for r in results] == ["first", None, "third"]
+    assert "index" not in results[0]
+
+
+def test_parser_ignores_extra_duplicate_and_invalid_items():
+    content = json.dumps({"results": [
+        item(0), item(0, Summary="duplicate"), item(7), item(-1), item("x"), "junk",
+        item(1, Sentiment=""), item(2, L2_Issue=None),
+    ]})
+    results = parse_batch_response(content, 3)
+    assert results[0]["Summary"] == "No signal."
+    # 字段为空 / 缺失的条目无效，留给逐条重试
+    assert results[1] is None and results[2] is None
+
+
+def test_parser_survives_malformed_json():
+    assert parse_batch_response("not json {", 2) == [None, None]
+    assert parse_batch_response(json.dumps({"results": {"0": item()}}), 2) == [None, None]
+    assert parse_batch_response(json.dumps({"other": []}), 2) == [None, None]
+
+
+class StubRouter:
+    # 批量请求按预设内容回答（漏掉第 1 条），单条请求总是成功；记录每次请求的路由与类型
+    def __init__(self, batch_content):
+        self.batch_content = batch_content
+        self.calls = []
+
+    def route(self, row):
+        return 'cheap'
+
+    async def complete(self, route, messages, estimated_tokens=0, **kwargs):
+        prompt = messages[-1]["content"]
+        batch = "Reviews (each prefixed" in prompt
+        self.calls.append((route, 'batch' if batch else 'single'))
+        content = self.batch_content if batch else json.dumps(item(Summary="retried"))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def rows(n):
+    return [{"Title": f"t{i}", "Content": f"review {i}"} for i in range(n)]
+
+
+def test_items_dropped_by_the_batch_are_retried_one_by_one():
+    router = StubRouter(json.dumps({"results": [item(0, Summary="a"), item(2, Summary="c"), item(5)]}))
+    results = asyncio.run(classify_rows(router, rows(3), batch_size=3))
+    assert [r["Summary"] for r in results] == ["a", "retried", "c"]
+    # 缺失的条目改走 strong 路由单独请求
+    assert router.calls == [('cheap', 'batch'), ('strong', 'single')]
+
+
+def test_malformed_batch_falls_back_to_single_requests():
+    router = StubRouter("```json {broken")
+    results = asyncio.run(classify_rows(router, rows(2), batch_size=5))
+    assert [r["Summary"] for r in results] == ["retried", "retried"]
+    assert sorted(router.calls) == [('cheap', 'batch'), ('strong', 'single'), ('strong', 'single')]
+
+
+def test_single_request_failure_yields_failed_result():
+    class Broken(StubRouter):
+        async def complete(self, route, messages, estimated_tokens=0, **kwargs):
+            raise RuntimeError("down")
+    results = asyncio.run(classify_rows(Broken(""), rows(2), batch_size=2))
+    assert results == [FAILED_RESULT, FAILED_RESULT]
@@ -0,0 +1,16 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_bench_llm_runs_without_touching_cwd(tmp_path):
+    # 小规模跑一遍 bench_llm：存储需要的 Operator / Date / Review_Id 列齐全，
+    # 缓存、近重复索引、预分类模型都写进临时目录，不在当前目录留下文件
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_llm", "--reviews", "40", "--latency", "0.01"],
+                          cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stderr
+    assert "失败 0 条" in proc.stdout
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,55 @@
+import pytest
+from src.analyzer import PROMPT_VERSION, review_cache_key
+from src.cache import ClassificationCache, cache_key
+
+RESULT = {"L1_Category": "Network", "L2_Issue": "No Signal"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr("src.cache.time.time", lambda: now[0])
+    return now
+
+
+def test_key_ignores_whitespace_and_case_but_not_model_or_prompt():
+    key = cache_key("No signal", "Down  since Monday ", "model-a", "v1")
+    assert key == cache_key(" no SIGNAL", "down since monday", "model-a", "v1")
+    assert key != cache_key("No signal", "Down since Monday", "model-b", "v1")
+    assert key != cache_key("No signal", "Down since Monday", "model-a", "v2")
+    row = {"Title": "No signal", "Content": "Down"}
+    assert review_cache_key(row, "deepseek-chat") != review_cache_key(row, "mock-mini")
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    with ClassificationCache(str(tmp_path / "c.db"), ttl_days=1, max_entries=0) as cache:
+        cache.put("k", RESULT, "m", "v1")
+        clock[0] += 86400 - 1
+        assert cache.get("k") == RESULT
+        clock[0] += 2
+        assert cache.get("k") is None
+        cache.evict()
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path, clock):
+    path = str(tmp_path / "c.db")
+    with ClassificationCache(path, ttl_days=0, max_entries=2) as cache:
+        for key in ["a", "b", "c"]:
+            clock[0] += 1
+            cache.put(key, RESULT, "m", "v1")
+        clock[0] += 1
+        # 访问 a 后，最久未访问的是 b
+        assert cache.get("a") == RESULT
+    with ClassificationCache(path, ttl_days=0, max_entries=2) as cache:
+        assert cache.get("b") is None
+        assert cache.get("a") == RESULT and cache.get("c") == RESULT
+
+
+def test_invalidate_drops_old_prompt_versions(tmp_path):
+    with ClassificationCache(str(tmp_path / "c.db")) as cache:
+        cache.put("old", RESULT, "m", "stale-version")
+        cache.put("new", RESULT, "m", PROMPT_VERSION)
+        assert cache.invalidate(keep_prompt_version=PROMPT_VERSION) == 1
+        assert cache.get("old") is None and cache.get("new") == RESULT
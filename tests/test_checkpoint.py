@@ -0,0 +1,95 @@
+import json
+import os
+from datetime import datetime, timedelta
+from src.checkpoint import Checkpoint
+
+
+def page(n, company='Vodacom'):
+    return [{'Operator': company, 'Review_Id': f"{n}-{i}", 'Date': datetime(2026, 1, 14, 8, i),
+             'Title': 't', 'Content': f"page {n} review {i}", 'Raw_Rating': 1} for i in range(2)]
+
+
+def classified(rows):
+    return [dict(r, L1_Category='Network', L2_Issue='Slow Speed', Sentiment='Negative') for r in rows]
+
+
+def test_replay_after_restart(tmp_path):
+    cp = Checkpoint('run', root=str(tmp_path))
+    cp.add_page('Vodacom', 1, page(1))
+    cp.add_page('Vodacom', 2, page(2))
+    cp.finish_company('Vodacom')
+    cp.add_page('MTN', 1, page(1, 'MTN'))
+    cp.add_classified(classified(page(1)))
+    cp.add_classified([dict(page(2)[0], L2_Issue='Analysis Failed')])
+    cp.mark('scrape')
+    cp.close()
+
+    resumed = Checkpoint('run', resume=True, root=str(tmp_path))
+    assert resumed.cutoff == cp.cutoff
+    rows, next_page, finished = resumed.resume_company('Vodacom')
+    assert [r['Review_Id'] for r in rows] == ['1-0', '1-1', '2-0', '2-1'] and finished
+    assert rows[0]['Date'] == datetime(2026, 1, 14, 8, 0)
+    assert resumed.resume_company('MTN')[1:] == (2, False)
+    assert resumed.resume_company('Telkom') == ([], None, False)
+    # 分析失败的行不记入断点，恢复后重新分类
+    done, todo = resumed.split(page(1) + page(2))
+    assert [r['L2_Issue'] for r in done] == ['Slow Speed'] * 2 and len(todo) == 2
+    assert resumed.done('scrape') and not resumed.done('classify')
+
+    # 不指定 resume 时丢弃旧断点
+    fresh = Checkpoint('run', root=str(tmp_path))
+    assert fresh.resume_company('Vodacom') == ([], None, False) and not fresh.stages
+
+
+def test_torn_last_line_is_skipped_and_later_appends_survive(tmp_path):
+    cp = Checkpoint('run', root=str(tmp_path))
+    cp.add_page('Vodacom', 1, page(1))
+    cp.add_page('Vodacom', 2, page(2))
+    cp.close()
+    # 模拟写第 3 页时崩溃：最后一行只写了一半
+    path = os.path.join(cp.path, 'pages.jsonl')
+    line = json.dumps({'company': 'Vodacom', 'page': 3, 'rows': []})
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line[:len(line) // 2])
+
+    resumed = Checkpoint('run', resume=True, root=str(tmp_path))
+    rows, next_page, _ = resumed.resume_company('Vodacom')
+    assert len(rows) == 4 and next_page == 3
+    # 恢复后继续写：新记录不能接在半行后面，再次恢复时仍能读到
+    resumed.add_page('Vodacom', 3, page(3))
+    resumed.finish_company('Vodacom')
+    resumed.close()
+
+    again = Checkpoint('run', resume=True, root=str(tmp_path))
+    rows, next_page, finished = again.resume_company('Vodacom')
+    assert len(rows) == 6 and next_page == 4 and finished
+
+
+def test_expired_checkpoint_starts_over(tmp_path):
+    cp = Checkpoint('run', root=str(tmp_path), max_age_hours=1)
+    cp.add_page('Vodacom', 1, page(1))
+    cp.close()
+    meta_path = os.path.join(cp.path, 'meta.json')
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['started_at'] = (datetime.now() - timedelta(hours=2)).isoformat()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    # max_age_hours=0 表示不过期
+    assert len(Checkpoint('run', resume=True, root=str(tmp_path), max_age_hours=0).resume_company('Vodacom')[0]) == 2
+    expired = Checkpoint('run', resume=True, root=str(tmp_path), max_age_hours=1)
+    assert expired.resume_company('Vodacom') == ([], None, False)
+    assert datetime.fromisoformat(expired.meta['started_at']) > datetime.now() - timedelta(minutes=1)
+    assert not os.path.exists(os.path.join(cp.path, 'pages.jsonl'))
+
+
+def test_discard_removes_the_checkpoint(tmp_path):
+    cp = Checkpoint('run', root=str(tmp_path))
+    cp.add_page('Vodacom', 1, page(1))
+    cp.mark('scrape')
+    cp.discard()
+    assert not os.path.exists(cp.path)
+
+    resumed = Checkpoint('run', resume=True, root=str(tmp_path))
+    assert resumed.resume_company('Vodacom') == ([], None, False) and not resumed.stages
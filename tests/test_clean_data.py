@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+from benchmarks.bench_clean_data import legacy_clean_data, make_frame
+from src.reporter import clean_data, CATEGORICAL_COLUMNS
+
+
+def _same(actual, expected):
+    # 向量化版本把维度列存成 category，比较取值即可
+    for col in CATEGORICAL_COLUMNS:
+        actual[col] = actual[col].astype(str)
+        expected[col] = expected[col].astype(str)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_clean_data_matches_legacy(seed):
+    base = make_frame(300, seed=seed)
+    _same(clean_data(base.copy()), legacy_clean_data(base.copy()))
+
+
+def test_clean_data_matches_legacy_with_missing_columns():
+    # 缺少的列由 clean_data 补默认值，两种实现要补得一样
+    base = make_frame(300, seed=3).drop(columns=['Service_Type', 'Content', 'Sentiment'])
+    _same(clean_data(base.copy()), legacy_clean_data(base.copy()))
+
+
+def test_clean_data_matches_legacy_with_lowercase_headers():
+    base = make_frame(200, seed=4).rename(columns=str.lower)
+    _same(clean_data(base.copy()), legacy_clean_data(base.copy()))
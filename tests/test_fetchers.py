@@ -0,0 +1,84 @@
+import asyncio
+import httpx
+import pytest
+from src.fetchers import HostRateLimiter, HttpFetcher
+
+
+class Server:
+    # 按顺序返回预设的响应（状态码, 头），之后一律 200
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(str(request.url))
+        status, headers = self.responses.pop(0) if self.responses else (200, {})
+        return httpx.Response(status, headers=headers, text="ok" if status == 200 else "error")
+
+
+def fetch(server, url="http://api.test/page", max_retries=3):
+    async def run():
+        async with HttpFetcher(HostRateLimiter(0), max_retries=max_retries,
+                               transport=httpx.MockTransport(server)) as fetcher:
+            return await fetcher.fetch_text(url)
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # 记录退避时长，不真的等待
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr("src.fetchers.asyncio.sleep", fake_sleep)
+    return delays
+
+
+def test_retries_429_and_5xx_then_succeeds(sleeps):
+    server = Server([(429, {}), (503, {}), (502, {})])
+    assert fetch(server) == "ok"
+    assert len(server.requests) == 4
+    assert len(sleeps) == 3
+    # 指数退避（带抖动）：每次的上限翻倍
+    assert sleeps[0] <= 0.5 and sleeps[1] <= 1.0 and sleeps[2] <= 2.0
+
+
+def test_retry_after_header_is_honoured(sleeps):
+    server = Server([(429, {"Retry-After": "7"})])
+    assert fetch(server) == "ok"
+    assert sleeps == [7.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    server = Server([(500, {})] * 5)
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(server, max_retries=2)
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(sleeps):
+    server = Server([(404, {})])
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(server)
+    assert len(server.requests) == 1 and sleeps == []
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    async def run():
+        limiter = HostRateLimiter(20)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        times = {}
+
+        async def hit(url):
+            await limiter.wait(url)
+            times.setdefault(url.split('/')[2], []).append(loop.time() - start)
+        await asyncio.gather(*(hit(f"http://{host}/p") for host in ["a.test", "b.test"] for _ in range(4)))
+        return times
+    times = asyncio.run(run())
+    for host, stamps in times.items():
+        # 同一 host 相邻两次至少间隔 1/20 秒；不同 host 互不影响
+        gaps = [b - a for a, b in zip(sorted(stamps), sorted(stamps)[1:])]
+        assert all(gap >= 0.045 for gap in gaps), (host, gaps)
+        assert sorted(stamps)[0] < 0.02
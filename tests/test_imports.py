@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_classification_does_not_import_report_modules():
+    # 分类侧（预分类 / 路由）与报告侧共用的规则在 src.rules；导入分类模块不应带入报告、图表、邮件模块
+    code = ("import sys, src.preclassifier, src.llm_router; "
+            "print(sorted(m for m in ('src.reporter', 'src.charts', 'src.mailer') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
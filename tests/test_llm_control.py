@@ -0,0 +1,24 @@
+import asyncio
+from src.llm_control import LLMController
+
+
+def test_concurrency_never_drops_below_one():
+    # LLM_MIN_CONCURRENCY=0 时 AIMD 可能把上限压到 1 以下，请求仍要能发出
+    async def run():
+        controller = LLMController(initial=1, min_limit=0)
+        controller.limit = 0.3
+
+        async def request():
+            return 'ok'
+        return controller, await asyncio.wait_for(controller.call(request), 2)
+
+    controller, result = asyncio.run(run())
+    assert result == 'ok'
+    assert controller.min_limit == 1
+
+
+def test_throttle_window_follows_observed_latency():
+    controller = LLMController(target_latency=15)
+    assert controller._latency_window() == 15
+    controller.latencies = [0.2, 0.3, 0.4]
+    assert controller._latency_window() == 0.3
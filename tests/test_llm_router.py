@@ -0,0 +1,113 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from src.llm_router import LLMRouter
+
+
+class StubClient:
+    # 代替 AsyncOpenAI：记录 (端点, 模型)，按 fail 决定是否抛错，delay 模拟慢请求
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+        self.fail = False
+        self.delay = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        self.calls.append((self.name, model))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.name))], usage=usage)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def router(monkeypatch):
+    for key, value in {'LLM_API_KEY': 'x', 'LLM_BASE_URL': 'http://primary.invalid/v1',
+                       'LLM_FALLBACK_BASE_URL': 'http://fallback.invalid/v1', 'LLM_FALLBACK_MODEL': '',
+                       'LLM_MODEL': 'strong-m', 'LLM_CHEAP_MODEL': 'cheap-m', 'LLM_SUMMARY_MODEL': 'summary-m',
+                       'LLM_FAILOVER_ERRORS': 2, 'LLM_FAILOVER_COOLDOWN': 30, 'LLM_FAILOVER_LATENCY': 5,
+                       'LLM_PRICES': {}}.items():
+        monkeypatch.setattr(f"src.config.Config.{key}", value)
+    # 熔断计时用可控的时钟
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr("src.llm_router.time", SimpleNamespace(monotonic=lambda: clock.now))
+    router = LLMRouter()
+    router.calls = []
+    router.clock = clock
+    router.primary.client = StubClient('primary', router.calls)
+    router.fallback.client = StubClient('fallback', router.calls)
+    return router
+
+
+def complete(router, route='strong'):
+    response = asyncio.run(router.complete(route, [{'role': 'user', 'content': 'hi'}]))
+    return response.choices[0].message.content
+
+
+def test_routes_reach_their_models(router):
+    for route in ('cheap', 'strong', 'summary'):
+        assert complete(router, route) == 'primary'
+    assert router.calls == [('primary', 'cheap-m'), ('primary', 'strong-m'), ('primary', 'summary-m')]
+    stats = router.stats()
+    assert [stats[r]['model'] for r in ('cheap', 'strong', 'summary')] == ['cheap-m', 'strong-m', 'summary-m']
+    assert stats['cheap']['prompt_tokens'] == 10
+
+
+def test_failing_primary_falls_back(router):
+    router.primary.client.fail = True
+    assert complete(router, 'cheap') == 'fallback'
+    # 未配置 LLM_FALLBACK_MODEL 时备用端点用同一路由的模型
+    assert router.calls == [('primary', 'cheap-m'), ('fallback', 'cheap-m')]
+    assert router.stats()['cheap']['failovers'] == 1
+    assert router.stats()['cheap']['served_by_fallback'] == 1
+
+    # 两个端点都失败时抛出
+    router.fallback.client.fail = True
+    with pytest.raises(RuntimeError, match="fallback down"):
+        complete(router)
+    assert router.stats()['strong']['failures'] == 1
+
+
+def test_slow_primary_fails_over(router, monkeypatch):
+    monkeypatch.setattr("src.config.Config.LLM_FAILOVER_LATENCY", 0.05)
+    router.primary.client.delay = 1
+    assert complete(router) == 'fallback'
+
+
+def test_circuit_opens_after_errors_and_half_opens_after_cooldown(router):
+    router.primary.client.fail = True
+    complete(router)
+    complete(router)
+    # 连续失败 LLM_FAILOVER_ERRORS 次后熔断：冷却期内不再请求主端点
+    router.calls.clear()
+    router.clock.now += 29
+    assert complete(router) == 'fallback'
+    assert router.calls == [('fallback', 'strong-m')]
+
+    # 冷却结束后放行一次试探；仍失败则立即重新熔断
+    router.calls.clear()
+    router.clock.now += 2
+    assert complete(router) == 'fallback'
+    assert router.calls == [('primary', 'strong-m'), ('fallback', 'strong-m')]
+    router.calls.clear()
+    assert complete(router) == 'fallback'
+    assert router.calls == [('fallback', 'strong-m')]
+
+    # 主端点恢复：冷却后的试探成功，熔断关闭
+    router.primary.client.fail = False
+    router.clock.now += 31
+    router.calls.clear()
+    assert complete(router) == 'primary'
+    router.primary.client.fail = True
+    complete(router)
+    assert router.calls == [('primary', 'strong-m'), ('primary', 'strong-m'), ('fallback', 'strong-m')]
+    # 计数已清零：一次失败不会熔断
+    router.calls.clear()
+    assert complete(router) == 'fallback'
+    assert router.calls[0][0] == 'primary'
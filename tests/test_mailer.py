@@ -0,0 +1,115 @@
+import os
+import smtplib
+from email.mime.text import MIMEText
+from benchmarks.smtp_sink import start_server
+from src.mailer import Mailer
+
+
+def message():
+    msg = MIMEText("report")
+    msg['Subject'] = "report"
+    msg['From'] = "bench@example.com"
+    msg['To'] = "team@example.com"
+    return msg
+
+
+class FakeSMTP:
+    # 记录命令顺序的 SMTP 客户端替身
+    calls = []
+
+    def __init__(self, host, port, timeout=None):
+        self.calls.clear()
+
+    def ehlo(self):
+        self.calls.append('ehlo')
+
+    def has_extn(self, name):
+        return name == 'starttls'
+
+    def starttls(self):
+        self.calls.append('starttls')
+
+    def login(self, user, password):
+        self.calls.append('login')
+
+    def send_message(self, msg):
+        self.calls.append('send')
+        return {}
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_login_happens_only_after_starttls(tmp_path, monkeypatch):
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    with Mailer("smtp.example.com", 587, "user", "secret", outbox=str(tmp_path)) as mailer:
+        assert mailer.send(message())
+    assert FakeSMTP.calls == ['ehlo', 'starttls', 'ehlo', 'login', 'send']
+
+
+def test_password_is_never_sent_without_starttls(tmp_path):
+    # 本地替身不提供 STARTTLS：配置了密码时不登录、不重试，邮件进发件箱
+    server, port, state = start_server()
+    try:
+        with Mailer("127.0.0.1", port, "user", "secret", outbox=str(tmp_path), backoff=0.01) as mailer:
+            assert not mailer.send(message())
+        assert state.logins == 0 and not state.messages
+        # 配置错误重试也不会成功：不进待补发队列，放进 failed/
+        assert mailer.queued == 0 and mailer.failed == 1 and mailer.retries == 0
+        assert len(os.listdir(tmp_path / 'failed')) == 1
+
+        # 不登录的本地替身仍可明文发送
+        with Mailer("127.0.0.1", port, "", "", outbox=str(tmp_path)) as mailer:
+            assert mailer.send(message())
+        assert len(state.messages) == 1
+    finally:
+        server.shutdown()
+
+
+class RejectingSMTP(FakeSMTP):
+    # 按队列依次抛出错误，队列空了才收下
+    errors = []
+    delivered = []
+
+    def send_message(self, msg):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.delivered.append(msg['Subject'])
+        return {}
+
+
+def test_permanent_rejection_is_not_queued_for_retry(tmp_path, monkeypatch):
+    monkeypatch.setattr(smtplib, 'SMTP', RejectingSMTP)
+    RejectingSMTP.delivered.clear()
+    RejectingSMTP.errors[:] = [smtplib.SMTPRecipientsRefused({'team@example.com': (550, b'no such user')}),
+                               smtplib.SMTPDataError(451, b'try later'), smtplib.SMTPDataError(451, b'try later')]
+    with Mailer("smtp.example.com", 25, "", "", outbox=str(tmp_path), max_retries=1, backoff=0) as mailer:
+        assert not mailer.send(message())
+        assert not mailer.send(message())
+    assert mailer.failed == 1 and mailer.queued == 1
+    assert len(os.listdir(tmp_path / 'failed')) == 1
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.eml')]) == 1
+
+    # 补发只处理临时失败的那封；被拒收的不会再发
+    with Mailer("smtp.example.com", 25, "", "", outbox=str(tmp_path), backoff=0) as mailer:
+        assert mailer.flush_outbox() == 1
+    assert RejectingSMTP.delivered == ['report']
+    assert not [n for n in os.listdir(tmp_path) if n.endswith('.eml')]
+
+
+def test_outbox_message_rejected_on_flush_moves_to_failed(tmp_path, monkeypatch):
+    monkeypatch.setattr(smtplib, 'SMTP', RejectingSMTP)
+    RejectingSMTP.delivered.clear()
+    Mailer(outbox=str(tmp_path)).enqueue(message())
+    RejectingSMTP.errors[:] = [smtplib.SMTPDataError(554, b'message rejected')]
+    with Mailer("smtp.example.com", 25, "", "", outbox=str(tmp_path), backoff=0) as mailer:
+        assert mailer.flush_outbox() == 0
+        assert mailer.failed == 1
+        # 再次补发时发件箱已空，不会无限重试
+        assert mailer.flush_outbox() == 0
+    assert not RejectingSMTP.delivered
+    assert not [n for n in os.listdir(tmp_path) if n.endswith('.eml')]
+    assert len(os.listdir(tmp_path / 'failed')) == 1
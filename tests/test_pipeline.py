@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime
+import pytest
+from src.pipeline import run_pipeline
+
+RESULT = {"L1_Category": "Network", "L2_Issue": "No Signal/Dead Zone", "Service_Type": "MBB",
+          "Sentiment": "Negative", "Summary": "No signal."}
+
+
+def page(n, size=3):
+    return [{"Operator": "Vodacom", "Date": datetime(2026, 1, 14), "Review_Id": f"{n}-{i}", "Title": "t",
+             "Content": f"page {n} review {i}", "Raw_Rating": 1, "Url": "u"} for i in range(size)]
+
+
+@pytest.fixture(autouse=True)
+def settings(tmp_path, monkeypatch):
+    for key, value in {"DATA_DIR": str(tmp_path / "data"), "LLM_CACHE_DB": str(tmp_path / "cache.db"),
+                       "SEMANTIC_DEDUPE": False, "PRECLASSIFY": False, "PIPELINE_WORKERS": 1,
+                       "PIPELINE_QUEUE_SIZE": 2, "LLM_BATCH_SIZE": 1, "LLM_API_KEY": "test"}.items():
+        monkeypatch.setattr(f"src.config.Config.{key}", value)
+
+
+def test_bounded_queue_holds_back_the_scraper(monkeypatch):
+    pages = 20
+    produced = []
+    release = asyncio.Event()
+
+    async def crawl(backend, state, on_rows=None, checkpoint=None):
+        for n in range(pages):
+            await on_rows(page(n))
+            produced.append(n)
+
+    async def classify(router, cache, rows, index=None, pre=None):
+        await release.wait()
+        return [dict(RESULT) for _ in rows]
+
+    monkeypatch.setattr("src.pipeline.crawl", crawl)
+    monkeypatch.setattr("src.pipeline.classify_records", classify)
+
+    async def run():
+        pipeline = asyncio.create_task(run_pipeline())
+        await asyncio.sleep(0.2)
+        # 分类卡住时：worker 手里 1 页 + 队列 2 页，抓取方阻塞在下一次 put 上
+        stalled = len(produced)
+        release.set()
+        return stalled, await asyncio.wait_for(pipeline, 10)
+
+    stalled, df = asyncio.run(run())
+    assert stalled == 3
+    assert len(df) == pages * 3
+
+
+def test_failing_classifier_cancels_the_scraper(monkeypatch):
+    scraper = {"cancelled": False}
+
+    async def crawl(backend, state, on_rows=None, checkpoint=None):
+        n = 0
+        try:
+            while True:
+                await on_rows(page(n))
+                n += 1
+        except asyncio.CancelledError:
+            scraper["cancelled"] = True
+            raise
+
+    calls = []
+
+    async def classify(router, cache, rows, index=None, pre=None):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("LLM exploded")
+        return [dict(RESULT) for _ in rows]
+
+    monkeypatch.setattr("src.pipeline.crawl", crawl)
+    monkeypatch.setattr("src.pipeline.classify_records", classify)
+    with pytest.raises(RuntimeError, match="LLM exploded"):
+        asyncio.run(asyncio.wait_for(run_pipeline(), 10))
+    assert scraper["cancelled"]
+
+
+def test_failing_scraper_stops_the_workers(monkeypatch):
+    async def crawl(backend, state, on_rows=None, checkpoint=None):
+        await on_rows(page(0))
+        raise ConnectionError("site down")
+
+    async def classify(router, cache, rows, index=None, pre=None):
+        # 分类很慢：抓取失败后不能等分类跑完，更不能一直挂着
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr("src.pipeline.crawl", crawl)
+    monkeypatch.setattr("src.pipeline.classify_records", classify)
+    with pytest.raises(ConnectionError):
+        asyncio.run(asyncio.wait_for(run_pipeline(), 10))
@@ -0,0 +1,69 @@
+import asyncio
+import re
+import pandas as pd
+import pytest
+from src.cube import build_cube
+from src.report_specs import ReportBuilder, ReportSpec
+from src.reporter import clean_data
+
+
+PNG = b'\x89PNG\r\n\x1a\n'
+
+
+class StubRouter:
+    def __init__(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    # 不画图、不调 LLM：图表输出为可辨认的假 PNG，综述为固定文本
+    def render(inputs):
+        return {key: PNG + f"{name}:{','.join(key[1])}".encode() for key, (name, _) in inputs.items()}
+
+    async def summary(view, trends, language, router):
+        return f"summary-{language}"
+
+    monkeypatch.setattr("src.report_specs.render_inputs", render)
+    monkeypatch.setattr("src.report_specs.optimize_png", lambda png: png)
+    monkeypatch.setattr("src.report_specs.generate_deep_insight_summary", summary)
+    monkeypatch.setattr("src.llm_router.LLMRouter", StubRouter)
+    rows = []
+    for op, sentiment, n in [('Vodacom', 'Negative', 4), ('MTN', 'Negative', 3), ('MTN', 'Positive', 2)]:
+        rows += [{'Operator': op, 'Date': '2026-01-14', 'Content': 'x', 'Url': 'u', 'L1_Category': 'Network',
+                  'L2_Issue': 'Slow Speed', 'Service_Type': 'Mobile', 'Sentiment': sentiment}] * n
+    return ReportBuilder(build_cube(clean_data(pd.DataFrame(rows))))
+
+
+def parts(msg):
+    html = next(p for p in msg.walk() if p.get_content_type() == 'text/html').get_payload(decode=True).decode()
+    headings = re.findall(r'<h3[^>]*>(\d+)\. ([^<]+)</h3>', html)
+    images = {p['Content-ID']: p.get_payload(decode=True) for p in msg.walk() if p.get_content_maintype() == 'image'}
+    return html, headings, images
+
+
+def test_sections_are_numbered_in_render_order(builder):
+    full = ReportSpec('full', ['a@example.com'], language='en')
+    partial = ReportSpec('mtn', ['b@example.com'], operators=['MTN'], sections=['voice', 'category'], language='en')
+    (_, full_msg), (_, partial_msg) = asyncio.run(builder.build([full, partial]))
+
+    html, headings, images = parts(full_msg)
+    # 综述占第 1 位但不显示序号
+    assert 'summary-en' in html
+    assert [n for n, _ in headings] == ['2', '3', '4', '5', '6']
+    assert [t for _, t in headings][:3] == ['Sentiment Trend (Positive vs Negative)', 'Complaint Categories',
+                                          'Top Pain Points']
+    assert set(images) == {'<trend_img>', '<category_img>', '<deep_dive_img>'}
+
+    # 章节按 SECTIONS 的顺序渲染，没有综述时从 1 开始连续编号
+    html, headings, images = parts(partial_msg)
+    assert 'summary-en' not in html
+    assert headings == [('1', 'Complaint Categories'), ('2', 'Customer Voice (Typical Complaints)')]
+    assert images == {'<category_img>': PNG + b'category:MTN'}
+    assert 'cid:category_img' in html and 'cid:trend_img' not in html
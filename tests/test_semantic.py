@@ -0,0 +1,43 @@
+import pandas as pd
+from src.charts import deep_dive_inputs
+from src.cube import build_cube
+from src.reporter import clean_data
+from src.semantic import canonical_issues
+
+# 字面相近但含义不同的问题，默认阈值下必须保持分开
+DISTINCT = [
+    ('Cancellation Fee', 'Contract Cancellation'),
+    ('No Refund', 'Refund Delay'),
+    ('No Signal', 'Poor Signal'),
+    ('Dropped Calls', 'Call Drops Billing'),
+]
+# 同一问题的写法变化（大小写、单复数、语序），应归并
+VARIANTS = [
+    ('Billing Error', 'billing errors'),
+    ('Network Outage', 'Network outages'),
+    ('Faulty router', 'Router faulty'),
+    ('Contract Cancellation', 'Cancellation of contract'),
+]
+
+
+def test_distinct_issues_stay_separate():
+    for a, b in DISTINCT:
+        mapping = canonical_issues({a: 10, b: 5})
+        assert mapping[b] == b, (a, b)
+
+
+def test_issue_variants_merge():
+    for a, b in VARIANTS:
+        assert canonical_issues({a: 10, b: 5})[b] == a, (a, b)
+
+
+def test_deep_dive_merges_only_within_l1():
+    rows = []
+    for l1, issue, n in [('Billing', 'Billing Error', 6), ('Billing', 'billing errors', 4),
+                         ('Network', 'Network Outage', 5), ('Billing', 'Network Outages', 3)]:
+        rows += [{'Operator': 'Vodacom', 'Date': '2026-01-14', 'Content': 'x', 'Url': 'u', 'L1_Category': l1,
+                  'L2_Issue': issue, 'Service_Type': 'Mobile', 'Sentiment': 'Negative'}] * n
+    panel = deep_dive_inputs(build_cube(clean_data(pd.DataFrame(rows))))['panels']['Vodacom']
+    # "Network Outages" 在 Billing 下不会被并入 Network 类别里数量更多的 "Network Outage"
+    assert panel['top_l1'] == 'Billing'
+    assert panel['issues'] == [['Billing Error', 10], ['Network Outages', 3]]
@@ -0,0 +1,54 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlsplit
+from benchmarks.fixture_server import build_page
+from src.scraper import scrape_company
+from src.state import StateStore
+
+NOW = datetime(2026, 1, 15, 12, 0, 0)
+
+
+class PageFetcher:
+    # 按 URL 中的页码返回 fixture 页（每页 10 条，按时间倒序），记录请求过的页码
+    def __init__(self, pages=3):
+        self.pages = pages
+        self.requested = []
+
+    async def fetch_text(self, url):
+        page = int(parse_qs(urlsplit(url).query)['page'][0])
+        self.requested.append(page)
+        if page > self.pages:
+            return json.dumps({"data": []})
+        return json.dumps(build_page("vodacom", page, reviews_per_day=40, now=NOW))
+
+
+def crawl(state, fetcher):
+    return asyncio.run(scrape_company(fetcher, "vodacom", NOW - timedelta(days=7), state))
+
+
+def test_failed_review_on_page_two_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.config.Config.SCRAPER_PAGE_WINDOW", 1)
+    with StateStore(str(tmp_path / "state.db")) as state:
+        first = crawl(state, PageFetcher())
+        failed = first[15]
+        state.mark_seen([r for r in first if r is not failed])
+        state.mark_failed([failed])
+
+        # 下一次运行：第 1 页全是已知评论，照常会在第 1 页停止；失败的评论在第 2 页，仍要翻到并重新抓取
+        fetcher = PageFetcher()
+        rows = crawl(state, fetcher)
+        assert [r['Review_Id'] for r in rows] == [failed['Review_Id']]
+        assert fetcher.requested == [1, 2]
+
+        # 重新分析成功后不再多翻页
+        state.mark_seen(rows)
+        fetcher = PageFetcher()
+        assert crawl(state, fetcher) == []
+        assert fetcher.requested == [1]
+
+
+def test_retries_outside_window_are_dropped(tmp_path):
+    with StateStore(str(tmp_path / "state.db")) as state:
+        state.mark_failed([{'Operator': 'vodacom', 'Review_Id': '1', 'Date': NOW - timedelta(days=30)}])
+        assert state.oldest_retry('vodacom', NOW - timedelta(days=7)) is None
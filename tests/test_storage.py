@@ -0,0 +1,60 @@
+import os
+import time
+from datetime import datetime
+import pandas as pd
+import pytest
+from src.storage import ReviewStore, load_report_window
+
+
+def reviews(summary, ids=('1', '2'), date='2026-01-14'):
+    return pd.DataFrame({
+        'Operator': 'Vodacom', 'Date': date, 'Review_Id': list(ids),
+        'Title': 't', 'Content': [f"review {i}" for i in ids], 'Raw_Rating': 1, 'Url': 'u',
+        'L1_Category': 'Network', 'L2_Issue': 'Slow Speed', 'Service_Type': 'Mobile',
+        'Sentiment': 'Negative', 'Summary': summary,
+    })
+
+
+def test_load_dedupes_when_projection_omits_date(tmp_path):
+    store = ReviewStore('analyzed', root=str(tmp_path))
+    store.append(reviews('old'))
+    time.sleep(0.01)
+    store.append(reviews('new', ids=('2',)))
+
+    # 去重排序需要 Date / Ingested_At，即使投影里没有也要读出来；同一评论只保留最后写入的版本
+    df = store.load(columns=['Review_Id', 'Summary'])
+    assert list(df.columns) == ['Review_Id', 'Summary']
+    assert sorted(zip(df['Review_Id'], df['Summary'])) == [('1', 'old'), ('2', 'new')]
+    assert len(store.load(columns=['Summary'], dedupe=False)) == 3
+
+
+def test_load_prunes_by_date(tmp_path):
+    store = ReviewStore('analyzed', root=str(tmp_path))
+    store.append(reviews('recent', date=datetime.now().strftime('%Y-%m-%d')))
+    store.append(reviews('old', ids=('3',), date='2020-01-01'))
+
+    window = load_report_window(store, days=7)
+    assert sorted(window['Content']) == ['review 1', 'review 2']
+    assert len(store.load(columns=['Review_Id'], start=datetime(2019, 12, 1))) == 3
+
+
+def test_compact_leaves_no_temp_file_that_a_scan_would_read(tmp_path, monkeypatch):
+    store = ReviewStore('analyzed', root=str(tmp_path))
+    for i in range(4):
+        store.append(reviews(f"v{i}"))
+    partition = next(p for p, _, files in os.walk(store.path) if any(f.endswith('.parquet') for f in files))
+
+    # compact 写临时文件时崩溃：残留的半个文件不能让读取失败
+    def crash(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr("src.storage.os.replace", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+    leftovers = [f for f in os.listdir(partition) if f.endswith('.tmp')]
+    assert leftovers and all(f.startswith('.') for f in leftovers)
+    assert sorted(store.load(columns=['Review_Id', 'Summary']).itertuples(index=False)) == [('1', 'v3'), ('2', 'v3')]
+
+    assert store.compact() == 1
+    assert len([f for f in os.listdir(partition) if f.endswith('.parquet')]) == 1
+    assert len(store.load(columns=['Review_Id'], dedupe=False)) == 2
@@ -0,0 +1,76 @@
+import random
+from datetime import date, timedelta
+import pandas as pd
+from src.trends import ALL, TrendStore
+
+START = date(2026, 1, 1)
+OPERATORS = ['Vodacom', 'MTN']
+L1 = {'Network': ['No Signal', 'Slow'], 'Billing': ['Double Debit']}
+
+
+def reviews(seed, first, last):
+    # first..last（含）每天随机若干条评论；同一 seed 同一天的数据相同
+    rows = []
+    day = first
+    while day <= last:
+        rng = random.Random(f"{seed}-{day}")
+        for _ in range(rng.randint(0, 6)):
+            l1 = rng.choice(list(L1))
+            rows.append({'Day': day, 'Operator': rng.choice(OPERATORS), 'Sentiment': rng.choice(['Negative', 'Positive']),
+                         'L1_Category': l1, 'L2_Issue': rng.choice(L1[l1])})
+        day += timedelta(days=1)
+    return pd.DataFrame(rows)
+
+
+def snapshot(store, last):
+    # 每个 运营商 × 情感 × L1（含合计）截至每一天的累计值
+    out = {}
+    for op in OPERATORS:
+        for s in ['Negative', 'Positive']:
+            for l1 in [ALL, *L1]:
+                day = START - timedelta(days=1)
+                while day <= last:
+                    out[(op, s, l1, day)] = store._cumulative(op, s, l1, day)
+                    day += timedelta(days=1)
+    return out
+
+
+def test_overlapping_updates_match_a_full_recompute(tmp_path):
+    last = START + timedelta(days=30)
+    with TrendStore(str(tmp_path / "incremental.db")) as store:
+        # 三次运行的窗口互相重叠；重叠的日期在后一次运行中数据有变化（评论被修改 / 补抓）
+        for seed, first, end in [('a', START, START + timedelta(days=15)),
+                                 ('b', START + timedelta(days=10), START + timedelta(days=25)),
+                                 ('c', START + timedelta(days=20), last + timedelta(days=1))]:
+            store.update(reviews(seed, first, end - timedelta(days=1)), since=first, until=end)
+        incremental = snapshot(store, last)
+
+    final = pd.concat([reviews('a', START, START + timedelta(days=9)),
+                       reviews('b', START + timedelta(days=10), START + timedelta(days=19)),
+                       reviews('c', START + timedelta(days=20), last)])
+    with TrendStore(str(tmp_path / "full.db")) as store:
+        store.update(final)
+        assert snapshot(store, last) == incremental
+        counts = store.conn.execute("SELECT SUM(count) FROM daily_counts").fetchone()[0]
+    assert counts == len(final)
+
+
+def test_shrinking_day_shifts_later_cumulative_rows(tmp_path):
+    day = START + timedelta(days=3)
+    row = {'Operator': 'MTN', 'Sentiment': 'Negative', 'L1_Category': 'Network', 'L2_Issue': 'Slow'}
+    with TrendStore(str(tmp_path / "t.db")) as store:
+        store.update(pd.DataFrame([dict(row, Day=day)] * 5 + [dict(row, Day=day + timedelta(days=5))] * 2))
+        assert store.window_total('MTN', 'Negative', day + timedelta(days=9), 10) == 7
+        # 重新写入 day 当天：5 条变 1 条，之后各天的累计值一起减 4
+        store.update(pd.DataFrame([dict(row, Day=day)]))
+        assert store._cumulative('MTN', 'Negative', 'Network', day + timedelta(days=9)) == 3
+        assert store.window_total('MTN', 'Negative', day + timedelta(days=5), 1) == 2
+
+
+def test_since_and_until_skip_partial_days(tmp_path):
+    df = reviews('a', START, START + timedelta(days=9))
+    with TrendStore(str(tmp_path / "t.db")) as store:
+        store.update(df, since=START + timedelta(days=1), until=START + timedelta(days=9))
+        days = {row[0] for row in store.conn.execute("SELECT DISTINCT day FROM daily_counts")}
+    expected = {d.isoformat() for d in df['Day'] if START < d < START + timedelta(days=9)}
+    assert days == expected